@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+结构数组（SoA）实体存储
+坐标、速度、类型分别保存在预先分配的NumPy数组中，用active掩码表示哪些槽位在用；
+移动、边界反弹、出界回收和AABB碰撞都是对整列的向量化运算，没有逐个对象的Python循环
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class EntityStore:
+    """固定容量的实体池，所有实体使用相同大小的碰撞盒"""
+
+    def __init__(self, capacity: int, width: int, height: int):
+        """
+        Args:
+            capacity: 最大实体数，超出时新生成的实体被丢弃
+            width/height: 碰撞盒（也是绘制矩形）大小
+        """
+        self.capacity = capacity
+        self.width = width
+        self.height = height
+
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.dx = np.zeros(capacity, dtype=np.int32)
+        self.dy = np.zeros(capacity, dtype=np.int32)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.active = np.zeros(capacity, dtype=bool)
+
+        self.dropped = 0
+        self.state_size = capacity * (4 * 4 + 1 + 1)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.active))
+
+    def clear(self):
+        """回收全部实体"""
+        self.active[:] = False
+
+    def spawn(self, x: int, y: int, dx: int, dy: int, kind: int = 0) -> int:
+        """在第一个空闲槽位生成一个实体，返回槽位号，池满时返回-1"""
+        free = np.flatnonzero(~self.active)
+        if len(free) == 0:
+            self.dropped += 1
+            return -1
+        index = int(free[0])
+        self.x[index] = x
+        self.y[index] = y
+        self.dx[index] = dx
+        self.dy[index] = dy
+        self.kind[index] = kind
+        self.active[index] = True
+        return index
+
+    def spawn_many(self, x, y, dx, dy, kind=0) -> int:
+        """批量生成实体（参数可以是数组或标量），返回实际生成的数量"""
+        count = max(np.size(x), np.size(y), np.size(dx), np.size(dy), np.size(kind))
+        free = np.flatnonzero(~self.active)[:count]
+        self.dropped += count - len(free)
+        n = len(free)
+        self.x[free] = np.broadcast_to(x, count)[:n]
+        self.y[free] = np.broadcast_to(y, count)[:n]
+        self.dx[free] = np.broadcast_to(dx, count)[:n]
+        self.dy[free] = np.broadcast_to(dy, count)[:n]
+        self.kind[free] = np.broadcast_to(kind, count)[:n]
+        self.active[free] = True
+        return n
+
+    def move(self):
+        """按速度移动在用的实体（空闲槽位保持不动）"""
+        active = self.active
+        np.add(self.x, self.dx, out=self.x, where=active)
+        np.add(self.y, self.dy, out=self.y, where=active)
+
+    def bounce(self, min_x: int, max_x: int, min_y: int, max_y: int):
+        """碰到边界时反转对应方向的速度"""
+        x, y = self.x, self.y
+        self.dx[(x <= min_x) | (x >= max_x)] *= -1
+        self.dy[(y <= min_y) | (y >= max_y)] *= -1
+
+    def cull(self, min_x: int, max_x: int):
+        """回收横向越出范围的实体"""
+        self.active &= (self.x >= min_x) & (self.x <= max_x)
+
+    def indices(self) -> np.ndarray:
+        """在用的槽位号"""
+        return np.flatnonzero(self.active)
+
+    def rects(self) -> List[Tuple[int, int]]:
+        """在用实体的左上角坐标，供绘制使用"""
+        active = self.active
+        return list(zip(self.x[active].tolist(), self.y[active].tolist()))
+
+    def save_state(self) -> bytes:
+        """所有槽位的原始数组（容量固定，快照长度不变）"""
+        return b''.join((self.x, self.y, self.dx, self.dy, self.kind, self.active))
+
+    def load_state(self, data):
+        """从 save_state() 的快照恢复（原地写入）"""
+        offset = 0
+        for column in (self.x, self.y, self.dx, self.dy, self.kind, self.active):
+            column[:] = np.frombuffer(data, dtype=column.dtype, count=len(column), offset=offset)
+            offset += column.nbytes
+
+    def to_list(self) -> List[Dict]:
+        """转换为字典列表（存档格式）"""
+        return [{'x': int(self.x[i]), 'y': int(self.y[i]), 'dx': int(self.dx[i]),
+                 'dy': int(self.dy[i]), 'type': int(self.kind[i])} for i in self.indices()]
+
+    def load_list(self, entities: List[Dict]):
+        """从字典列表恢复（读档）"""
+        self.clear()
+        for entity in entities:
+            self.spawn(entity['x'], entity['y'], entity.get('dx', 0), entity.get('dy', 0),
+                       entity.get('type', 0))
+
+
+def collide(a: EntityStore, b: EntityStore) -> Tuple[np.ndarray, np.ndarray]:
+    """两组实体的AABB碰撞，返回 (a的槽位号, b的槽位号)
+
+    先把b按x排序，用searchsorted为每个a找出x方向重叠的区间（扫描排序法），
+    只对这些候选对比较y，避免 len(a) x len(b) 的完整矩阵。
+    与逐对检查的双重循环结果相同：按槽位号顺序，每个a击中与它重叠、且还没被击中的
+    槽位号最小的b，命中双方不重复
+    """
+    empty = np.zeros(0, dtype=np.intp)
+    ia = a.indices()
+    ib = b.indices()
+    if len(ia) == 0 or len(ib) == 0:
+        return empty, empty
+
+    order = np.argsort(b.x[ib], kind='stable')
+    bx = b.x[ib][order]
+    ax = a.x[ia]
+    # 坐标为整数：bx > ax - b.width 等价于 bx >= ax - b.width + 1
+    lo = np.searchsorted(bx, ax - b.width + 1, 'left')
+    hi = np.searchsorted(bx, ax + a.width, 'left')
+    counts = hi - lo
+    total = int(counts.sum())
+    if total == 0:
+        return empty, empty
+
+    # 展开成候选对 (a序号, b在排序后的位置)，a序号按升序分组
+    pair_a = np.repeat(np.arange(len(ia)), counts)
+    starts = np.cumsum(counts) - counts
+    pair_b = np.repeat(lo - starts, counts) + np.arange(total)
+
+    ay = a.y[ia][pair_a]
+    by = b.y[ib][order][pair_b]
+    hit = (ay < by + b.height) & (by < ay + a.height)
+    pair_a = pair_a[hit]
+    if len(pair_a) == 0:
+        return empty, empty
+    pair_b = order[pair_b[hit]]
+
+    # 按 (a序号, b序号) 排序，每组第一个就是该a槽位号最小的b（ib升序，序号越小槽位号越小）
+    sort = np.lexsort((pair_b, pair_a))
+    pair_a = pair_a[sort]
+    pair_b = pair_b[sort]
+    group = np.flatnonzero(np.diff(pair_a)) + 1
+    group = np.concatenate(([0], group))
+    rows = pair_a[group]
+    targets = pair_b[group]
+    if len(np.unique(targets)) == len(targets):
+        return ia[rows], ib[targets]
+
+    # 有b被多个a首选：按a的顺序逐个分配，已被击中的b跳过，改选下一个重叠的b
+    taken = set()
+    hit_a = []
+    hit_b = []
+    current = -1
+    for row, target in zip(pair_a.tolist(), pair_b.tolist()):
+        if row == current or target in taken:
+            continue
+        taken.add(target)
+        hit_a.append(row)
+        hit_b.append(target)
+        current = row
+    return ia[np.array(hit_a, dtype=np.intp)], ib[np.array(hit_b, dtype=np.intp)]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+跨进程的帧通道
+模拟进程把每帧的调色板索引帧缓冲写入 multiprocessing.shared_memory 中的双缓冲，
+界面进程（或Web服务）随时读取最新的一帧。不用锁，靠两个计数器判断读到的帧是否完整：
+
+    writing  写入端开始写第n帧前置为n，数据写入缓冲 n % 2
+    sequence 第n帧写完后置为n
+
+读取端先读sequence=s，复制缓冲 s % 2，再读writing：只要写入端还没开始写第s+2帧
+（它会覆盖同一个缓冲），复制的内容就是完整的第s帧，否则重试。
+共享内存的开头还有界面进程写给模拟进程的手柄输入、暂停和停止标志
+"""
+
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+FRAME_SHAPE = (240, 256)
+
+# 头部（int64）：已发布的帧号、正在写的帧号、1号手柄输入、暂停标志、停止标志、模拟进程状态
+SEQUENCE, WRITING, BUTTONS, PAUSED, STOP, STATUS = range(6)
+HEADER_BYTES = 64
+
+# 模拟进程状态
+STATUS_STARTING, STATUS_RUNNING, STATUS_FAILED = 0, 1, -1
+
+
+class FrameChannel:
+    """共享内存双缓冲帧通道"""
+
+    def __init__(self, name: Optional[str] = None, shape: Tuple[int, int] = FRAME_SHAPE):
+        """
+        Args:
+            name: 已有通道的名字（连接到别的进程创建的通道）；None时新建
+            shape: 帧缓冲形状
+        """
+        frame_bytes = shape[0] * shape[1]
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + 2 * frame_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.header = np.ndarray((HEADER_BYTES // 8,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((2,) + tuple(shape), dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=HEADER_BYTES)
+        if self.owner:
+            self.header[:] = 0
+
+        self.last_sequence = 0
+        self.received = 0
+        self.skipped = 0
+        self.retries = 0
+
+    def publish(self, frame: np.ndarray) -> int:
+        """写入端：发布一帧，返回帧号"""
+        header = self.header
+        sequence = int(header[SEQUENCE]) + 1
+        header[WRITING] = sequence
+        self.frames[sequence & 1] = frame
+        header[SEQUENCE] = sequence
+        return sequence
+
+    def read_latest(self, out: np.ndarray, attempts: int = 4) -> int:
+        """读取端：有新帧时复制到out并返回帧号，没有新帧（或一直读不到完整的帧）时返回0"""
+        header = self.header
+        for _ in range(attempts):
+            sequence = int(header[SEQUENCE])
+            if sequence == self.last_sequence:
+                return 0
+            np.copyto(out, self.frames[sequence & 1])
+            if int(header[WRITING]) < sequence + 2:
+                if self.last_sequence:
+                    self.skipped += sequence - self.last_sequence - 1
+                self.last_sequence = sequence
+                self.received += 1
+                return sequence
+            self.retries += 1
+        return 0
+
+    @property
+    def buttons(self) -> int:
+        """界面进程写入的1号手柄输入"""
+        return int(self.header[BUTTONS])
+
+    @buttons.setter
+    def buttons(self, value: int):
+        self.header[BUTTONS] = value
+
+    @property
+    def paused(self) -> bool:
+        """界面进程是否暂停了游戏"""
+        return bool(self.header[PAUSED])
+
+    @paused.setter
+    def paused(self, value: bool):
+        self.header[PAUSED] = value
+
+    @property
+    def stop_requested(self) -> bool:
+        """界面进程是否要求模拟进程退出"""
+        return bool(self.header[STOP])
+
+    def request_stop(self):
+        """通知模拟进程退出"""
+        self.header[STOP] = 1
+
+    @property
+    def status(self) -> int:
+        """模拟进程状态"""
+        return int(self.header[STATUS])
+
+    @status.setter
+    def status(self, value: int):
+        self.header[STATUS] = value
+
+    def get_stats(self) -> Dict:
+        """读取端统计：已发布、已读取、跳过的帧数和重读次数"""
+        return {
+            'published': int(self.header[SEQUENCE]),
+            'received': self.received,
+            'skipped': self.skipped,
+            'retries': self.retries
+        }
+
+    def close(self):
+        """断开共享内存，创建者同时删除它"""
+        self.header = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+帧节拍器
+按NTSC真实帧率（60.0988Hz）的绝对时间表等待，先sleep再自旋到截止时间；
+连续超出预算时自动提高跳帧等级（跳过渲染但继续模拟），稳定后再逐级降低。
+快进（按住）和加速（开关）时不等待、每k帧只渲染一帧，并统计实际的速度倍数
+"""
+
+import time
+from typing import Callable, Dict
+
+NTSC_FRAME_RATE = 60.0988
+
+
+class FramePacer:
+    """帧节拍与自动跳帧"""
+
+    def __init__(self, frame_rate: float = NTSC_FRAME_RATE, max_frameskip: int = 4,
+                 spin_time: float = 0.002, clock: Callable[[], float] = time.perf_counter,
+                 sleep: Callable[[float], None] = time.sleep, fast_forward_render: int = 4):
+        """
+        Args:
+            frame_rate: 目标帧率
+            max_frameskip: 最大跳帧等级，0表示不跳帧
+            spin_time: 截止时间前最后这段时间用自旋等待（sleep精度不够）
+            clock/sleep: 时间函数（测试时可替换）
+            fast_forward_render: 快进时每多少帧渲染一帧
+        """
+        self.frame_duration = 1.0 / frame_rate
+        self.max_frameskip = max_frameskip
+        self.spin_time = spin_time
+        self.clock = clock
+        self.sleep = sleep
+
+        # 超过这么多帧的落后不再追赶，直接重新对齐时间表
+        self.max_lag = self.frame_duration * 4
+        # 连续按时这么多帧后降低一级跳帧
+        self.recover_frames = 120
+
+        self.deadline = None
+        self.frameskip = 0
+        self.skip_phase = 0
+        self.late_streak = 0
+        self.early_streak = 0
+
+        # 快进：按住时 fast_forward_held 为True，turbo 为开关
+        self.fast_forward_held = False
+        self.turbo = False
+        self.fast_forward_render = max(1, fast_forward_render)
+        self.fast_forward_phase = 0
+
+        # 速度倍数：每0.5秒按实际帧数重新计算
+        self.speed = 1.0
+        self.speed_window = 0.5
+        self.speed_start = None
+        self.speed_frames = 0
+
+        self.frames = 0
+        self.rendered_frames = 0
+        self.late_frames = 0
+        self.resyncs = 0
+        self.fast_forward_frames = 0
+
+    @property
+    def fast_forward(self) -> bool:
+        """是否处于快进或加速状态"""
+        return self.fast_forward_held or self.turbo
+
+    def reset(self):
+        """从当前时间重新开始时间表（暂停恢复后调用）"""
+        self.deadline = self.clock() + self.frame_duration
+        self.late_streak = 0
+        self.early_streak = 0
+
+    def begin_frame(self) -> bool:
+        """开始新的一帧，返回这一帧是否需要渲染"""
+        if self.deadline is None:
+            self.reset()
+        self.frames += 1
+        self._measure_speed()
+        if self.fast_forward:
+            self.fast_forward_frames += 1
+            self.fast_forward_phase = (self.fast_forward_phase + 1) % self.fast_forward_render
+            if self.fast_forward_phase == 0:
+                self.rendered_frames += 1
+                return True
+            return False
+        if self.frameskip == 0:
+            self.rendered_frames += 1
+            return True
+        self.skip_phase = (self.skip_phase + 1) % (self.frameskip + 1)
+        if self.skip_phase == 0:
+            self.rendered_frames += 1
+            return True
+        return False
+
+    def _measure_speed(self):
+        """相对目标帧率的实际速度（每个统计窗口更新一次）"""
+        now = self.clock()
+        if self.speed_start is None:
+            self.speed_start = now
+            return
+        self.speed_frames += 1
+        elapsed = now - self.speed_start
+        if elapsed >= self.speed_window:
+            self.speed = self.speed_frames * self.frame_duration / elapsed
+            self.speed_start = now
+            self.speed_frames = 0
+
+    def wait(self):
+        """等待到本帧截止时间，并按是否超时调整跳帧等级"""
+        clock = self.clock
+        now = clock()
+        if self.fast_forward:
+            # 快进不等待：时间表跟着当前时间走，松开后不会为了“追赶”而狂跑或久等
+            self.deadline = now + self.frame_duration
+            self.late_streak = 0
+            return
+        remaining = self.deadline - now
+
+        if remaining >= 0:
+            if remaining > self.spin_time:
+                self.sleep(remaining - self.spin_time)
+            while clock() < self.deadline:
+                pass
+            self.late_streak = 0
+            self.early_streak += 1
+            if self.frameskip and self.early_streak >= self.recover_frames:
+                self.frameskip -= 1
+                self.early_streak = 0
+        else:
+            self.late_frames += 1
+            self.early_streak = 0
+            self.late_streak += 1
+            # 偶发的单帧超时不处理，连续超时才提高跳帧等级
+            if self.late_streak >= 2 and self.frameskip < self.max_frameskip:
+                self.frameskip += 1
+                self.late_streak = 0
+            if -remaining > self.max_lag:
+                # 落后太多：放弃追赶，避免之后连续不等待地狂跑
+                self.deadline = now
+                self.resyncs += 1
+
+        # 绝对时间表：截止时间按固定步长推进，sleep的误差不会累积
+        self.deadline += self.frame_duration
+
+    def get_stats(self) -> Dict:
+        """节拍统计"""
+        return {
+            'frame_rate': round(1.0 / self.frame_duration, 4),
+            'frames': self.frames,
+            'rendered_frames': self.rendered_frames,
+            'late_frames': self.late_frames,
+            'resyncs': self.resyncs,
+            'frameskip': self.frameskip,
+            'fast_forward_frames': self.fast_forward_frames
+        }
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+画面输出后端
+- 软件路径：把NES画面按16x16像素块与上一帧比较，只缩放变化的块到预先分配的目标表面，
+  再用 pygame.display.update(rects) 只提交这些区域；菜单、暂停画面等静止画面几乎没有输出开销
+- SDL2渲染器路径（pygame._sdl2）：每帧把256x240画面上传到纹理一次，由GPU缩放
+两者都按显示分辨率做居中的整数倍缩放，多余部分留黑边
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pygame
+
+try:
+    from pygame._sdl2.video import Window, Renderer, Texture
+except ImportError:
+    Window = Renderer = Texture = None
+
+TILE_SIZE = 16
+
+# 脏块超过这个比例时整帧缩放并提交一个矩形
+FULL_UPDATE_RATIO = 0.6
+
+OVERLAY_COLOR = (255, 0, 255)
+
+
+def integer_scale(display_size: Tuple[int, int], source_size: Tuple[int, int]) -> int:
+    """显示区域能容纳的最大整数缩放倍数（至少为1）"""
+    return max(1, min(display_size[0] // source_size[0], display_size[1] // source_size[1]))
+
+
+def letterbox_rect(display_size: Tuple[int, int], source_size: Tuple[int, int]) -> pygame.Rect:
+    """整数倍缩放后居中显示的目标矩形"""
+    scale = integer_scale(display_size, source_size)
+    width, height = source_size[0] * scale, source_size[1] * scale
+    return pygame.Rect((display_size[0] - width) // 2, (display_size[1] - height) // 2, width, height)
+
+
+def merge_dirty_tiles(mask: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """把脏块掩码合并成矩形 (x, y, w, h)，单位为块
+
+    mask形状为 (行数, 列数)。
+    每行先合并连续的脏块，上下相邻且横向范围相同的段再合并成一个矩形
+    """
+    rects = []
+    open_runs: Dict[Tuple[int, int], List[int]] = {}
+    rows, columns = mask.shape
+    for y in range(rows):
+        row = mask[y]
+        runs = {}
+        x = 0
+        while x < columns:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < columns and row[x]:
+                x += 1
+            span = (start, x)
+            rect = open_runs.get(span)
+            if rect is not None:
+                rect[3] += 1
+            else:
+                rect = [start, y, x - start, 1]
+                rects.append(rect)
+            runs[span] = rect
+        open_runs = runs
+    return [tuple(rect) for rect in rects]
+
+
+class DirtyRectPresenter:
+    """脏矩形输出器"""
+
+    backend = 'software'
+
+    def __init__(self, screen: pygame.Surface, source: pygame.Surface,
+                 tile_size: int = TILE_SIZE, full_update_ratio: float = FULL_UPDATE_RATIO):
+        """
+        Args:
+            screen: 显示表面（缩放倍数和黑边按它的大小计算）
+            source: NES画面表面（每帧在它上面合成画面，需与显示表面同格式）
+            tile_size: 比较块大小，需整除画面宽高
+            full_update_ratio: 脏块比例超过该值时整帧输出
+        """
+        self.source = source
+        self.scale = 1
+        self.tile_size = tile_size
+        self.full_update_ratio = full_update_ratio
+        self.show_dirty = False
+
+        width, height = source.get_size()
+        self.columns = width // tile_size
+        self.rows = height // tile_size
+
+        # 上一帧已输出的像素和比较结果缓冲（与画面表面同格式）
+        self.previous = None
+        self.diff = None
+        self.force_full = True
+        self.overlay_mask = None
+
+        self.screen = None
+        self.target = None
+        self.set_screen(screen)
+
+        self.frames = 0
+        self.idle_frames = 0
+        self.full_frames = 0
+        self.partial_frames = 0
+        self.rect_count = 0
+        self.last_rects: List[pygame.Rect] = []
+
+    def set_screen(self, screen: pygame.Surface):
+        """显示表面改变（如切换全屏）后重新分配目标区域并整帧重画"""
+        self.screen = screen
+        rect = letterbox_rect(screen.get_size(), self.source.get_size())
+        self.scale = rect.width // self.source.get_width()
+        self.target = screen.subsurface(rect)
+        screen.fill((0, 0, 0))
+        self.invalidate()
+
+    def invalidate(self):
+        """下一帧整帧输出（窗口被遮挡后重新显示等）"""
+        self.force_full = True
+
+    def _pixels(self) -> np.ndarray:
+        """画面像素的按行视图；32位表面每两个像素合成一个uint64一起比较"""
+        if self.source.get_bytesize() == 3:
+            return pygame.surfarray.pixels3d(self.source).transpose(1, 0, 2)
+        pixels = pygame.surfarray.pixels2d(self.source).T
+        if pixels.itemsize == 4:
+            try:
+                return pixels.view(np.uint64)
+            except ValueError:
+                pass
+        return pixels
+
+    def _dirty_tiles(self) -> np.ndarray:
+        """比较当前画面与上一帧，返回 (行数, 列数) 的脏块掩码并保存当前画面"""
+        pixels = self._pixels()
+        if self.previous is None or self.previous.shape != pixels.shape:
+            self.previous = np.empty_like(pixels)
+            self.diff = np.empty(pixels.shape, dtype=bool)
+            self.force_full = True
+
+        np.not_equal(pixels, self.previous, out=self.diff)
+        np.copyto(self.previous, pixels)
+        del pixels  # 释放表面锁
+
+        diff = self.diff if self.diff.ndim == 2 else self.diff.any(axis=2)
+        # 分两步按轴归约比一次对两个轴any快得多
+        return diff.reshape(self.rows, self.tile_size, self.columns, -1).max(axis=1).max(axis=2)
+
+    def present(self) -> List[pygame.Rect]:
+        """输出当前画面，返回提交到显示的矩形（屏幕坐标）"""
+        self.frames += 1
+        mask = self._dirty_tiles()
+
+        # 调试框画在屏幕上而不在画面里，下一帧需要把上一帧框住的区域重画
+        if self.overlay_mask is not None:
+            mask |= self.overlay_mask
+            self.overlay_mask = None
+
+        dirty = int(np.count_nonzero(mask))
+        if self.force_full:
+            # 整个窗口（包括黑边）重新提交
+            self.force_full = False
+            self.full_frames += 1
+            pygame.transform.scale(self.source, self.target.get_size(), self.target)
+            pygame.display.update()
+            self.last_rects = [self.screen.get_rect()]
+            return self.last_rects
+        if dirty > self.full_update_ratio * mask.size:
+            self.full_frames += 1
+            pygame.transform.scale(self.source, self.target.get_size(), self.target)
+            tile_rects = [(0, 0, self.columns, self.rows)]
+        elif dirty:
+            self.partial_frames += 1
+            tile_rects = merge_dirty_tiles(mask)
+            size = self.tile_size
+            for x, y, w, h in tile_rects:
+                area = pygame.Rect(x * size, y * size, w * size, h * size)
+                dest = self.target.subsurface((area.x * self.scale, area.y * self.scale,
+                                               area.w * self.scale, area.h * self.scale))
+                pygame.transform.scale(self.source.subsurface(area), dest.get_size(), dest)
+        else:
+            self.idle_frames += 1
+            self.last_rects = []
+            return self.last_rects
+
+        step = self.tile_size * self.scale
+        offset_x, offset_y = self.target.get_abs_offset()
+        rects = [pygame.Rect(offset_x + x * step, offset_y + y * step, w * step, h * step)
+                 for x, y, w, h in tile_rects]
+
+        if self.show_dirty:
+            for rect in rects:
+                pygame.draw.rect(self.screen, OVERLAY_COLOR, rect, 1)
+            self.overlay_mask = np.zeros_like(mask)
+            for x, y, w, h in tile_rects:
+                self.overlay_mask[y:y + h, x:x + w] = True
+
+        pygame.display.update(rects)
+        self.rect_count += len(rects)
+        self.last_rects = rects
+        return rects
+
+    def get_stats(self) -> Dict:
+        """输出统计"""
+        frames = self.frames
+        return {
+            'backend': self.backend,
+            'frames': frames,
+            'idle_frames': self.idle_frames,
+            'partial_frames': self.partial_frames,
+            'full_frames': self.full_frames,
+            'rects_per_frame': round(self.rect_count / frames, 2) if frames else 0.0
+        }
+
+
+class RendererPresenter:
+    """SDL2渲染器输出：画面上传到流式纹理，由渲染器缩放到整数倍的居中区域"""
+
+    backend = 'sdl2'
+
+    def __init__(self, window, renderer, source: pygame.Surface):
+        self.window = window
+        self.renderer = renderer
+        self.source = source
+        self.texture = Texture(renderer, source.get_size(), streaming=True)
+        self.show_dirty = False
+
+        self.dest = letterbox_rect(window.size, source.get_size())
+        self.scale = self.dest.width // source.get_width()
+        renderer.draw_color = (0, 0, 0, 255)
+
+        self.frames = 0
+
+    def invalidate(self):
+        """渲染器每帧整帧输出，无需处理"""
+
+    def present(self):
+        """上传画面并提交"""
+        self.frames += 1
+        self.texture.update(self.source)
+        renderer = self.renderer
+        renderer.clear()
+        self.texture.draw(dstrect=self.dest)
+        renderer.present()
+
+    def get_stats(self) -> Dict:
+        """输出统计"""
+        return {
+            'backend': self.backend,
+            'frames': self.frames,
+            'scale': self.scale
+        }
+
+
+def create_renderer_presenter(source: pygame.Surface, title: str, size: Tuple[int, int],
+                              fullscreen: bool = False, accelerated: int = 1) -> Optional[RendererPresenter]:
+    """创建SDL2渲染器输出，没有（硬件加速的）渲染器时返回None，由调用方退回软件路径
+
+    Args:
+        source: NES画面表面
+        title: 窗口标题
+        size: 窗口模式下的窗口大小
+        fullscreen: 使用桌面分辨率全屏
+        accelerated: 1只接受硬件加速渲染器，-1也接受软件渲染器
+    """
+    if Window is None:
+        print("⚠️ pygame._sdl2不可用，使用软件缩放")
+        return None
+
+    if fullscreen:
+        size = pygame.display.get_desktop_sizes()[0]
+    window = Window(title, size, fullscreen_desktop=fullscreen)
+    try:
+        renderer = Renderer(window, accelerated=accelerated)
+    except Exception as e:
+        print(f"⚠️ 没有可用的硬件加速渲染器（{e}），使用软件缩放")
+        window.destroy()
+        return None
+    return RendererPresenter(window, renderer, source)
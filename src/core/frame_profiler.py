@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+按阶段的帧耗时统计
+run循环的 step_frame 在每个阶段结束时调用 mark（perf_counter_ns 取时间），这里把耗时累计到按2的幂分桶的直方图
+（只做整数运算，每帧开销约1微秒），同时保留最近若干帧用于屏幕上的耗时曲线；
+退出时把整个会话的直方图写成JSON，便于比较不同ROM和不同树莓派型号
+"""
+
+import json
+import platform
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pygame
+
+PHASES = ('handle_events', 'update_controller', 'emulate_frame', 'update_game_logic',
+          'render_game', 'pacer_wait', 'run_ahead')
+
+# 曲线颜色（与PHASES对应），最后一项为背景
+PHASE_COLORS = ((80, 160, 255), (255, 255, 0), (255, 64, 64), (255, 128, 0),
+                (64, 255, 64), (96, 96, 96), (192, 96, 255))
+GRAPH_LUT = np.array(PHASE_COLORS + ((24, 24, 24),), dtype=np.uint8)
+
+# 直方图桶：第i个桶为 [2^(i-1), 2^i) 微秒，第0个桶为不足1微秒
+BUCKETS = 24
+
+GRAPH_FRAMES = 128
+GRAPH_HEIGHT = 40
+
+
+def detect_hardware() -> str:
+    """树莓派型号（读取设备树），其他平台返回处理器架构"""
+    model = Path('/proc/device-tree/model')
+    try:
+        return model.read_text().strip('\x00 \n')
+    except OSError:
+        return platform.machine()
+
+
+class FrameProfiler:
+    """各阶段耗时直方图与最近帧记录"""
+
+    def __init__(self, graph_frames: int = GRAPH_FRAMES):
+        count = len(PHASES)
+        self.histograms: List[List[int]] = [[0] * BUCKETS for _ in range(count)]
+        self.totals = [0] * count
+        self.maxima = [0] * count
+        self.frames = 0
+
+        # 最近graph_frames帧各阶段的耗时（纳秒），按环形缓冲写入
+        self.recent = np.zeros((graph_frames, count), dtype=np.int64)
+        self.recent_index = 0
+        self.current = [0] * count
+        self.last_mark = 0
+
+        self.show_graph = False
+        self.graph_pixels = None
+        self.graph_phase = None
+        self.graph_surface = None
+
+    def start_frame(self):
+        """一帧开始：之后每个阶段的耗时从这里起算"""
+        self.last_mark = time.perf_counter_ns()
+
+    def mark(self, phase: int, elapsed_ns: Optional[int] = None):
+        """一个阶段结束：记录从上一个阶段结束到现在的耗时。
+        给出elapsed_ns时记录这段耗时，并从下一个阶段中扣除（嵌套在其中、单独计时的部分，例如预运行）"""
+        if elapsed_ns is None:
+            now = time.perf_counter_ns()
+            self.record(phase, now - self.last_mark)
+            self.last_mark = now
+        else:
+            self.record(phase, elapsed_ns)
+            self.last_mark += elapsed_ns
+
+    def record(self, phase: int, elapsed_ns: int):
+        """记录一个阶段的耗时"""
+        self.current[phase] += elapsed_ns
+        self.totals[phase] += elapsed_ns
+        if elapsed_ns > self.maxima[phase]:
+            self.maxima[phase] = elapsed_ns
+        bucket = (elapsed_ns // 1000).bit_length()
+        self.histograms[phase][bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+
+    def end_frame(self):
+        """一帧结束：把本帧各阶段耗时写入环形缓冲"""
+        self.frames += 1
+        current = self.current
+        self.recent[self.recent_index] = current
+        self.recent_index = (self.recent_index + 1) % len(self.recent)
+        for i in range(len(current)):
+            current[i] = 0
+
+    def draw_graph(self, surface, position, budget_ns: int = 16_666_667):
+        """在surface上画最近帧的堆叠耗时曲线，图高对应一帧的时间预算"""
+        frames = len(self.recent)
+        if self.graph_pixels is None:
+            self.graph_pixels = np.zeros((frames, GRAPH_HEIGHT, 3), dtype=np.uint8)
+            self.graph_phase = np.zeros((frames, GRAPH_HEIGHT), dtype=np.uint8)
+            self.graph_surface = pygame.Surface((frames, GRAPH_HEIGHT), 0, surface)
+        pixels = self.graph_pixels
+
+        # 按时间顺序排列，最新一帧在最右边
+        recent = np.roll(self.recent, -self.recent_index, axis=0)
+        tops = np.cumsum(recent, axis=1) * GRAPH_HEIGHT // budget_ns
+        # 每个像素所在的阶段 = 顶端不高于该行的阶段数（超过所有阶段即为背景）
+        rows = np.arange(GRAPH_HEIGHT)[None, :]
+        phase = self.graph_phase
+        phase[:] = 0
+        for i in range(len(PHASES)):
+            phase += rows >= tops[:, i, None]
+        np.take(GRAPH_LUT, phase, axis=0, out=pixels)
+        # 超出预算的帧在顶端标红
+        pixels[tops[:, -1] >= GRAPH_HEIGHT, GRAPH_HEIGHT - 1] = (255, 0, 0)
+
+        # 第0行是底部，上下翻转后贴出
+        pygame.surfarray.blit_array(self.graph_surface, pixels[:, ::-1])
+        surface.blit(self.graph_surface, position)
+
+    def get_stats(self) -> Dict:
+        """各阶段平均、最大耗时（毫秒）和直方图"""
+        frames = self.frames or 1
+        phases = {}
+        for i, name in enumerate(PHASES):
+            samples = sum(self.histograms[i])
+            if not samples:
+                continue
+            phases[name] = {
+                'samples': samples,
+                'mean_ms': round(self.totals[i] / samples / 1e6, 4),
+                'per_frame_ms': round(self.totals[i] / frames / 1e6, 4),
+                'max_ms': round(self.maxima[i] / 1e6, 3),
+                'histogram': self.histograms[i]
+            }
+        return {'frames': self.frames, 'phases': phases}
+
+    def write_session(self, path: Path, metadata: Optional[Dict] = None) -> Path:
+        """把本次会话的统计写成JSON"""
+        report = {
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'hardware': detect_hardware(),
+            'python': platform.python_version(),
+            'bucket_edges_us': [0] + [1 << i for i in range(BUCKETS - 1)],
+        }
+        report.update(metadata or {})
+        report.update(self.get_stats())
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        return path
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+游戏过程中的垃圾回收策略
+启动完成后整体回收一次并 gc.freeze()，把启动期间创建的对象移出回收范围；
+游戏进行时关闭自动的第2代回收（第0/1代照常），只在暂停或选择ROM时手动整体回收；
+长时间不暂停时，第1代回收次数或内存块增长超过上限也会整体回收一次，避免存活对象无限堆积；
+通过 gc.callbacks 统计每代回收次数和停顿时间，按帧统计内存块净增长
+"""
+
+import gc
+import sys
+import time
+from typing import Callable, Dict
+
+# 第2代阈值设为极大值即关闭自动的第2代回收（阈值为0反而会每次都回收）
+GEN2_DISABLED_THRESHOLD = 1 << 30
+
+# 保护性整体回收的上限：上次整体回收后的第1代回收次数（默认第2代阈值为10）和内存块净增长
+SAFETY_GEN1_COLLECTIONS = 100
+SAFETY_HEAP_GROWTH_BLOCKS = 1 << 20
+
+
+class GCPolicy:
+    """垃圾回收策略与统计"""
+
+    def __init__(self, enabled: bool = True, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            enabled: False时保持Python默认的回收行为，只做统计
+            clock: 计时函数
+        """
+        self.enabled = enabled
+        self.clock = clock
+        self.active = False
+        self.collecting = False
+        self.saved_threshold = None
+
+        self.frames = 0
+        self.collections = [0, 0, 0]
+        self.pause_time = [0.0, 0.0, 0.0]
+        self.max_pause = 0.0
+        self.manual_collections = 0
+        self.safety_collections = 0
+        self.safety_gen1_collections = SAFETY_GEN1_COLLECTIONS
+        self.safety_heap_growth = SAFETY_HEAP_GROWTH_BLOCKS
+        self.frozen_objects = 0
+        self.alloc_blocks = 0
+        self.last_blocks = 0
+        self.collected_blocks = 0
+        self._collect_start = 0.0
+
+    def _on_gc(self, phase: str, info: Dict):
+        """gc.callbacks回调：记录游戏过程中每次自动回收的停顿时间"""
+        if self.collecting:
+            return
+        if phase == 'start':
+            self._collect_start = self.clock()
+            return
+        pause = self.clock() - self._collect_start
+        generation = info['generation']
+        self.collections[generation] += 1
+        self.pause_time[generation] += pause
+        if pause > self.max_pause:
+            self.max_pause = pause
+
+    def start_session(self):
+        """启动完成、进入游戏前调用"""
+        if self.active:
+            return
+        self.active = True
+        if self.enabled:
+            gc.collect()
+            gc.freeze()
+            self.frozen_objects = gc.get_freeze_count()
+            self.saved_threshold = gc.get_threshold()
+            threshold0, threshold1, _ = self.saved_threshold
+            gc.set_threshold(threshold0, threshold1, GEN2_DISABLED_THRESHOLD)
+        gc.callbacks.append(self._on_gc)
+        self.last_blocks = self.collected_blocks = sys.getallocatedblocks()
+
+    def collect(self):
+        """暂停或选择ROM时手动整体回收"""
+        if self.active and self.enabled:
+            self.manual_collections += 1
+            # 手动回收不在游戏进行中，不计入停顿统计
+            self.collecting = True
+            try:
+                gc.collect()
+            finally:
+                self.collecting = False
+            # 回收释放的块不计入游戏时的分配
+            self.last_blocks = self.collected_blocks = sys.getallocatedblocks()
+
+    def frame(self):
+        """每帧调用一次，累计内存块的净增长，超过上限时做保护性整体回收"""
+        self.frames += 1
+        blocks = sys.getallocatedblocks()
+        if blocks > self.last_blocks:
+            self.alloc_blocks += blocks - self.last_blocks
+        self.last_blocks = blocks
+        if self.saved_threshold is not None and (
+                gc.get_count()[2] >= self.safety_gen1_collections or
+                blocks - self.collected_blocks >= self.safety_heap_growth):
+            # 发生在游戏进行中，停顿照常由回调计入第2代
+            self.safety_collections += 1
+            gc.collect()
+            self.last_blocks = self.collected_blocks = sys.getallocatedblocks()
+
+    def end_session(self):
+        """退出游戏时恢复默认回收设置"""
+        if not self.active:
+            return
+        self.active = False
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        if self.saved_threshold is not None:
+            gc.set_threshold(*self.saved_threshold)
+            gc.unfreeze()
+            self.saved_threshold = None
+
+    def get_stats(self) -> Dict:
+        """本次会话的回收统计（停顿时间单位为毫秒）"""
+        frames = self.frames or 1
+        return {
+            'policy': 'gen2_on_pause' if self.enabled else 'default',
+            'frames': self.frames,
+            'frozen_objects': self.frozen_objects,
+            'collections': {f'gen{i}': count for i, count in enumerate(self.collections)},
+            'manual_collections': self.manual_collections,
+            'safety_collections': self.safety_collections,
+            'collections_per_frame': round(sum(self.collections) / frames, 4),
+            'pause_ms_per_frame': round(sum(self.pause_time) * 1000 / frames, 4),
+            'max_pause_ms': round(self.max_pause * 1000, 3),
+            'alloc_blocks_per_frame': round(self.alloc_blocks / frames, 2)
+        }
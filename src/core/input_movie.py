@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+输入录像
+逐帧记录手柄状态（每个端口每帧1字节，位顺序同 CONTROLLER_BUTTONS），
+连同ROM的SHA-1和开始录制时的内存快照一起写成紧凑的二进制文件。
+回放时恢复快照、逐帧送入同样的输入，模拟结果与录制时完全一致，
+因此同一个录像可以作为不同版本之间可重复的性能测试负载
+"""
+
+import hashlib
+import struct
+from pathlib import Path
+from typing import Optional
+
+MOVIE_MAGIC = b'NESM'
+MOVIE_VERSION = 1
+
+# 文件头：标识、版本、端口数、ROM SHA-1、帧数、开始快照长度；其后是快照和逐帧输入
+MOVIE_HEADER = struct.Struct('<4sHB20sII')
+
+
+def rom_hash(rom_data: bytes) -> bytes:
+    """整个ROM文件的SHA-1"""
+    return hashlib.sha1(rom_data).digest()
+
+
+class InputMovie:
+    """一段输入录像"""
+
+    def __init__(self, rom_sha1: bytes, start_state: bytes, ports: int = 2):
+        """
+        Args:
+            rom_sha1: 录制时ROM的SHA-1
+            start_state: 开始录制时 capture_state() 的快照
+            ports: 手柄端口数
+        """
+        self.rom_sha1 = rom_sha1
+        self.start_state = bytes(start_state)
+        self.ports = ports
+        self.inputs = bytearray()
+
+    def __len__(self) -> int:
+        """帧数"""
+        return len(self.inputs) // self.ports
+
+    def record(self, port0: int, port1: int = 0):
+        """追加一帧的手柄状态"""
+        self.inputs.append(port0 & 0xFF)
+        if self.ports > 1:
+            self.inputs.append(port1 & 0xFF)
+
+    def frame(self, index: int) -> bytes:
+        """第index帧各端口的手柄状态"""
+        start = index * self.ports
+        return self.inputs[start:start + self.ports]
+
+    def save(self, path) -> Path:
+        """写入录像文件"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = MOVIE_HEADER.pack(MOVIE_MAGIC, MOVIE_VERSION, self.ports, self.rom_sha1,
+                                   len(self), len(self.start_state))
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(self.start_state)
+            f.write(self.inputs)
+        return path
+
+    @classmethod
+    def load(cls, path) -> 'InputMovie':
+        """读取录像文件，格式不对时抛出ValueError"""
+        data = Path(path).read_bytes()
+        if len(data) < MOVIE_HEADER.size:
+            raise ValueError("录像文件太小")
+        magic, version, ports, sha1, frames, state_size = MOVIE_HEADER.unpack_from(data)
+        if magic != MOVIE_MAGIC:
+            raise ValueError("不是输入录像文件")
+        if version != MOVIE_VERSION:
+            raise ValueError(f"不支持的录像版本: {version}")
+        start = MOVIE_HEADER.size
+        if len(data) != start + state_size + frames * ports:
+            raise ValueError("录像文件长度与文件头不符")
+        movie = cls(sha1, data[start:start + state_size], ports)
+        movie.inputs[:] = data[start + state_size:]
+        return movie
+
+    def check_rom(self, rom_data: Optional[bytes]):
+        """确认当前ROM与录制时相同，不同时抛出ValueError"""
+        if rom_data is None or rom_hash(rom_data) != self.rom_sha1:
+            raise ValueError("录像与当前ROM不匹配")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+静态图层合成器
+背景网格、HUD边框、控制提示等不变的内容只绘制一次并缓存为Surface，
+每帧用一次 Surface.blits 整体贴上；图层内容变化时调用invalidate，下次使用前重建
+"""
+
+from typing import Callable, Dict, Iterable, Tuple
+
+import pygame
+
+
+class Layer:
+    """一个缓存图层"""
+
+    def __init__(self, builder: Callable[[], pygame.Surface], position: Tuple[int, int]):
+        self.builder = builder
+        self.position = position
+        self.surface = None
+        self.dirty = True
+
+
+class LayerCompositor:
+    """静态图层缓存与合成"""
+
+    def __init__(self):
+        self.layers: Dict[str, Layer] = {}
+        self.builds = 0
+        self.blits = 0
+
+    def add_layer(self, name: str, builder: Callable[[], pygame.Surface],
+                  position: Tuple[int, int] = (0, 0)):
+        """注册图层；builder返回绘制好的Surface，只在图层失效后调用"""
+        self.layers[name] = Layer(builder, position)
+
+    def invalidate(self, name: str = None):
+        """标记图层需要重建，name为None时全部重建"""
+        if name is None:
+            for layer in self.layers.values():
+                layer.dirty = True
+        else:
+            self.layers[name].dirty = True
+
+    def get(self, name: str) -> pygame.Surface:
+        """返回图层Surface，失效时先重建"""
+        layer = self.layers[name]
+        if layer.dirty:
+            layer.surface = layer.builder()
+            layer.dirty = False
+            self.builds += 1
+        return layer.surface
+
+    def compose(self, target: pygame.Surface, names: Iterable[str]):
+        """按顺序把图层一次性贴到target上"""
+        layers = self.layers
+        sequence = [(self.get(name), layers[name].position) for name in names]
+        if sequence:
+            target.blits(sequence, doreturn=False)
+            self.blits += len(sequence)
+
+    def get_stats(self) -> Dict:
+        """图层统计"""
+        return {
+            'layers': len(self.layers),
+            'builds': self.builds,
+            'blits': self.blits
+        }
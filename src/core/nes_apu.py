@@ -0,0 +1,747 @@
+#!/usr/bin/env python3
+"""
+NES APU（2A03音频）
+两个方波、三角波、噪声和DMC通道。寄存器写入时先把音频“追赶”到写入的CPU周期，
+两次写入之间参数不变的一段样本用NumPy一次性合成；
+AudioStream 通过少量可复用的Sound缓冲把样本送入pygame.mixer
+"""
+
+import os
+import struct
+import sys
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+try:
+    import pygame
+except ImportError:
+    pygame = None
+
+try:
+    from nes_cpu import CPU_FREQUENCY
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from nes_cpu import CPU_FREQUENCY
+
+SAMPLE_RATE = 44100
+
+LENGTH_TABLE = [
+    10, 254, 20, 2, 40, 4, 80, 6, 160, 8, 60, 10, 14, 12, 26, 14,
+    12, 16, 24, 18, 48, 20, 96, 22, 192, 24, 72, 26, 16, 28, 32, 30
+]
+
+DUTY_TABLE = np.array([
+    [0, 1, 0, 0, 0, 0, 0, 0],
+    [0, 1, 1, 0, 0, 0, 0, 0],
+    [0, 1, 1, 1, 1, 0, 0, 0],
+    [1, 0, 0, 1, 1, 1, 1, 1]
+], dtype=np.int32)
+
+TRIANGLE_TABLE = np.array(list(range(15, -1, -1)) + list(range(16)), dtype=np.int32)
+
+# 噪声和DMC的周期（CPU周期，NTSC）
+NOISE_PERIODS = [4, 8, 16, 32, 64, 96, 128, 160, 202, 254, 380, 508, 762, 1016, 2034, 4068]
+DMC_PERIODS = [428, 380, 340, 320, 286, 254, 226, 214, 190, 160, 142, 128, 106, 84, 72, 54]
+
+# 帧计数器步进点（CPU周期）
+FRAME_STEPS_4 = (7457, 14913, 22371, 29829)
+FRAME_STEPS_5 = (7457, 14913, 22371, 29829, 37281)
+
+# 非线性混音查找表
+PULSE_MIX = np.array([0.0] + [95.52 / (8128.0 / n + 100) for n in range(1, 31)], dtype=np.float32)
+TND_MIX = np.array([0.0] + [163.67 / (24329.0 / n + 100) for n in range(1, 203)], dtype=np.float32)
+
+
+def _build_noise_sequence(tap: int) -> np.ndarray:
+    """生成噪声LFSR的一个完整周期（1表示输出音量）"""
+    shift = 1
+    output = []
+    while True:
+        output.append(1 - (shift & 1))
+        feedback = (shift ^ (shift >> tap)) & 1
+        shift = (shift >> 1) | (feedback << 14)
+        if shift == 1:
+            break
+    return np.array(output, dtype=np.int32)
+
+
+NOISE_SEQUENCES = (_build_noise_sequence(1), _build_noise_sequence(6))
+
+
+class Envelope:
+    """方波/噪声共用的音量包络"""
+
+    # 快照字段及其struct格式（APU.save_state按顺序拼接各通道）
+    STATE_FIELDS = ('loop', 'constant', 'period', 'start', 'divider', 'decay')
+    STATE_FORMAT = '??B?BB'
+
+    def __init__(self):
+        self.loop = False
+        self.constant = False
+        self.period = 0
+        self.start = False
+        self.divider = 0
+        self.decay = 0
+
+    def write(self, value: int):
+        self.loop = bool(value & 0x20)
+        self.constant = bool(value & 0x10)
+        self.period = value & 0x0F
+
+    def clock(self):
+        if self.start:
+            self.start = False
+            self.decay = 15
+            self.divider = self.period
+        elif self.divider:
+            self.divider -= 1
+        else:
+            self.divider = self.period
+            if self.decay:
+                self.decay -= 1
+            elif self.loop:
+                self.decay = 15
+
+    @property
+    def volume(self) -> int:
+        return self.period if self.constant else self.decay
+
+
+class PulseChannel:
+    """方波通道"""
+
+    STATE_FIELDS = ('enabled', 'duty', 'length', 'timer', 'phase', 'sweep_enabled', 'sweep_period',
+                    'sweep_negate', 'sweep_shift', 'sweep_reload', 'sweep_divider')
+    STATE_FORMAT = '?BBHd?B?B?B'
+
+    def __init__(self, ones_complement: bool):
+        self.ones_complement = ones_complement
+        self.enabled = False
+        self.duty = 0
+        self.envelope = Envelope()
+        self.length = 0
+        self.timer = 0
+        self.phase = 0.0
+        self.sweep_enabled = False
+        self.sweep_period = 0
+        self.sweep_negate = False
+        self.sweep_shift = 0
+        self.sweep_reload = False
+        self.sweep_divider = 0
+
+    def write(self, register: int, value: int):
+        if register == 0:
+            self.duty = value >> 6
+            self.envelope.write(value)
+        elif register == 1:
+            self.sweep_enabled = bool(value & 0x80)
+            self.sweep_period = (value >> 4) & 7
+            self.sweep_negate = bool(value & 0x08)
+            self.sweep_shift = value & 7
+            self.sweep_reload = True
+        elif register == 2:
+            self.timer = (self.timer & 0x700) | value
+        else:
+            self.timer = (self.timer & 0xFF) | ((value & 7) << 8)
+            if self.enabled:
+                self.length = LENGTH_TABLE[value >> 3]
+            self.phase = 0.0
+            self.envelope.start = True
+
+    def _sweep_target(self) -> int:
+        change = self.timer >> self.sweep_shift
+        if self.sweep_negate:
+            return self.timer - change - (1 if self.ones_complement else 0)
+        return self.timer + change
+
+    def clock_half(self):
+        """半帧：长度计数器与频率扫描"""
+        if self.length and not self.envelope.loop:
+            self.length -= 1
+        target = self._sweep_target()
+        if self.sweep_divider == 0 and self.sweep_enabled and self.sweep_shift and \
+                self.timer >= 8 and target <= 0x7FF:
+            self.timer = max(0, target)
+        if self.sweep_divider == 0 or self.sweep_reload:
+            self.sweep_divider = self.sweep_period
+            self.sweep_reload = False
+        else:
+            self.sweep_divider -= 1
+
+    def render(self, offsets: np.ndarray, cycles: int, out: np.ndarray):
+        """把 offsets（相对段起点的CPU周期）处的输出写入out"""
+        # 定序器每 2*(timer+1) 个CPU周期前进一步
+        rate = 1.0 / (2 * (self.timer + 1))
+        volume = self.envelope.volume
+        if self.length and volume and self.timer >= 8 and self._sweep_target() <= 0x7FF:
+            steps = (self.phase + offsets * rate).astype(np.int32) & 7
+            np.multiply(DUTY_TABLE[self.duty][steps], volume, out=out)
+        else:
+            out[:] = 0
+        self.phase = (self.phase + cycles * rate) % 8.0
+
+
+class TriangleChannel:
+    """三角波通道"""
+
+    STATE_FIELDS = ('enabled', 'control', 'linear_reload_value', 'linear', 'linear_reload',
+                    'length', 'timer', 'phase')
+    STATE_FORMAT = '??BB?BHd'
+
+    def __init__(self):
+        self.enabled = False
+        self.control = False
+        self.linear_reload_value = 0
+        self.linear = 0
+        self.linear_reload = False
+        self.length = 0
+        self.timer = 0
+        self.phase = 0.0
+
+    def write(self, register: int, value: int):
+        if register == 0:
+            self.control = bool(value & 0x80)
+            self.linear_reload_value = value & 0x7F
+        elif register == 2:
+            self.timer = (self.timer & 0x700) | value
+        elif register == 3:
+            self.timer = (self.timer & 0xFF) | ((value & 7) << 8)
+            if self.enabled:
+                self.length = LENGTH_TABLE[value >> 3]
+            self.linear_reload = True
+
+    def clock_quarter(self):
+        if self.linear_reload:
+            self.linear = self.linear_reload_value
+        elif self.linear:
+            self.linear -= 1
+        if not self.control:
+            self.linear_reload = False
+
+    def clock_half(self):
+        if self.length and not self.control:
+            self.length -= 1
+
+    def render(self, offsets: np.ndarray, cycles: int, out: np.ndarray):
+        # 超声频率（timer<2）时保持当前输出，避免爆音
+        if self.length and self.linear and self.timer >= 2:
+            rate = 1.0 / (self.timer + 1)
+            steps = (self.phase + offsets * rate).astype(np.int32) & 31
+            np.take(TRIANGLE_TABLE, steps, out=out)
+            self.phase = (self.phase + cycles * rate) % 32.0
+        else:
+            out[:] = TRIANGLE_TABLE[int(self.phase) & 31]
+
+
+class NoiseChannel:
+    """噪声通道"""
+
+    STATE_FIELDS = ('enabled', 'mode', 'period', 'length', 'phase')
+    STATE_FORMAT = '?BHBd'
+
+    def __init__(self):
+        self.enabled = False
+        self.envelope = Envelope()
+        self.mode = 0
+        self.period = NOISE_PERIODS[0]
+        self.length = 0
+        self.phase = 0.0
+
+    def write(self, register: int, value: int):
+        if register == 0:
+            self.envelope.write(value)
+        elif register == 2:
+            self.mode = (value >> 7) & 1
+            self.period = NOISE_PERIODS[value & 0x0F]
+        elif register == 3:
+            if self.enabled:
+                self.length = LENGTH_TABLE[value >> 3]
+            self.envelope.start = True
+
+    def clock_half(self):
+        if self.length and not self.envelope.loop:
+            self.length -= 1
+
+    def render(self, offsets: np.ndarray, cycles: int, out: np.ndarray):
+        sequence = NOISE_SEQUENCES[self.mode]
+        volume = self.envelope.volume
+        if self.length and volume:
+            steps = (self.phase + offsets / self.period).astype(np.int64) % len(sequence)
+            np.multiply(sequence[steps], volume, out=out)
+        else:
+            out[:] = 0
+        self.phase = (self.phase + cycles / self.period) % len(NOISE_SEQUENCES[0])
+
+
+class DMCChannel:
+    """增量调制通道（从CPU地址空间读取1位增量样本）"""
+
+    # 样本缓冲 buffer 可能为None，由APU单独保存
+    STATE_FIELDS = ('irq_enabled', 'loop', 'period', 'level', 'sample_address', 'sample_length',
+                    'address', 'remaining', 'shift', 'bits', 'silence', 'counter', 'irq')
+    STATE_FORMAT = '??HBHHHHBB?d?'
+
+    def __init__(self, read: Callable):
+        self.read = read
+        self.irq_enabled = False
+        self.loop = False
+        self.period = DMC_PERIODS[0]
+        self.level = 0
+        self.sample_address = 0xC000
+        self.sample_length = 1
+        self.address = 0xC000
+        self.remaining = 0
+        self.shift = 0
+        self.bits = 8
+        self.silence = True
+        self.buffer = None
+        self.counter = 0.0
+        self.irq = False
+
+    def write(self, register: int, value: int):
+        if register == 0:
+            self.irq_enabled = bool(value & 0x80)
+            self.loop = bool(value & 0x40)
+            self.period = DMC_PERIODS[value & 0x0F]
+            if not self.irq_enabled:
+                self.irq = False
+        elif register == 1:
+            self.level = value & 0x7F
+        elif register == 2:
+            self.sample_address = 0xC000 + value * 64
+        else:
+            self.sample_length = value * 16 + 1
+
+    def restart(self):
+        self.address = self.sample_address
+        self.remaining = self.sample_length
+
+    def _fetch(self):
+        if self.buffer is None and self.remaining:
+            self.buffer = self.read(self.address)
+            self.address = 0x8000 if self.address == 0xFFFF else self.address + 1
+            self.remaining -= 1
+            if not self.remaining:
+                if self.loop:
+                    self.restart()
+                elif self.irq_enabled:
+                    self.irq = True
+
+    @property
+    def active(self) -> bool:
+        return bool(self.remaining) or self.buffer is not None or not self.silence
+
+    def render(self, offsets: np.ndarray, cycles: int, out: np.ndarray):
+        if not self.active:
+            out[:] = self.level
+            return
+
+        # 逐位推进输出单元，只在段内的位时钟上循环
+        ticks = int((self.counter + cycles) // self.period)
+        levels = np.empty(ticks + 1, dtype=np.int32)
+        levels[0] = self.level
+        for tick in range(1, ticks + 1):
+            self._fetch()
+            if not self.silence:
+                if self.shift & 1:
+                    if self.level <= 125:
+                        self.level += 2
+                elif self.level >= 2:
+                    self.level -= 2
+            self.shift >>= 1
+            self.bits -= 1
+            if self.bits == 0:
+                self.bits = 8
+                if self.buffer is None:
+                    self.silence = True
+                else:
+                    self.silence = False
+                    self.shift = self.buffer
+                    self.buffer = None
+            levels[tick] = self.level
+        positions = ((self.counter + offsets) // self.period).astype(np.intp)
+        np.take(levels, np.minimum(positions, ticks), out=out)
+        self.counter = (self.counter + cycles) - ticks * self.period
+
+
+class APU:
+    """2A03音频处理单元
+
+    ``run_until(cycle)`` 合成到指定CPU周期为止的样本，
+    ``end_frame(cycle)`` 返回本帧的int16样本（预分配缓冲的视图）
+    """
+
+    STATE_FIELDS = ('five_step', 'irq_inhibit', 'frame_irq', 'frame_origin', 'frame_step',
+                    'irq_asserted', 'cycle', 'next_sample', 'dc_level')
+    STATE_FORMAT = '???qB?qdd'
+
+    def __init__(self, bus, sample_rate: int = SAMPLE_RATE):
+        """初始化通道和样本缓冲"""
+        self.bus = bus
+        self.sample_rate = sample_rate
+        self.cycles_per_sample = CPU_FREQUENCY / sample_rate
+
+        self.pulse1 = PulseChannel(ones_complement=True)
+        self.pulse2 = PulseChannel(ones_complement=False)
+        self.triangle = TriangleChannel()
+        self.noise = NoiseChannel()
+        self.dmc = DMCChannel(bus.read)
+
+        # 帧计数器
+        self.five_step = False
+        self.irq_inhibit = False
+        self.frame_irq = False
+        self.frame_origin = 0
+        self.frame_step = 0
+        self.irq_asserted = False
+        self.irq_callback: Callable = lambda asserted: None
+
+        # 合成状态
+        self.cycle = 0
+        self.next_sample = 0.0
+        self.volume = 0.8
+        self.dc_level = 0.0
+
+        # 预分配缓冲：两帧的样本量足够容纳任何一帧
+        capacity = int(sample_rate / 30) + 16
+        self.frame_samples = np.zeros(capacity, dtype=np.float32)
+        self.output = np.zeros(capacity, dtype=np.int16)
+        self.sample_count = 0
+        self._offsets = np.zeros(capacity, dtype=np.float64)
+        self._channel_out = np.zeros((5, capacity), dtype=np.int32)
+        self._sample_index = np.arange(capacity, dtype=np.float64)
+
+        self.stats = {'segments': 0, 'frames': 0}
+
+        # 快照：帧计数器、各通道及其包络的字段按固定顺序打包，最后是DMC样本缓冲（-1表示空）
+        self._state_objects = (self, self.pulse1, self.pulse1.envelope, self.pulse2,
+                               self.pulse2.envelope, self.triangle, self.noise,
+                               self.noise.envelope, self.dmc)
+        self._state_struct = struct.Struct(
+            '<' + ''.join(obj.STATE_FORMAT for obj in self._state_objects) + 'h')
+        self.state_size = self._state_struct.size
+
+    # ------------------------------------------------------------------
+    # 寄存器
+    # ------------------------------------------------------------------
+
+    def _cpu_cycle(self) -> int:
+        cpu = self.bus.cpu
+        return cpu.cycles if cpu is not None else self.cycle
+
+    def write_register(self, address: int, value: int):
+        """写入$4000-$4017（$4014/$4016除外）"""
+        self.run_until(self._cpu_cycle())
+        if address < 0x4004:
+            self.pulse1.write(address & 3, value)
+        elif address < 0x4008:
+            self.pulse2.write(address & 3, value)
+        elif address < 0x400C:
+            self.triangle.write(address & 3, value)
+        elif address < 0x4010:
+            self.noise.write(address & 3, value)
+        elif address < 0x4014:
+            self.dmc.write(address & 3, value)
+        elif address == 0x4015:
+            self._write_status(value)
+        elif address == 0x4017:
+            self._write_frame_counter(value)
+
+    def _write_status(self, value: int):
+        channels = (self.pulse1, self.pulse2, self.triangle, self.noise)
+        for bit, channel in enumerate(channels):
+            channel.enabled = bool(value & (1 << bit))
+            if not channel.enabled:
+                channel.length = 0
+        self.dmc.irq = False
+        if value & 0x10:
+            if not self.dmc.remaining:
+                self.dmc.restart()
+        else:
+            self.dmc.remaining = 0
+        self._update_irq()
+
+    def _write_frame_counter(self, value: int):
+        self.five_step = bool(value & 0x80)
+        self.irq_inhibit = bool(value & 0x40)
+        if self.irq_inhibit:
+            self.frame_irq = False
+        self.frame_origin = self.cycle
+        self.frame_step = 0
+        if self.five_step:
+            self._clock_quarter()
+            self._clock_half()
+        self._update_irq()
+
+    def read_status(self) -> int:
+        """读取$4015"""
+        self.run_until(self._cpu_cycle())
+        value = 0
+        for bit, channel in enumerate((self.pulse1, self.pulse2, self.triangle, self.noise)):
+            if channel.length:
+                value |= 1 << bit
+        if self.dmc.remaining:
+            value |= 0x10
+        if self.frame_irq:
+            value |= 0x40
+        if self.dmc.irq:
+            value |= 0x80
+        self.frame_irq = False
+        self._update_irq()
+        return value
+
+    def _update_irq(self):
+        asserted = self.frame_irq or self.dmc.irq
+        if asserted != self.irq_asserted:
+            self.irq_asserted = asserted
+            self.irq_callback(asserted)
+
+    # ------------------------------------------------------------------
+    # 状态快照
+    # ------------------------------------------------------------------
+
+    def save_state(self) -> bytes:
+        """帧计数器和全部通道的状态（在帧边界调用，本帧样本已取走）"""
+        values = [getattr(obj, name) for obj in self._state_objects for name in obj.STATE_FIELDS]
+        values.append(-1 if self.dmc.buffer is None else self.dmc.buffer)
+        return self._state_struct.pack(*values)
+
+    def load_state(self, data):
+        """从 save_state() 的快照恢复"""
+        values = self._state_struct.unpack(data)
+        index = 0
+        for obj in self._state_objects:
+            for name in obj.STATE_FIELDS:
+                setattr(obj, name, values[index])
+                index += 1
+        self.dmc.buffer = None if values[index] < 0 else values[index]
+        self.sample_count = 0
+
+    # ------------------------------------------------------------------
+    # 帧计数器
+    # ------------------------------------------------------------------
+
+    def _clock_quarter(self):
+        self.pulse1.envelope.clock()
+        self.pulse2.envelope.clock()
+        self.noise.envelope.clock()
+        self.triangle.clock_quarter()
+
+    def _clock_half(self):
+        self.pulse1.clock_half()
+        self.pulse2.clock_half()
+        self.triangle.clock_half()
+        self.noise.clock_half()
+
+    def _next_frame_event(self) -> int:
+        steps = FRAME_STEPS_5 if self.five_step else FRAME_STEPS_4
+        return self.frame_origin + steps[self.frame_step]
+
+    def next_irq_cycle(self) -> Optional[int]:
+        """预测下一次帧IRQ的CPU周期，不会产生时返回None"""
+        if self.five_step or self.irq_inhibit or self.frame_irq:
+            return None
+        return self.frame_origin + FRAME_STEPS_4[3]
+
+    def _clock_frame_counter(self):
+        step = self.frame_step
+        if self.five_step:
+            if step != 3:
+                self._clock_quarter()
+            if step in (1, 4):
+                self._clock_half()
+            last = 4
+        else:
+            self._clock_quarter()
+            if step in (1, 3):
+                self._clock_half()
+            if step == 3 and not self.irq_inhibit:
+                self.frame_irq = True
+                self._update_irq()
+            last = 3
+        if step == last:
+            self.frame_origin = self._next_frame_event() + 1
+            self.frame_step = 0
+        else:
+            self.frame_step += 1
+
+    # ------------------------------------------------------------------
+    # 合成
+    # ------------------------------------------------------------------
+
+    def run_until(self, cycle: int):
+        """合成到指定CPU周期，途中处理帧计数器事件"""
+        while self.cycle < cycle:
+            event = self._next_frame_event()
+            end = min(cycle, event)
+            self._synthesize(end)
+            if end == event:
+                self._clock_frame_counter()
+        if self.dmc.irq:
+            self._update_irq()
+
+    def _synthesize(self, end: int):
+        """合成 [self.cycle, end) 区间内的样本，区间内各通道参数不变"""
+        start = self.cycle
+        cycles = end - start
+        if cycles <= 0:
+            return
+        count = 0
+        if self.next_sample < end:
+            count = int((end - self.next_sample + self.cycles_per_sample - 1e-9) // self.cycles_per_sample)
+            count = min(count, len(self.frame_samples) - self.sample_count)
+
+        offsets = self._offsets[:count]
+        np.multiply(self._sample_index[:count], self.cycles_per_sample, out=offsets)
+        offsets += self.next_sample - start
+
+        out = self._channel_out[:, :count]
+        self.pulse1.render(offsets, cycles, out[0])
+        self.pulse2.render(offsets, cycles, out[1])
+        self.triangle.render(offsets, cycles, out[2])
+        self.noise.render(offsets, cycles, out[3])
+        self.dmc.render(offsets, cycles, out[4])
+
+        if count:
+            pulse = PULSE_MIX[out[0] + out[1]]
+            tnd = TND_MIX[3 * out[2] + 2 * out[3] + out[4]]
+            np.add(pulse, tnd, out=self.frame_samples[self.sample_count:self.sample_count + count])
+            self.sample_count += count
+            self.next_sample += count * self.cycles_per_sample
+
+        self.cycle = end
+        self.stats['segments'] += 1
+
+    def end_frame(self, cycle: int) -> np.ndarray:
+        """结束一帧：返回本帧的int16样本（下一帧会被覆盖）"""
+        self.run_until(cycle)
+        count = self.sample_count
+        samples = self.frame_samples[:count]
+        if count:
+            # 用帧平均值的指数滑动平均去除直流分量
+            self.dc_level += (float(samples.mean()) - self.dc_level) * 0.2
+            samples -= self.dc_level
+            samples *= 32767 * self.volume
+            np.clip(samples, -32768, 32767, out=samples)
+        output = self.output[:count]
+        output[:] = samples
+        self.sample_count = 0
+        self.stats['frames'] += 1
+        return output
+
+    def get_stats(self) -> Dict:
+        """合成统计"""
+        frames = max(1, self.stats['frames'])
+        return {
+            'sample_rate': self.sample_rate,
+            'frames': self.stats['frames'],
+            'segments_per_frame': round(self.stats['segments'] / frames, 2)
+        }
+
+
+class AudioStream:
+    """把APU样本通过固定数量的可复用Sound缓冲送入pygame.mixer
+
+    一个专用声道同时最多持有两个缓冲（播放中+排队中），第三个用于填充；
+    样本先进入FIFO，每次 ``pump()`` 在排队位空出时填充下一块
+    """
+
+    def __init__(self, chunk_size: int = 1024, buffer_count: int = 3, max_chunks: int = 4):
+        """创建Sound缓冲（调用前pygame.mixer必须已初始化）"""
+        frequency, size, channels = pygame.mixer.get_init()
+        self.sample_rate = frequency
+        self.channels = channels
+        self.chunk_size = chunk_size
+
+        shape = (chunk_size, channels) if channels > 1 else (chunk_size,)
+        self.sounds = [pygame.sndarray.make_sound(np.zeros(shape, dtype=np.int16))
+                       for _ in range(buffer_count)]
+        self.buffers = [pygame.sndarray.samples(sound) for sound in self.sounds]
+        self.next_buffer = 0
+
+        pygame.mixer.set_reserved(1)
+        self.channel = pygame.mixer.Channel(0)
+
+        self.fifo = np.zeros(chunk_size * max_chunks, dtype=np.int16)
+        self.fifo_length = 0
+        self.last_sample = 0
+        self.started = False
+        self.underruns = 0
+        self.dropped_samples = 0
+
+    def push(self, samples: np.ndarray):
+        """追加一帧样本；积压超过上限时丢弃最旧的样本"""
+        count = len(samples)
+        capacity = len(self.fifo)
+        if count >= capacity:
+            self.dropped_samples += self.fifo_length + count - capacity
+            self.fifo[:] = samples[-capacity:]
+            self.fifo_length = capacity
+            return
+        overflow = self.fifo_length + count - capacity
+        if overflow > 0:
+            self.fifo[:self.fifo_length - overflow] = self.fifo[overflow:self.fifo_length]
+            self.fifo_length -= overflow
+            self.dropped_samples += overflow
+        self.fifo[self.fifo_length:self.fifo_length + count] = samples
+        self.fifo_length += count
+
+    def pump(self):
+        """声道的排队位空出时填充并排入下一个缓冲"""
+        for _ in range(2):
+            if self.channel.get_queue() is not None:
+                return
+            busy = self.channel.get_busy()
+            if self.fifo_length < self.chunk_size:
+                if busy or not self.started:
+                    return
+                # 声道已经播空：用现有样本补齐，避免静音断流
+                self.underruns += 1
+            self._queue_next()
+
+    def _queue_next(self):
+        buffer = self.buffers[self.next_buffer]
+        sound = self.sounds[self.next_buffer]
+        self.next_buffer = (self.next_buffer + 1) % len(self.sounds)
+
+        count = min(self.fifo_length, self.chunk_size)
+        if count:
+            self.last_sample = int(self.fifo[count - 1])
+        chunk = buffer if self.channels == 1 else buffer.T
+        chunk[..., :count] = self.fifo[:count]
+        chunk[..., count:] = self.last_sample
+
+        remaining = self.fifo_length - count
+        self.fifo[:remaining] = self.fifo[count:self.fifo_length]
+        self.fifo_length = remaining
+
+        self.channel.queue(sound)
+        self.started = True
+
+    def stop(self):
+        """停止播放"""
+        self.channel.stop()
+
+    def get_stats(self) -> Dict:
+        """缓冲统计"""
+        return {
+            'buffers': len(self.sounds),
+            'chunk_size': self.chunk_size,
+            'queued_samples': self.fifo_length,
+            'underruns': self.underruns,
+            'dropped_samples': self.dropped_samples
+        }
+
+
+def create_audio_stream() -> Optional[AudioStream]:
+    """pygame.mixer可用时创建音频流，否则返回None"""
+    if pygame is None:
+        return None
+    try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        return AudioStream()
+    except pygame.error as e:
+        print(f"⚠️ 音频系统不可用: {e}")
+        return None
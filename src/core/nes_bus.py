@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+NES CPU内存总线
+2KB内部RAM + 256项页表：每个256字节页对应一对读/写处理函数，
+一次访问只需一次索引查表，不经过if/elif判断链
+"""
+
+import struct
+from typing import Callable, List
+
+# 标准手柄按键顺序（移位寄存器从第0位开始输出）
+CONTROLLER_BUTTONS = ('a', 'b', 'select', 'start', 'up', 'down', 'left', 'right')
+
+PRG_SLOT_SIZE = 0x2000
+
+# 快照头：两个手柄的按键与移位寄存器、选通位；其后是内部RAM和PRG RAM
+BUS_STATE = struct.Struct('<BBBBB')
+
+
+class MemoryBus:
+    """CPU地址总线
+
+    地址空间划分:
+        $0000-$1FFF  内部RAM（2KB，镜像4次）
+        $2000-$3FFF  PPU寄存器（8个，镜像）
+        $4000-$40FF  APU与I/O寄存器
+        $4100-$5FFF  扩展区（开路总线）
+        $6000-$7FFF  卡带PRG RAM
+        $8000-$FFFF  卡带PRG ROM（4个8KB槽）
+
+    页处理函数都是闭包，引用的 ``ram``、``prg_ram`` 和 ``prg_slots``
+    在总线生命周期内不会被重新绑定（恢复状态时应原地写入）
+    """
+
+    def __init__(self, prg_rom: bytes = b'', prg_ram_size: int = 0x2000):
+        """初始化总线并构建页表"""
+        self.ram = bytearray(0x800)
+        self.prg_ram = bytearray(prg_ram_size or PRG_SLOT_SIZE)
+        self.prg_rom = memoryview(prg_rom if len(prg_rom) else bytes(0x4000))
+
+        # $8000/$A000/$C000/$E000 四个8KB槽：当前映射的ROM切片及其bank编号
+        self.prg_slots = [self.prg_rom[:PRG_SLOT_SIZE]] * 4
+        self.prg_tags = [0, 0, 0, 0]
+        self._map_fixed_prg()
+
+        # 外设（cpu 用于OAM DMA时暂停CPU）
+        self.cpu = None
+        self.ppu = None
+        self.apu = None
+
+        # 手柄: 当前按键状态与读取用的移位寄存器
+        self.controllers = [0, 0]
+        self.controller_shift = [0, 0]
+        self.controller_strobe = 0
+
+        self.read_table: List[Callable] = [None] * 256
+        self.write_table: List[Callable] = [None] * 256
+        self._build_page_table()
+
+        read_table = self.read_table
+        write_table = self.write_table
+
+        def read(address: int) -> int:
+            return read_table[address >> 8](address)
+
+        def write(address: int, value: int):
+            write_table[address >> 8](address, value)
+
+        self.read = read
+        self.write = write
+        self.state_size = BUS_STATE.size + len(self.ram) + len(self.prg_ram)
+
+    def _map_fixed_prg(self):
+        """无mapper时的固定映射：16KB镜像，32KB直接映射"""
+        bank_count = max(1, len(self.prg_rom) // PRG_SLOT_SIZE)
+        for slot in range(4):
+            bank = slot % bank_count
+            self.prg_slots[slot] = self.prg_rom[bank * PRG_SLOT_SIZE:(bank + 1) * PRG_SLOT_SIZE]
+            self.prg_tags[slot] = bank
+
+    def _build_page_table(self):
+        """构建256项读写页表"""
+        ram = self.ram
+        prg_ram = self.prg_ram
+        prg_ram_mask = len(prg_ram) - 1
+        prg_slots = self.prg_slots
+
+        def read_ram(address: int) -> int:
+            return ram[address & 0x7FF]
+
+        def write_ram(address: int, value: int):
+            ram[address & 0x7FF] = value
+
+        def read_prg_ram(address: int) -> int:
+            return prg_ram[address & prg_ram_mask]
+
+        def write_prg_ram(address: int, value: int):
+            prg_ram[address & prg_ram_mask] = value
+
+        def read_prg(address: int) -> int:
+            return prg_slots[(address >> 13) & 3][address & 0x1FFF]
+
+        for page in range(0x00, 0x20):
+            self.read_table[page] = read_ram
+            self.write_table[page] = write_ram
+        for page in range(0x20, 0x40):
+            self.read_table[page] = self._read_open_bus
+            self.write_table[page] = self._write_ignored
+        self.read_table[0x40] = self._read_io
+        self.write_table[0x40] = self._write_io
+        for page in range(0x41, 0x60):
+            self.read_table[page] = self._read_open_bus
+            self.write_table[page] = self._write_ignored
+        for page in range(0x60, 0x80):
+            self.read_table[page] = read_prg_ram
+            self.write_table[page] = write_prg_ram
+        for page in range(0x80, 0x100):
+            self.read_table[page] = read_prg
+            self.write_table[page] = self._write_ignored
+
+    def map_pages(self, first_page: int, last_page: int, reader: Callable = None,
+                  writer: Callable = None):
+        """把 [first_page, last_page] 范围内的页指向新的处理函数"""
+        for page in range(first_page, last_page + 1):
+            if reader is not None:
+                self.read_table[page] = reader
+            if writer is not None:
+                self.write_table[page] = writer
+
+    def attach_ppu(self, ppu):
+        """连接PPU：$2000-$3FFF按8字节镜像到PPU寄存器"""
+        self.ppu = ppu
+        read_register = ppu.read_register
+        write_register = ppu.write_register
+
+        def read_ppu(address: int) -> int:
+            return read_register(address & 7)
+
+        def write_ppu(address: int, value: int):
+            write_register(address & 7, value)
+
+        self.map_pages(0x20, 0x3F, read_ppu, write_ppu)
+
+    def attach_apu(self, apu):
+        """连接APU（$4000-$4017中的音频寄存器）"""
+        self.apu = apu
+
+    # ------------------------------------------------------------------
+    # 页处理函数
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_open_bus(address: int) -> int:
+        # 未驱动的总线保留上一次的值，绝大多数情况下就是地址高字节
+        return address >> 8
+
+    @staticmethod
+    def _write_ignored(address: int, value: int):
+        pass
+
+    def _read_io(self, address: int) -> int:
+        if address == 0x4016 or address == 0x4017:
+            return self._read_controller(address - 0x4016)
+        if address == 0x4015 and self.apu is not None:
+            return self.apu.read_status()
+        return address >> 8
+
+    def _write_io(self, address: int, value: int):
+        if address == 0x4016:
+            self.controller_strobe = value & 1
+            if self.controller_strobe:
+                self.controller_shift[0] = self.controllers[0]
+                self.controller_shift[1] = self.controllers[1]
+        elif address == 0x4014:
+            self._oam_dma(value << 8)
+        elif address < 0x4018 and self.apu is not None:
+            self.apu.write_register(address, value)
+
+    def _oam_dma(self, base: int):
+        """$4014：把一页（256字节）复制到PPU OAM，CPU暂停513周期"""
+        if self.ppu is None:
+            return
+        if base < 0x2000:
+            start = base & 0x7FF
+            data = self.ram[start:start + 256]
+        else:
+            read = self.read
+            data = bytes(read(base + offset) for offset in range(256))
+        self.ppu.oam_dma(data)
+        if self.cpu is not None:
+            self.cpu.cycles += 513
+
+    def _read_controller(self, port: int) -> int:
+        if self.controller_strobe:
+            return 0x40 | (self.controllers[port] & 1)
+        value = self.controller_shift[port]
+        # 读完8位后标准手柄持续返回1
+        self.controller_shift[port] = (value >> 1) | 0x80
+        return 0x40 | (value & 1)
+
+    # ------------------------------------------------------------------
+    # 手柄
+    # ------------------------------------------------------------------
+
+    def set_controller(self, port: int, buttons: int):
+        """设置手柄按键位图（位顺序见 CONTROLLER_BUTTONS）"""
+        self.controllers[port] = buttons & 0xFF
+        if self.controller_strobe:
+            self.controller_shift[port] = self.controllers[port]
+
+    # ------------------------------------------------------------------
+    # 状态快照
+    # ------------------------------------------------------------------
+
+    def save_state(self) -> bytes:
+        """手柄状态 + 内部RAM + PRG RAM"""
+        header = BUS_STATE.pack(self.controllers[0], self.controllers[1],
+                                self.controller_shift[0], self.controller_shift[1],
+                                self.controller_strobe)
+        return b''.join((header, self.ram, self.prg_ram))
+
+    def load_state(self, data):
+        """从 save_state() 的快照恢复（RAM原地写入，页处理函数的闭包保持有效）"""
+        data = memoryview(data)
+        (self.controllers[0], self.controllers[1],
+         self.controller_shift[0], self.controller_shift[1],
+         self.controller_strobe) = BUS_STATE.unpack_from(data)
+        offset = BUS_STATE.size
+        self.ram[:] = data[offset:offset + len(self.ram)]
+        offset += len(self.ram)
+        self.prg_ram[:] = data[offset:offset + len(self.prg_ram)]
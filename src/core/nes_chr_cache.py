@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+CHR图块缓存
+加载ROM时把CHR数据一次性解码为8x8像素图块（含水平/垂直翻转版本），
+按1KB CHR bank组织；CHR RAM写入只让受影响的图块失效
+"""
+
+from typing import Dict
+
+import numpy as np
+
+TILE_BYTES = 16
+TILES_PER_BANK = 64
+
+# 图块变体：第0维索引
+FLIP_NONE = 0
+FLIP_HORIZONTAL = 1
+FLIP_VERTICAL = 2
+FLIP_BOTH = 3
+
+
+def _build_plane_lut() -> np.ndarray:
+    """两个位平面字节 (lo | hi << 8) -> 8个2位像素（从左到右）"""
+    index = np.arange(65536, dtype=np.uint32)
+    lo = index & 0xFF
+    hi = index >> 8
+    shifts = np.arange(7, -1, -1, dtype=np.uint32)
+    pixels = ((lo[:, None] >> shifts) & 1) | (((hi[:, None] >> shifts) & 1) << 1)
+    return pixels.astype(np.uint8)
+
+
+PLANE_LUT = _build_plane_lut()
+
+
+class CHRTileCache:
+    """预解码的CHR图块
+
+    ``tiles`` 形状为 (4, 图块数, 8, 8)，第0维是翻转变体，
+    图块编号 = bank * 64 + bank内序号，与1KB CHR bank一一对应
+    """
+
+    def __init__(self, chr_data):
+        """解码全部CHR数据"""
+        self.chr_np = np.frombuffer(chr_data, dtype=np.uint8)
+        self.tile_count = len(self.chr_np) // TILE_BYTES
+        self.bank_count = max(1, self.tile_count // TILES_PER_BANK)
+        self.tiles = np.zeros((4, self.tile_count, 8, 8), dtype=np.uint8)
+        self.dirty = set()
+        self.decoded_tiles = 0
+        self._decode(np.arange(self.tile_count))
+
+    def _decode(self, tile_ids: np.ndarray):
+        """解码指定图块及其翻转版本"""
+        planes = self.chr_np[:self.tile_count * TILE_BYTES].reshape(-1, 2, 8)[tile_ids].astype(np.intp)
+        pixels = PLANE_LUT[planes[:, 0] | (planes[:, 1] << 8)]
+        self.tiles[FLIP_NONE, tile_ids] = pixels
+        self.tiles[FLIP_HORIZONTAL, tile_ids] = pixels[:, :, ::-1]
+        self.tiles[FLIP_VERTICAL, tile_ids] = pixels[:, ::-1, :]
+        self.tiles[FLIP_BOTH, tile_ids] = pixels[:, ::-1, ::-1]
+        self.decoded_tiles += len(tile_ids)
+
+    def invalidate(self, offset: int):
+        """CHR数据第offset字节被改写：标记所在图块"""
+        self.dirty.add(offset >> 4)
+
+    def invalidate_all(self):
+        """整体失效（例如恢复CHR RAM后）"""
+        self.dirty.update(range(self.tile_count))
+
+    def refresh(self):
+        """重新解码所有失效的图块"""
+        if self.dirty:
+            self._decode(np.fromiter(self.dirty, dtype=np.intp, count=len(self.dirty)))
+            self.dirty.clear()
+
+    def bank_tiles(self, bank: int, variant: int = FLIP_NONE) -> np.ndarray:
+        """返回某个1KB bank的64个图块（视图）"""
+        start = (bank % self.bank_count) * TILES_PER_BANK
+        return self.tiles[variant, start:start + TILES_PER_BANK]
+
+    def get_memory_usage(self) -> int:
+        """缓存占用的字节数"""
+        return self.tiles.nbytes
+
+    def get_stats(self) -> Dict:
+        """缓存统计"""
+        return {
+            'tiles': self.tile_count,
+            'banks': self.bank_count,
+            'bytes': self.get_memory_usage(),
+            'decoded_tiles': self.decoded_tiles,
+            'dirty_tiles': len(self.dirty)
+        }
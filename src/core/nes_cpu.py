@@ -0,0 +1,1024 @@
+#!/usr/bin/env python3
+"""
+6502 CPU核心
+表驱动的2A03(6502)解释器：每个操作码在构造时预先绑定执行函数、
+寻址模式解析函数、指令长度和基础周期数，执行时只需一次查表
+"""
+
+import os
+import sys
+import json
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from nes_bus import MemoryBus
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from nes_bus import MemoryBus
+
+# 寻址模式
+IMP, ACC, IMM, ZP, ZPX, ZPY, ABS, ABX, ABY, IND, IZX, IZY, REL = range(13)
+
+MODE_SIZES = {
+    IMP: 1, ACC: 1, IMM: 2, ZP: 2, ZPX: 2, ZPY: 2,
+    ABS: 3, ABX: 3, ABY: 3, IND: 3, IZX: 2, IZY: 2, REL: 2
+}
+
+# NTSC时序
+CPU_FREQUENCY = 1789773
+CYCLES_PER_FRAME = 29781
+
+# 指令表: 助记符 -> ((寻址模式, 操作码, 基础周期), ...)
+INSTRUCTIONS = {
+    'ADC': ((IMM, 0x69, 2), (ZP, 0x65, 3), (ZPX, 0x75, 4), (ABS, 0x6D, 4),
+            (ABX, 0x7D, 4), (ABY, 0x79, 4), (IZX, 0x61, 6), (IZY, 0x71, 5)),
+    'AND': ((IMM, 0x29, 2), (ZP, 0x25, 3), (ZPX, 0x35, 4), (ABS, 0x2D, 4),
+            (ABX, 0x3D, 4), (ABY, 0x39, 4), (IZX, 0x21, 6), (IZY, 0x31, 5)),
+    'ASL': ((ACC, 0x0A, 2), (ZP, 0x06, 5), (ZPX, 0x16, 6), (ABS, 0x0E, 6), (ABX, 0x1E, 7)),
+    'BCC': ((REL, 0x90, 2),), 'BCS': ((REL, 0xB0, 2),),
+    'BEQ': ((REL, 0xF0, 2),), 'BMI': ((REL, 0x30, 2),),
+    'BNE': ((REL, 0xD0, 2),), 'BPL': ((REL, 0x10, 2),),
+    'BVC': ((REL, 0x50, 2),), 'BVS': ((REL, 0x70, 2),),
+    'BIT': ((ZP, 0x24, 3), (ABS, 0x2C, 4)),
+    'BRK': ((IMP, 0x00, 7),),
+    'CLC': ((IMP, 0x18, 2),), 'CLD': ((IMP, 0xD8, 2),),
+    'CLI': ((IMP, 0x58, 2),), 'CLV': ((IMP, 0xB8, 2),),
+    'CMP': ((IMM, 0xC9, 2), (ZP, 0xC5, 3), (ZPX, 0xD5, 4), (ABS, 0xCD, 4),
+            (ABX, 0xDD, 4), (ABY, 0xD9, 4), (IZX, 0xC1, 6), (IZY, 0xD1, 5)),
+    'CPX': ((IMM, 0xE0, 2), (ZP, 0xE4, 3), (ABS, 0xEC, 4)),
+    'CPY': ((IMM, 0xC0, 2), (ZP, 0xC4, 3), (ABS, 0xCC, 4)),
+    'DEC': ((ZP, 0xC6, 5), (ZPX, 0xD6, 6), (ABS, 0xCE, 6), (ABX, 0xDE, 7)),
+    'DEX': ((IMP, 0xCA, 2),), 'DEY': ((IMP, 0x88, 2),),
+    'EOR': ((IMM, 0x49, 2), (ZP, 0x45, 3), (ZPX, 0x55, 4), (ABS, 0x4D, 4),
+            (ABX, 0x5D, 4), (ABY, 0x59, 4), (IZX, 0x41, 6), (IZY, 0x51, 5)),
+    'INC': ((ZP, 0xE6, 5), (ZPX, 0xF6, 6), (ABS, 0xEE, 6), (ABX, 0xFE, 7)),
+    'INX': ((IMP, 0xE8, 2),), 'INY': ((IMP, 0xC8, 2),),
+    'JMP': ((ABS, 0x4C, 3), (IND, 0x6C, 5)),
+    'JSR': ((ABS, 0x20, 6),),
+    'LDA': ((IMM, 0xA9, 2), (ZP, 0xA5, 3), (ZPX, 0xB5, 4), (ABS, 0xAD, 4),
+            (ABX, 0xBD, 4), (ABY, 0xB9, 4), (IZX, 0xA1, 6), (IZY, 0xB1, 5)),
+    'LDX': ((IMM, 0xA2, 2), (ZP, 0xA6, 3), (ZPY, 0xB6, 4), (ABS, 0xAE, 4), (ABY, 0xBE, 4)),
+    'LDY': ((IMM, 0xA0, 2), (ZP, 0xA4, 3), (ZPX, 0xB4, 4), (ABS, 0xAC, 4), (ABX, 0xBC, 4)),
+    'LSR': ((ACC, 0x4A, 2), (ZP, 0x46, 5), (ZPX, 0x56, 6), (ABS, 0x4E, 6), (ABX, 0x5E, 7)),
+    'NOP': ((IMP, 0xEA, 2),
+            # 非官方NOP
+            (IMP, 0x1A, 2), (IMP, 0x3A, 2), (IMP, 0x5A, 2), (IMP, 0x7A, 2),
+            (IMP, 0xDA, 2), (IMP, 0xFA, 2),
+            (IMM, 0x80, 2), (IMM, 0x82, 2), (IMM, 0x89, 2), (IMM, 0xC2, 2), (IMM, 0xE2, 2),
+            (ZP, 0x04, 3), (ZP, 0x44, 3), (ZP, 0x64, 3),
+            (ZPX, 0x14, 4), (ZPX, 0x34, 4), (ZPX, 0x54, 4), (ZPX, 0x74, 4),
+            (ZPX, 0xD4, 4), (ZPX, 0xF4, 4),
+            (ABS, 0x0C, 4),
+            (ABX, 0x1C, 4), (ABX, 0x3C, 4), (ABX, 0x5C, 4), (ABX, 0x7C, 4),
+            (ABX, 0xDC, 4), (ABX, 0xFC, 4)),
+    'ORA': ((IMM, 0x09, 2), (ZP, 0x05, 3), (ZPX, 0x15, 4), (ABS, 0x0D, 4),
+            (ABX, 0x1D, 4), (ABY, 0x19, 4), (IZX, 0x01, 6), (IZY, 0x11, 5)),
+    'PHA': ((IMP, 0x48, 3),), 'PHP': ((IMP, 0x08, 3),),
+    'PLA': ((IMP, 0x68, 4),), 'PLP': ((IMP, 0x28, 4),),
+    'ROL': ((ACC, 0x2A, 2), (ZP, 0x26, 5), (ZPX, 0x36, 6), (ABS, 0x2E, 6), (ABX, 0x3E, 7)),
+    'ROR': ((ACC, 0x6A, 2), (ZP, 0x66, 5), (ZPX, 0x76, 6), (ABS, 0x6E, 6), (ABX, 0x7E, 7)),
+    'RTI': ((IMP, 0x40, 6),), 'RTS': ((IMP, 0x60, 6),),
+    'SBC': ((IMM, 0xE9, 2), (ZP, 0xE5, 3), (ZPX, 0xF5, 4), (ABS, 0xED, 4),
+            (ABX, 0xFD, 4), (ABY, 0xF9, 4), (IZX, 0xE1, 6), (IZY, 0xF1, 5),
+            (IMM, 0xEB, 2)),
+    'SEC': ((IMP, 0x38, 2),), 'SED': ((IMP, 0xF8, 2),), 'SEI': ((IMP, 0x78, 2),),
+    'STA': ((ZP, 0x85, 3), (ZPX, 0x95, 4), (ABS, 0x8D, 4), (ABX, 0x9D, 5),
+            (ABY, 0x99, 5), (IZX, 0x81, 6), (IZY, 0x91, 6)),
+    'STX': ((ZP, 0x86, 3), (ZPY, 0x96, 4), (ABS, 0x8E, 4)),
+    'STY': ((ZP, 0x84, 3), (ZPX, 0x94, 4), (ABS, 0x8C, 4)),
+    'TAX': ((IMP, 0xAA, 2),), 'TAY': ((IMP, 0xA8, 2),), 'TSX': ((IMP, 0xBA, 2),),
+    'TXA': ((IMP, 0x8A, 2),), 'TXS': ((IMP, 0x9A, 2),), 'TYA': ((IMP, 0x98, 2),),
+    # 常见的非官方指令
+    'LAX': ((ZP, 0xA7, 3), (ZPY, 0xB7, 4), (ABS, 0xAF, 4), (ABY, 0xBF, 4),
+            (IZX, 0xA3, 6), (IZY, 0xB3, 5)),
+    'SAX': ((ZP, 0x87, 3), (ZPY, 0x97, 4), (ABS, 0x8F, 4), (IZX, 0x83, 6)),
+    'DCP': ((ZP, 0xC7, 5), (ZPX, 0xD7, 6), (ABS, 0xCF, 6), (ABX, 0xDF, 7),
+            (ABY, 0xDB, 7), (IZX, 0xC3, 8), (IZY, 0xD3, 8)),
+    'ISB': ((ZP, 0xE7, 5), (ZPX, 0xF7, 6), (ABS, 0xEF, 6), (ABX, 0xFF, 7),
+            (ABY, 0xFB, 7), (IZX, 0xE3, 8), (IZY, 0xF3, 8)),
+    'SLO': ((ZP, 0x07, 5), (ZPX, 0x17, 6), (ABS, 0x0F, 6), (ABX, 0x1F, 7),
+            (ABY, 0x1B, 7), (IZX, 0x03, 8), (IZY, 0x13, 8)),
+    'RLA': ((ZP, 0x27, 5), (ZPX, 0x37, 6), (ABS, 0x2F, 6), (ABX, 0x3F, 7),
+            (ABY, 0x3B, 7), (IZX, 0x23, 8), (IZY, 0x33, 8)),
+    'SRE': ((ZP, 0x47, 5), (ZPX, 0x57, 6), (ABS, 0x4F, 6), (ABX, 0x5F, 7),
+            (ABY, 0x5B, 7), (IZX, 0x43, 8), (IZY, 0x53, 8)),
+    'RRA': ((ZP, 0x67, 5), (ZPX, 0x77, 6), (ABS, 0x6F, 6), (ABX, 0x7F, 7),
+            (ABY, 0x7B, 7), (IZX, 0x63, 8), (IZY, 0x73, 8)),
+}
+
+# 未实现的非官方指令按正确长度当作NOP执行，保证PC不跑偏
+UNSUPPORTED_OPCODES = {
+    0x0B: IMM, 0x2B: IMM, 0x4B: IMM, 0x6B: IMM, 0x8B: IMM, 0xAB: IMM, 0xCB: IMM,
+    0x93: IZY, 0x9F: ABY, 0x9E: ABY, 0x9C: ABX, 0x9B: ABY, 0xBB: ABY,
+}
+
+# 读取类指令：解析函数返回操作数的值
+READ_OPS = {'ADC', 'AND', 'BIT', 'CMP', 'CPX', 'CPY', 'EOR', 'LDA', 'LDX', 'LDY',
+            'ORA', 'SBC', 'LAX', 'NOP'}
+
+# 分支指令：执行函数直接接收相对偏移
+BRANCH_OPS = {'BCC', 'BCS', 'BEQ', 'BMI', 'BNE', 'BPL', 'BVC', 'BVS'}
+
+# 改变控制流的指令（指令块缓存以这些指令结尾）
+FLOW_OPS = BRANCH_OPS | {'BRK', 'JMP', 'JSR', 'RTI', 'RTS'}
+
+# 单个指令块的最大指令数
+MAX_BLOCK_LENGTH = 32
+
+# 中断向量
+NMI_VECTOR = 0xFFFA
+RESET_VECTOR = 0xFFFC
+IRQ_VECTOR = 0xFFFE
+
+# IRQ来源（多个设备共用一根IRQ线）
+IRQ_MAPPER = 0x01
+IRQ_APU = 0x02
+
+# 快照：A/X/Y/SP/PC、标志位（nz为惰性N/Z）、周期与指令计数、NMI挂起和IRQ来源
+CPU_STATE = struct.Struct('<BBBBHBHBBBQQ?B')
+
+
+def _code_page(address: int) -> int:
+    """RAM代码所在的页号（内部RAM按2KB镜像归一）"""
+    if address < 0x2000:
+        return (address & 0x7FF) >> 8
+    return address >> 8
+
+
+def _on_stack_page(address: int) -> bool:
+    """是否在栈页（$0100-$01FF及其镜像）"""
+    return address < 0x2000 and (address & 0x700) == 0x100
+
+
+class CPU6502:
+    """表驱动的6502解释器
+
+    状态标志N/Z以惰性方式保存在 ``nz`` 中：Z = (nz & 0xFF) == 0，
+    N = nz & 0x180 != 0（第8位用于表示BIT指令可能产生的 N=1 且 Z=1）
+    """
+
+    def __init__(self, bus, block_cache: bool = True):
+        """初始化CPU并构建分派表"""
+        self.bus = bus
+        self.ram = bus.ram
+        self.read = bus.read
+        self.write = bus.write
+        bus.cpu = self
+
+        # 寄存器
+        self.a = 0
+        self.x = 0
+        self.y = 0
+        self.sp = 0xFD
+        self.pc = 0
+
+        # 标志位
+        self.c = 0
+        self.nz = 1
+        self.v = 0
+        self.i = 1
+        self.d = 0
+
+        # 周期计数与中断
+        self.cycles = 0
+        self.instructions = 0
+        self.nmi_pending = False
+        self.irq_line = False
+        self.irq_sources = 0
+        self.run_target = 0
+        self.state_size = CPU_STATE.size
+
+        self.table = self._build_table()
+        self.flow_opcodes = frozenset(
+            opcode for name, variants in INSTRUCTIONS.items() if name in FLOW_OPS
+            for _, opcode, _ in variants)
+
+        # 指令块缓存：键为 PC | (PRG bank标签 << 16)
+        self.block_cache_enabled = block_cache
+        self.blocks = {}
+        self.code_pages = {}
+        self.prg_tags = bus.prg_tags
+        self.block_hits = 0
+        self.block_misses = 0
+        self.block_invalidations = 0
+
+    def _build_table(self) -> List[Tuple]:
+        """构建256项分派表: (执行函数, 解析函数或None, 指令长度, 基础周期)"""
+        read_resolvers = {
+            ZP: self._read_zp, ZPX: self._read_zpx, ZPY: self._read_zpy,
+            ABS: self._read_abs, ABX: self._read_abx, ABY: self._read_aby,
+            IZX: self._read_izx, IZY: self._read_izy,
+        }
+        addr_resolvers = {
+            ZPX: self._addr_zpx, ZPY: self._addr_zpy, ABX: self._addr_abx,
+            ABY: self._addr_aby, IND: self._addr_ind, IZX: self._addr_izx,
+            IZY: self._addr_izy,
+        }
+
+        table = [None] * 256
+        for name, variants in INSTRUCTIONS.items():
+            for mode, opcode, cycles in variants:
+                if mode == ACC:
+                    handler = getattr(self, f'_op_{name.lower()}_a')
+                else:
+                    handler = getattr(self, f'_op_{name.lower()}')
+
+                # 立即数、零页、绝对地址、隐含和相对模式不需要解析函数，
+                # 执行函数直接接收操作数
+                if name in READ_OPS:
+                    resolver = read_resolvers.get(mode)
+                elif mode in (IMP, ACC, REL):
+                    resolver = None
+                else:
+                    resolver = addr_resolvers.get(mode)
+
+                table[opcode] = (handler, resolver, MODE_SIZES[mode], cycles)
+
+        for opcode in range(256):
+            if table[opcode] is None:
+                mode = UNSUPPORTED_OPCODES.get(opcode, IMP)
+                table[opcode] = (self._op_nop, None, MODE_SIZES[mode], 2)
+
+        return table
+
+    # ------------------------------------------------------------------
+    # 状态与中断
+    # ------------------------------------------------------------------
+
+    def get_status(self) -> int:
+        """打包状态寄存器P（不含B标志）"""
+        nz = self.nz
+        return ((0x80 if nz & 0x180 else 0) | (0x40 if self.v else 0) | 0x20 |
+                (0x08 if self.d else 0) | (0x04 if self.i else 0) |
+                (0 if nz & 0xFF else 0x02) | self.c)
+
+    def set_status(self, p: int):
+        """从字节恢复状态寄存器P"""
+        n = p & 0x80
+        if p & 0x02:
+            self.nz = 0x100 if n else 0
+        else:
+            self.nz = n | 1
+        self.v = (p >> 6) & 1
+        self.d = (p >> 3) & 1
+        self.i = (p >> 2) & 1
+        self.c = p & 1
+
+    def read16(self, address: int) -> int:
+        """读取16位小端数据"""
+        return self.read(address) | (self.read((address + 1) & 0xFFFF) << 8)
+
+    def reset(self):
+        """复位CPU"""
+        self.sp = (self.sp - 3) & 0xFF
+        self.i = 1
+        self.pc = self.read16(RESET_VECTOR)
+        self.cycles += 7
+        self.nmi_pending = False
+
+    def power_on(self):
+        """上电状态"""
+        self.a = self.x = self.y = 0
+        self.sp = 0x00
+        self.set_status(0x24)
+        self.reset()
+
+    def trigger_nmi(self):
+        """请求NMI（边沿触发），当前的 run() 在本条指令后返回以便及时响应"""
+        self.nmi_pending = True
+        self.run_target = self.cycles
+
+    def set_irq(self, asserted: bool, source: int = IRQ_MAPPER):
+        """设置某个来源的IRQ电平，任一来源有效时IRQ线有效"""
+        if asserted:
+            self.irq_sources |= source
+            self.run_target = self.cycles
+        else:
+            self.irq_sources &= ~source
+        self.irq_line = self.irq_sources != 0
+
+    def save_state(self) -> bytes:
+        """寄存器和中断状态快照（RAM属于总线）"""
+        return CPU_STATE.pack(self.a, self.x, self.y, self.sp, self.pc,
+                              self.c, self.nz, self.v, self.i, self.d,
+                              self.cycles, self.instructions,
+                              self.nmi_pending, self.irq_sources)
+
+    def load_state(self, data):
+        """从 save_state() 的快照恢复"""
+        (self.a, self.x, self.y, self.sp, self.pc,
+         self.c, self.nz, self.v, self.i, self.d,
+         self.cycles, self.instructions,
+         self.nmi_pending, self.irq_sources) = CPU_STATE.unpack(data)
+        self.irq_line = self.irq_sources != 0
+        self.run_target = self.cycles
+        # RAM内容已被替换，RAM中的指令块不再可信；ROM中的块按bank标签区分，继续有效
+        if self.code_pages:
+            blocks = self.blocks
+            for keys in self.code_pages.values():
+                for key in keys:
+                    blocks.pop(key, None)
+                self.block_invalidations += len(keys)
+            self.code_pages.clear()
+            self.write = self.bus.write
+
+    def _push(self, value: int):
+        self.ram[0x100 | self.sp] = value
+        self.sp = (self.sp - 1) & 0xFF
+
+    def _pull(self) -> int:
+        self.sp = (self.sp + 1) & 0xFF
+        return self.ram[0x100 | self.sp]
+
+    def _interrupt(self, vector: int, status: int):
+        pc = self.pc
+        self._push(pc >> 8)
+        self._push(pc & 0xFF)
+        self._push(status)
+        self.i = 1
+        self.pc = self.read16(vector)
+        self.cycles += 7
+
+    def _service_interrupts(self) -> bool:
+        """在指令边界处理挂起的中断，返回是否进入了中断"""
+        if self.nmi_pending:
+            self.nmi_pending = False
+            self._interrupt(NMI_VECTOR, self.get_status())
+            return True
+        if self.irq_line and not self.i:
+            self._interrupt(IRQ_VECTOR, self.get_status())
+            return True
+        return False
+
+    # ------------------------------------------------------------------
+    # 执行
+    # ------------------------------------------------------------------
+
+    def step(self) -> int:
+        """执行一条指令，返回消耗的周期数（不经过指令块缓存）"""
+        start = self.cycles
+        if (self.nmi_pending or self.irq_line) and self._service_interrupts():
+            return self.cycles - start
+
+        self._execute_one()
+        self.instructions += 1
+        return self.cycles - start
+
+    def _execute_one(self):
+        """取指、译码并执行当前PC处的一条指令"""
+        read = self.read
+        pc = self.pc
+        handler, resolver, size, cycles = self.table[read(pc)]
+        if size == 2:
+            operand = read((pc + 1) & 0xFFFF)
+        elif size == 3:
+            operand = read((pc + 1) & 0xFFFF) | (read((pc + 2) & 0xFFFF) << 8)
+        else:
+            operand = 0
+        self.pc = (pc + size) & 0xFFFF
+        self.cycles += cycles
+        if resolver is None:
+            handler(operand)
+        else:
+            handler(resolver(operand))
+
+    def run(self, cycles: int) -> int:
+        """运行至少指定周期数，返回实际消耗的周期数"""
+        if self.block_cache_enabled:
+            return self._run_blocks(cycles)
+
+        start = self.cycles
+        self.run_target = start + cycles
+        read = self.read
+        table = self.table
+        executed = 0
+
+        while self.cycles < self.run_target:
+            if (self.nmi_pending or self.irq_line) and self._service_interrupts():
+                continue
+
+            pc = self.pc
+            handler, resolver, size, cyc = table[read(pc)]
+            if size == 2:
+                operand = read((pc + 1) & 0xFFFF)
+            elif size == 3:
+                operand = read((pc + 1) & 0xFFFF) | (read((pc + 2) & 0xFFFF) << 8)
+            else:
+                operand = 0
+            self.pc = (pc + size) & 0xFFFF
+            self.cycles += cyc
+            executed += 1
+            if resolver is None:
+                handler(operand)
+            else:
+                handler(resolver(operand))
+
+        self.instructions += executed
+        return self.cycles - start
+
+    # ------------------------------------------------------------------
+    # 指令块缓存
+    # ------------------------------------------------------------------
+
+    def stop_run(self):
+        """让当前的 run() 在本条指令结束后返回（指令块执行到一半时也立即结束）"""
+        self.run_target = self.cycles
+
+    def _run_blocks(self, cycles: int) -> int:
+        """以已译码的指令块为单位运行
+
+        每条指令后检查是否到达 run_target：stop_run()（bank切换、PPU寄存器写入、
+        NMI/IRQ、改写已缓存的RAM代码）会把它提前，块中剩下的指令不再执行，
+        与逐条解释执行在同一条指令后返回
+        """
+        start = self.cycles
+        self.run_target = start + cycles
+        blocks = self.blocks
+        prg_tags = self.prg_tags
+        executed = 0
+        hits = 0
+
+        while self.cycles < self.run_target:
+            if (self.nmi_pending or self.irq_line) and self._service_interrupts():
+                continue
+
+            pc = self.pc
+            if pc >= 0x8000:
+                key = pc | (prg_tags[(pc >> 13) & 3] << 16)
+            else:
+                key = pc
+
+            block = blocks.get(key)
+            if block is None:
+                block = self._decode_block(pc, key)
+                if not block:
+                    # 无法缓存的位置（寄存器区、栈页或跨bank的指令）逐条解释执行
+                    self._execute_one()
+                    executed += 1
+                    continue
+            else:
+                hits += 1
+
+            for entry in block:
+                handler, resolver, operand, next_pc, cyc = entry
+                self.pc = next_pc
+                self.cycles += cyc
+                if resolver is None:
+                    handler(operand)
+                else:
+                    handler(resolver(operand))
+                if self.cycles >= self.run_target:
+                    executed += block.index(entry) + 1
+                    break
+            else:
+                executed += len(block)
+
+        self.block_hits += hits
+        self.instructions += executed
+        return self.cycles - start
+
+    def _decode_block(self, pc: int, key: int) -> Tuple:
+        """从pc开始译码一个基本块并放入缓存
+
+        块在控制流指令处结束，并且不会跨越8KB的PRG bank槽，
+        因此键中的bank标签足以区分不同bank映射下的代码。
+        栈页中的指令不缓存：压栈直接写RAM，不经过写入检查
+        """
+        self.block_misses += 1
+        # $2000-$5FFF是寄存器区，不缓存
+        if 0x2000 <= pc < 0x6000:
+            return ()
+
+        read = self.read
+        table = self.table
+        flow_opcodes = self.flow_opcodes
+        start = pc
+        region = pc & 0xE000
+        entries = []
+
+        while len(entries) < MAX_BLOCK_LENGTH:
+            opcode = read(pc)
+            handler, resolver, size, cycles = table[opcode]
+            last = pc + size - 1
+            if (last > 0xFFFF or (last & 0xE000) != region
+                    or _on_stack_page(pc) or _on_stack_page(last)):
+                break
+            if size == 2:
+                operand = read(pc + 1)
+            elif size == 3:
+                operand = read(pc + 1) | (read(pc + 2) << 8)
+            else:
+                operand = 0
+            pc += size
+            entries.append((handler, resolver, operand, pc & 0xFFFF, cycles))
+            if opcode in flow_opcodes:
+                break
+
+        block = tuple(entries)
+        if not block:
+            return block
+
+        self.blocks[key] = block
+        if key < 0x8000:
+            # RAM中的代码：登记覆盖的每一页，写入这些页时使缓存失效
+            for address in range(start & 0xFF00, pc, 0x100):
+                page = _code_page(address)
+                keys = self.code_pages.get(page)
+                if keys is None:
+                    keys = self.code_pages[page] = set()
+                    self.write = self._write_watched
+                keys.add(key)
+        return block
+
+    def _write_watched(self, address: int, value: int):
+        """写入缓存了RAM代码的页时先使相关指令块失效"""
+        if address < 0x8000 and self.code_pages:
+            keys = self.code_pages.pop(_code_page(address), None)
+            if keys:
+                # 正在执行的块可能就是被改写的代码，执行完本条指令就返回
+                self.stop_run()
+                self.block_invalidations += len(keys)
+                blocks = self.blocks
+                for key in keys:
+                    blocks.pop(key, None)
+                if not self.code_pages:
+                    self.write = self.bus.write
+        self.bus.write(address, value)
+
+    def invalidate_blocks(self):
+        """清空整个指令块缓存（例如更换ROM或恢复状态后）"""
+        self.block_invalidations += len(self.blocks)
+        self.blocks.clear()
+        self.code_pages.clear()
+        self.write = self.bus.write
+
+    def get_block_cache_stats(self) -> Dict:
+        """获取指令块缓存统计"""
+        lookups = self.block_hits + self.block_misses
+        return {
+            'enabled': self.block_cache_enabled,
+            'blocks': len(self.blocks),
+            'hits': self.block_hits,
+            'misses': self.block_misses,
+            'invalidations': self.block_invalidations,
+            'hit_rate': round(self.block_hits / lookups, 4) if lookups else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # 寻址模式：读取类（返回值）
+    # ------------------------------------------------------------------
+
+    def _read_zp(self, operand: int) -> int:
+        return self.ram[operand]
+
+    def _read_zpx(self, operand: int) -> int:
+        return self.ram[(operand + self.x) & 0xFF]
+
+    def _read_zpy(self, operand: int) -> int:
+        return self.ram[(operand + self.y) & 0xFF]
+
+    def _read_abs(self, operand: int) -> int:
+        return self.read(operand)
+
+    def _read_abx(self, operand: int) -> int:
+        address = operand + self.x
+        if (address ^ operand) & 0xFF00:
+            self.cycles += 1
+        return self.read(address & 0xFFFF)
+
+    def _read_aby(self, operand: int) -> int:
+        address = operand + self.y
+        if (address ^ operand) & 0xFF00:
+            self.cycles += 1
+        return self.read(address & 0xFFFF)
+
+    def _read_izx(self, operand: int) -> int:
+        ram = self.ram
+        pointer = (operand + self.x) & 0xFF
+        return self.read(ram[pointer] | (ram[(pointer + 1) & 0xFF] << 8))
+
+    def _read_izy(self, operand: int) -> int:
+        ram = self.ram
+        base = ram[operand] | (ram[(operand + 1) & 0xFF] << 8)
+        address = base + self.y
+        if (address ^ base) & 0xFF00:
+            self.cycles += 1
+        return self.read(address & 0xFFFF)
+
+    # ------------------------------------------------------------------
+    # 寻址模式：写入/读改写类（返回地址）
+    # ------------------------------------------------------------------
+
+    def _addr_zpx(self, operand: int) -> int:
+        return (operand + self.x) & 0xFF
+
+    def _addr_zpy(self, operand: int) -> int:
+        return (operand + self.y) & 0xFF
+
+    def _addr_abx(self, operand: int) -> int:
+        return (operand + self.x) & 0xFFFF
+
+    def _addr_aby(self, operand: int) -> int:
+        return (operand + self.y) & 0xFFFF
+
+    def _addr_ind(self, operand: int) -> int:
+        # 6502的页边界缺陷：高字节不跨页
+        high = (operand & 0xFF00) | ((operand + 1) & 0xFF)
+        return self.read(operand) | (self.read(high) << 8)
+
+    def _addr_izx(self, operand: int) -> int:
+        ram = self.ram
+        pointer = (operand + self.x) & 0xFF
+        return ram[pointer] | (ram[(pointer + 1) & 0xFF] << 8)
+
+    def _addr_izy(self, operand: int) -> int:
+        ram = self.ram
+        base = ram[operand] | (ram[(operand + 1) & 0xFF] << 8)
+        return (base + self.y) & 0xFFFF
+
+    # ------------------------------------------------------------------
+    # 读取类指令
+    # ------------------------------------------------------------------
+
+    def _op_lda(self, value: int):
+        self.a = self.nz = value
+
+    def _op_ldx(self, value: int):
+        self.x = self.nz = value
+
+    def _op_ldy(self, value: int):
+        self.y = self.nz = value
+
+    def _op_lax(self, value: int):
+        self.a = self.x = self.nz = value
+
+    def _op_and(self, value: int):
+        self.a = self.nz = self.a & value
+
+    def _op_ora(self, value: int):
+        self.a = self.nz = self.a | value
+
+    def _op_eor(self, value: int):
+        self.a = self.nz = self.a ^ value
+
+    def _op_adc(self, value: int):
+        a = self.a
+        result = a + value + self.c
+        self.c = result >> 8
+        result &= 0xFF
+        self.v = ((a ^ result) & (value ^ result) & 0x80) >> 7
+        self.a = self.nz = result
+
+    def _op_sbc(self, value: int):
+        self._op_adc(value ^ 0xFF)
+
+    def _op_cmp(self, value: int):
+        result = self.a - value
+        self.c = 1 if result >= 0 else 0
+        self.nz = result & 0xFF
+
+    def _op_cpx(self, value: int):
+        result = self.x - value
+        self.c = 1 if result >= 0 else 0
+        self.nz = result & 0xFF
+
+    def _op_cpy(self, value: int):
+        result = self.y - value
+        self.c = 1 if result >= 0 else 0
+        self.nz = result & 0xFF
+
+    def _op_bit(self, value: int):
+        self.v = (value >> 6) & 1
+        n = value & 0x80
+        if self.a & value:
+            self.nz = n | 1
+        else:
+            self.nz = 0x100 if n else 0
+
+    def _op_nop(self, _):
+        pass
+
+    # ------------------------------------------------------------------
+    # 写入类指令
+    # ------------------------------------------------------------------
+
+    def _op_sta(self, address: int):
+        self.write(address, self.a)
+
+    def _op_stx(self, address: int):
+        self.write(address, self.x)
+
+    def _op_sty(self, address: int):
+        self.write(address, self.y)
+
+    def _op_sax(self, address: int):
+        self.write(address, self.a & self.x)
+
+    # ------------------------------------------------------------------
+    # 读改写类指令
+    # ------------------------------------------------------------------
+
+    def _op_asl_a(self, _):
+        value = self.a << 1
+        self.c = value >> 8
+        self.a = self.nz = value & 0xFF
+
+    def _op_lsr_a(self, _):
+        self.c = self.a & 1
+        self.a = self.nz = self.a >> 1
+
+    def _op_rol_a(self, _):
+        value = (self.a << 1) | self.c
+        self.c = value >> 8
+        self.a = self.nz = value & 0xFF
+
+    def _op_ror_a(self, _):
+        value = self.a | (self.c << 8)
+        self.c = value & 1
+        self.a = self.nz = value >> 1
+
+    def _op_asl(self, address: int) -> int:
+        value = self.read(address) << 1
+        self.c = value >> 8
+        value &= 0xFF
+        self.write(address, value)
+        self.nz = value
+        return value
+
+    def _op_lsr(self, address: int) -> int:
+        value = self.read(address)
+        self.c = value & 1
+        value >>= 1
+        self.write(address, value)
+        self.nz = value
+        return value
+
+    def _op_rol(self, address: int) -> int:
+        value = (self.read(address) << 1) | self.c
+        self.c = value >> 8
+        value &= 0xFF
+        self.write(address, value)
+        self.nz = value
+        return value
+
+    def _op_ror(self, address: int) -> int:
+        value = self.read(address) | (self.c << 8)
+        self.c = value & 1
+        value >>= 1
+        self.write(address, value)
+        self.nz = value
+        return value
+
+    def _op_inc(self, address: int) -> int:
+        value = (self.read(address) + 1) & 0xFF
+        self.write(address, value)
+        self.nz = value
+        return value
+
+    def _op_dec(self, address: int) -> int:
+        value = (self.read(address) - 1) & 0xFF
+        self.write(address, value)
+        self.nz = value
+        return value
+
+    def _op_dcp(self, address: int):
+        self._op_cmp(self._op_dec(address))
+
+    def _op_isb(self, address: int):
+        self._op_sbc(self._op_inc(address))
+
+    def _op_slo(self, address: int):
+        self._op_ora(self._op_asl(address))
+
+    def _op_rla(self, address: int):
+        self._op_and(self._op_rol(address))
+
+    def _op_sre(self, address: int):
+        self._op_eor(self._op_lsr(address))
+
+    def _op_rra(self, address: int):
+        self._op_adc(self._op_ror(address))
+
+    # ------------------------------------------------------------------
+    # 分支与跳转
+    # ------------------------------------------------------------------
+
+    def _branch(self, offset: int):
+        pc = self.pc
+        target = (pc + offset - 256 if offset & 0x80 else pc + offset) & 0xFFFF
+        self.cycles += 2 if (target ^ pc) & 0xFF00 else 1
+        self.pc = target
+
+    def _op_bcc(self, offset: int):
+        if not self.c:
+            self._branch(offset)
+
+    def _op_bcs(self, offset: int):
+        if self.c:
+            self._branch(offset)
+
+    def _op_bne(self, offset: int):
+        if self.nz & 0xFF:
+            self._branch(offset)
+
+    def _op_beq(self, offset: int):
+        if not self.nz & 0xFF:
+            self._branch(offset)
+
+    def _op_bpl(self, offset: int):
+        if not self.nz & 0x180:
+            self._branch(offset)
+
+    def _op_bmi(self, offset: int):
+        if self.nz & 0x180:
+            self._branch(offset)
+
+    def _op_bvc(self, offset: int):
+        if not self.v:
+            self._branch(offset)
+
+    def _op_bvs(self, offset: int):
+        if self.v:
+            self._branch(offset)
+
+    def _op_jmp(self, address: int):
+        self.pc = address
+
+    def _op_jsr(self, address: int):
+        ret = (self.pc - 1) & 0xFFFF
+        self._push(ret >> 8)
+        self._push(ret & 0xFF)
+        self.pc = address
+
+    def _op_rts(self, _):
+        low = self._pull()
+        self.pc = (((self._pull() << 8) | low) + 1) & 0xFFFF
+
+    def _op_rti(self, _):
+        self.set_status(self._pull())
+        low = self._pull()
+        self.pc = (self._pull() << 8) | low
+
+    def _op_brk(self, _):
+        # BRK会跳过紧随其后的填充字节
+        self.pc = (self.pc + 1) & 0xFFFF
+        pc = self.pc
+        self._push(pc >> 8)
+        self._push(pc & 0xFF)
+        self._push(self.get_status() | 0x10)
+        self.i = 1
+        self.pc = self.read16(IRQ_VECTOR)
+
+    # ------------------------------------------------------------------
+    # 隐含寻址指令
+    # ------------------------------------------------------------------
+
+    def _op_clc(self, _):
+        self.c = 0
+
+    def _op_sec(self, _):
+        self.c = 1
+
+    def _op_cli(self, _):
+        self.i = 0
+
+    def _op_sei(self, _):
+        self.i = 1
+
+    def _op_cld(self, _):
+        self.d = 0
+
+    def _op_sed(self, _):
+        self.d = 1
+
+    def _op_clv(self, _):
+        self.v = 0
+
+    def _op_tax(self, _):
+        self.x = self.nz = self.a
+
+    def _op_tay(self, _):
+        self.y = self.nz = self.a
+
+    def _op_txa(self, _):
+        self.a = self.nz = self.x
+
+    def _op_tya(self, _):
+        self.a = self.nz = self.y
+
+    def _op_tsx(self, _):
+        self.x = self.nz = self.sp
+
+    def _op_txs(self, _):
+        self.sp = self.x
+
+    def _op_inx(self, _):
+        self.x = self.nz = (self.x + 1) & 0xFF
+
+    def _op_iny(self, _):
+        self.y = self.nz = (self.y + 1) & 0xFF
+
+    def _op_dex(self, _):
+        self.x = self.nz = (self.x - 1) & 0xFF
+
+    def _op_dey(self, _):
+        self.y = self.nz = (self.y - 1) & 0xFF
+
+    def _op_pha(self, _):
+        self._push(self.a)
+
+    def _op_php(self, _):
+        self._push(self.get_status() | 0x10)
+
+    def _op_pla(self, _):
+        self.a = self.nz = self._pull()
+
+    def _op_plp(self, _):
+        self.set_status(self._pull())
+
+
+# 基准测试程序：混合了变址读写、算术、零页、子程序调用和分支的循环
+BENCHMARK_PROGRAM = bytes([
+    0xA2, 0x00,             # 8000 LDX #$00
+    0xBD, 0x00, 0x02,       # 8002 LDA $0200,X
+    0x18,                   # 8005 CLC
+    0x69, 0x03,             # 8006 ADC #$03
+    0x9D, 0x00, 0x02,       # 8008 STA $0200,X
+    0xA5, 0x10,             # 800B LDA $10
+    0x49, 0xFF,             # 800D EOR #$FF
+    0x85, 0x10,             # 800F STA $10
+    0xE8,                   # 8011 INX
+    0xD0, 0xEE,             # 8012 BNE $8002
+    0xE6, 0x11,             # 8014 INC $11
+    0x20, 0x1C, 0x80,       # 8016 JSR $801C
+    0x4C, 0x00, 0x80,       # 8019 JMP $8000
+    0x48,                   # 801C PHA
+    0x68,                   # 801D PLA
+    0x60,                   # 801E RTS
+    0x40,                   # 801F RTI
+])
+
+
+def build_benchmark_prg() -> bytes:
+    """生成16KB的基准测试PRG ROM"""
+    prg = bytearray(0x4000)
+    prg[:len(BENCHMARK_PROGRAM)] = BENCHMARK_PROGRAM
+    prg[0x3FFA:0x4000] = bytes([0x1F, 0x80, 0x00, 0x80, 0x1F, 0x80])
+    return bytes(prg)
+
+
+def benchmark_cpu(frames: int = 120, prg_rom: Optional[bytes] = None,
+                  block_cache: bool = True) -> Dict:
+    """CPU基准测试，返回每秒周期数等指标"""
+    bus = MemoryBus(prg_rom or build_benchmark_prg())
+    cpu = CPU6502(bus, block_cache=block_cache)
+    cpu.power_on()
+
+    # 预热一帧
+    cpu.run(CYCLES_PER_FRAME)
+
+    start_cycles = cpu.cycles
+    start_instructions = cpu.instructions
+    start = time.perf_counter()
+    for _ in range(frames):
+        cpu.run(CYCLES_PER_FRAME)
+    elapsed = time.perf_counter() - start
+
+    cycles = cpu.cycles - start_cycles
+    cycles_per_second = cycles / elapsed if elapsed > 0 else 0.0
+    return {
+        'frames': frames,
+        'cycles': cycles,
+        'instructions': cpu.instructions - start_instructions,
+        'seconds': round(elapsed, 4),
+        'cycles_per_second': int(cycles_per_second),
+        'ms_per_frame': round(elapsed * 1000 / frames, 3),
+        'realtime_ratio': round(cycles_per_second / CPU_FREQUENCY, 3),
+        'block_cache': cpu.get_block_cache_stats(),
+    }
+
+
+def main():
+    """主函数"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="6502 CPU核心基准测试")
+    parser.add_argument("--frames", type=int, default=120, help="运行的帧数")
+    parser.add_argument("--rom", help="使用指定NES ROM的PRG代码代替内置测试程序")
+    parser.add_argument("--no-block-cache", action="store_true", help="禁用指令块缓存")
+
+    args = parser.parse_args()
+
+    prg_rom = None
+    if args.rom:
+        data = Path(args.rom).read_bytes()
+        prg_rom = data[16:16 + data[4] * 0x4000]
+
+    result = benchmark_cpu(args.frames, prg_rom, block_cache=not args.no_block_cache)
+    print(json.dumps(result, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -6,24 +6,79 @@
 
 import os
 import sys
+import json
+import queue
+import contextlib
+
+# 导入pygame时不打印欢迎信息（基准测试的标准输出只有JSON）
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
 import pygame
 import struct
 import time
 import threading
+import multiprocessing
+import numpy as np
 from pathlib import Path
-from typing import Optional, Tuple, List, Dict
+from typing import Callable, Optional, Tuple, List, Dict
 
 # 导入新的管理器
 try:
     from save_manager import SaveManager
     from cheat_manager import CheatManager
     from device_manager import DeviceManager
+    from nes_bus import MemoryBus, CONTROLLER_BUTTONS
+    from nes_cpu import CPU6502, IRQ_APU
+    from nes_mapper import create_mapper
+    from nes_ppu import PPU, palette_lut
+    from nes_apu import APU, SAMPLE_RATE, create_audio_stream
+    from nes_scheduler import Scheduler
+    from frame_pacer import FramePacer
+    from frame_presenter import DirtyRectPresenter, create_renderer_presenter
+    from layer_compositor import LayerCompositor
+    from text_cache import TextCache
+    from entity_store import EntityStore, collide
+    from gc_policy import GCPolicy
+    from frame_profiler import FrameProfiler, GRAPH_FRAMES, GRAPH_HEIGHT
+    from rewind_buffer import RewindBuffer
+    from run_ahead import RunAhead
+    from input_movie import InputMovie, rom_hash
+    from frame_hashes import FrameHashes, golden_path
+    from savestate import pack_savestate, unpack_savestate
+    from netplay import RollbackSession, UDPTransport
+    from frame_channel import FrameChannel, FRAME_SHAPE, STATUS_STARTING, STATUS_RUNNING, STATUS_FAILED
 except ImportError:
     # 如果在不同目录运行，尝试相对导入
     sys.path.append(os.path.dirname(__file__))
     from save_manager import SaveManager
     from cheat_manager import CheatManager
     from device_manager import DeviceManager
+    from nes_bus import MemoryBus, CONTROLLER_BUTTONS
+    from nes_cpu import CPU6502, IRQ_APU
+    from nes_mapper import create_mapper
+    from nes_ppu import PPU, palette_lut
+    from nes_apu import APU, SAMPLE_RATE, create_audio_stream
+    from nes_scheduler import Scheduler
+    from frame_pacer import FramePacer
+    from frame_presenter import DirtyRectPresenter, create_renderer_presenter
+    from layer_compositor import LayerCompositor
+    from text_cache import TextCache
+    from entity_store import EntityStore, collide
+    from gc_policy import GCPolicy
+    from frame_profiler import FrameProfiler, GRAPH_FRAMES, GRAPH_HEIGHT
+    from rewind_buffer import RewindBuffer
+    from run_ahead import RunAhead
+    from input_movie import InputMovie, rom_hash
+    from frame_hashes import FrameHashes, golden_path
+    from savestate import pack_savestate, unpack_savestate
+    from netplay import RollbackSession, UDPTransport
+    from frame_channel import FrameChannel, FRAME_SHAPE, STATUS_STARTING, STATUS_RUNNING, STATUS_FAILED
+
+# 即时存档各段的标签
+CPU_SECTIONS = (b'CPU ', b'BUS ', b'PPU ', b'MAPR', b'APU ', b'SCHD')
+DEMO_SECTIONS = (b'DEMO', b'ENEM', b'BULL')
+
+# 演示模式存档的游戏变量段：玩家位置、分数、生命、等级、逻辑帧号、压力测试随机数发生器（PCG64）
+DEMO_STATE = struct.Struct('<iiiiiI16s16sBI')
 
 
 class NESEmulator:
@@ -53,8 +108,20 @@ class NESEmulator:
         except:
             return pygame.font.Font(None, size)
 
-    def __init__(self):
-        """TODO: 添加文档字符串"""
+    def __init__(self, headless: bool = False, fullscreen: bool = False, renderer: str = 'software'):
+        """初始化模拟器
+
+        Args:
+            headless: 使用SDL虚拟显示/音频驱动，不输出画面和声音
+            fullscreen: 按检测到的显示分辨率全屏，整数倍缩放并居中
+            renderer: 'software'（脏矩形软件缩放）或 'sdl2'（SDL2渲染器纹理缩放，
+                      没有硬件加速渲染器时退回软件路径）
+        """
+        self.headless = headless
+        if headless:
+            os.environ['SDL_VIDEODRIVER'] = 'dummy'
+            os.environ['SDL_AUDIODRIVER'] = 'dummy'
+
         # 初始化Pygame
         pygame.init()
 
@@ -63,12 +130,29 @@ class NESEmulator:
         self.NES_HEIGHT = 240
         self.SCALE = 3
 
-        # 创建窗口
-        self.screen = pygame.display.set_mode((self.NES_WIDTH * self.SCALE, self.NES_HEIGHT * self.SCALE))
-        pygame.display.set_caption("NES Emulator - Enhanced")
+        # 创建窗口和画面输出
+        title = "NES Emulator - Enhanced"
+        window_size = (self.NES_WIDTH * self.SCALE, self.NES_HEIGHT * self.SCALE)
+        self.screen = None
+        self.presenter = None
+        if renderer == 'sdl2' and not headless:
+            # 渲染器自己创建窗口，不能再调用set_mode
+            self.nes_screen = pygame.Surface((self.NES_WIDTH, self.NES_HEIGHT), 0, 32)
+            self.presenter = create_renderer_presenter(self.nes_screen, title, window_size, fullscreen)
+
+        if self.presenter is None:
+            if fullscreen and not headless:
+                self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+            else:
+                self.screen = pygame.display.set_mode(window_size)
+            pygame.display.set_caption(title)
 
-        # 创建NES屏幕表面
-        self.nes_screen = pygame.Surface((self.NES_WIDTH, self.NES_HEIGHT))
+            # NES屏幕表面（与显示表面同格式）
+            self.nes_screen = pygame.Surface((self.NES_WIDTH, self.NES_HEIGHT))
+
+            # 脏矩形输出：只缩放和提交变化的区域
+            self.presenter = DirtyRectPresenter(self.screen, self.nes_screen)
+        self.SCALE = self.presenter.scale
 
         # 初始化管理器
         self.save_manager = SaveManager()
@@ -86,38 +170,65 @@ class NESEmulator:
         self.BLUE = (0, 0, 255)
         self.YELLOW = (255, 255, 0)
 
-        # NES调色板（简化版）
-        self.nes_palette = [
-            (84, 84, 84), (0, 30, 116), (8, 16, 144), (48, 0, 136),
-            (68, 0, 100), (92, 0, 48), (84, 4, 0), (60, 24, 0),
-            (32, 42, 0), (8, 58, 0), (0, 64, 0), (0, 60, 0),
-            (0, 50, 60), (0, 0, 0), (0, 0, 0), (0, 0, 0),
-            (152, 150, 152), (8, 76, 196), (48, 50, 236), (92, 30, 228),
-            (136, 20, 176), (160, 20, 100), (152, 34, 32), (120, 60, 0),
-            (84, 90, 0), (40, 114, 0), (8, 124, 0), (0, 118, 40),
-            (0, 102, 120), (0, 0, 0), (0, 0, 0), (0, 0, 0)
-        ]
+        # NES调色板（64色RGB查找表，按PPU帧缓冲的索引整帧转换）
+        self.nes_palette = palette_lut()
+        self.rgb_frame = np.zeros((self.NES_HEIGHT, self.NES_WIDTH, 3), dtype=np.uint8)
+
+        # 8位调色板表面：每帧只需传输索引数据（--paletted）
+        self.paletted_output = False
+        self.frame_surface = pygame.Surface((self.NES_WIDTH, self.NES_HEIGHT), depth=8)
+        self.frame_surface.set_palette([tuple(color) for color in self.nes_palette])
 
         # 游戏状态
         self.running = False
         self.paused = False
         self.rom_loaded = False
         self.rom_data = None
+        self.rom_sha1 = rom_hash(b'')
         self.rom_info = {}
 
-        # 模拟的游戏对象
+        # 模拟器核心（加载ROM后创建）
+        self.bus = None
+        self.mapper = None
+        self.cpu = None
+        self.ppu = None
+        self.apu = None
+        self.scheduler = None
+        self.trace_scheduler = False
+        self.cpu_active = False
+
+        # APU样本输出（pygame.mixer不可用时为None）
+        self.audio_stream = None if headless else create_audio_stream()
+
+        # 模拟的游戏对象（敌人和子弹保存在预分配的结构数组中）
         self.player_x = 50
         self.player_y = 200
-        self.enemies = []
-        self.bullets = []
+        self.stress_objects = 0
+        self.stress_rng = np.random.default_rng(0)
+        self.enemies = EntityStore(64, 15, 15)
+        self.bullets = EntityStore(64, 5, 5)
+        self.enemy_sprites = []
+        for color in (self.RED, (255, 128, 0), (255, 0, 255)):
+            sprite = pygame.Surface((15, 15)).convert(self.nes_screen)
+            sprite.fill(color)
+            self.enemy_sprites.append(sprite)
+        self.bullet_sprite = pygame.Surface((5, 5)).convert(self.nes_screen)
+        self.bullet_sprite.fill(self.YELLOW)
         self.score = 0
         self.lives = 3
         self.level = 1
+        # 游戏逻辑的帧号（属于游戏状态，快照和录像回放时一起恢复）
+        self.logic_frame = 0
 
-        # 时钟
+        # 时钟：按NTSC帧率定时，超时自动跳帧
         self.clock = pygame.time.Clock()
+        self.frame_pacer = FramePacer()
         self.frame_count = 0
 
+        # 基准测试：每帧耗时（秒），仅在限定帧数运行时记录
+        self.frame_times = None
+        self.benchmark_elapsed = 0.0
+
         # 字体设置 - 修复中文显示问题
         self.font = self.get_system_font(24)
         self.small_font = self.get_system_font(16)
@@ -138,6 +249,67 @@ class NESEmulator:
         self.use_external_controller = True
         self.controller_deadzone = 0.3
 
+        # 每帧复用的输入状态：按键绑定表、外部控制器输入和手柄位
+        self.key_bindings = (
+            ('up', (pygame.K_UP, pygame.K_w)),
+            ('down', (pygame.K_DOWN, pygame.K_s)),
+            ('left', (pygame.K_LEFT, pygame.K_a)),
+            ('right', (pygame.K_RIGHT, pygame.K_d)),
+            ('a', (pygame.K_SPACE, pygame.K_z)),
+            ('b', (pygame.K_LSHIFT, pygame.K_x)),
+            ('start', (pygame.K_RETURN,)),
+            ('select', (pygame.K_TAB,))
+        )
+        self.external_input = dict.fromkeys(self.controller, False)
+        self.button_bits = tuple((key, 1 << bit) for bit, key in enumerate(CONTROLLER_BUTTONS))
+
+        # 垃圾回收：游戏中不做第2代回收，暂停和选择ROM时整体回收
+        self.gc_policy = GCPolicy()
+
+        # 分阶段帧耗时统计（enable_profiler后才有，关闭时run循环不计时）
+        self.profiler = None
+        self.profile_log = None
+
+        # 倒带（enable_rewind后才有）：按住Backspace时每帧退回一个快照
+        self.rewind = None
+        self.rewinding = False
+
+        # 预运行（enable_run_ahead后才有）：显示提前若干帧模拟出的画面
+        self.run_ahead = None
+
+        # 输入录像：movie_mode 为 'record'、'play' 或 None；
+        # movie_record_path/movie_play_path 在run()加载ROM后开始录制或回放
+        self.movie = None
+        self.movie_mode = None
+        self.movie_frame = 0
+        self.movie_record_path = None
+        self.movie_play_path = None
+
+        # 逐帧画面校验（enable_frame_hashes后才有）：退出时与基准比较，没有基准时写入基准；
+        # 基准默认放在回放的录像旁边
+        self.frame_hashes = None
+        self.golden_hashes_path = None
+        self.update_golden = False
+        self.golden_result = None
+
+        # 回滚联机（enable_netplay后才有）：每帧交换输入，预测错误时恢复快照重新模拟
+        self.netplay = None
+        self.buttons = 0
+
+        # 子进程模拟：模拟在另一个进程中运行，帧经共享内存传来，本进程只处理输入和显示，
+        # 不创建自己的模拟器核心；作弊码等内存写入经队列转给模拟进程
+        self.subprocess_emulation = False
+        self.emulation_process = None
+        self.frame_channel = None
+        self.frame_channel_stats = None
+        self.channel_frame = None
+        self.memory_writes = None
+
+        # 静态图层和文字渲染缓存
+        self.layers = LayerCompositor()
+        self.text_cache = TextCache()
+        self.init_layers()
+
     def load_rom(self, rom_path: str):
         """加载ROM文件"""
         try:
@@ -148,6 +320,7 @@ class NESEmulator:
 
             with open(rom_file, 'rb') as f:
                 self.rom_data = f.read()
+            self.rom_sha1 = rom_hash(self.rom_data)
 
             # 解析ROM头部
             if len(self.rom_data) < 16:
@@ -167,26 +340,44 @@ class NESEmulator:
                 'flags6': header[6],
                 'flags7': header[7],
                 'mapper': ((header[7] & 0xF0) | (header[6] >> 4)),
-                'mirroring': 'vertical' if (header[6] & 1) else 'horizontal'
+                'mirroring': ('four_screen' if (header[6] & 0x08) else
+                              'vertical' if (header[6] & 1) else 'horizontal'),
+                'trainer': bool(header[6] & 0x04)
             }
 
             self.rom_loaded = True
             self.current_rom_path = rom_path
+            self.layers.invalidate('rom_info')
             print(f"ROM加载成功: {self.rom_info['name']}")
             print(f"PRG ROM: {self.rom_info['prg_size']}KB")
             print(f"CHR ROM: {self.rom_info['chr_size']}KB")
             print(f"Mapper: {self.rom_info['mapper']}")
 
+            # 初始化CPU核心：子进程模拟时核心只在模拟进程中创建，启动失败时才在本进程中创建
+            if self.frame_channel is not None:
+                self.stop_emulation_process()
+            if not (self.subprocess_emulation and self.start_emulation_process()):
+                self.init_cpu_core()
+
             # 初始化游戏状态
             self.init_game_state()
+            if self.rewind is not None:
+                self.rewind.clear()
+
+            # 选择ROM时不在游戏中，整体回收上一个ROM留下的对象；加载耗时不算作落后
+            self.gc_policy.collect()
+            self.frame_pacer.reset()
+
+            # 无界面模式只做基准测试：不连接设备、不读写存档
+            if self.headless:
+                return True
 
             # 自动连接设备
             self.device_manager.auto_connect_devices()
             self.device_manager.start_device_monitor()
 
             # 自动启用作弊码
-            self.cheat_manager.auto_enable_cheats(rom_path)
-            self.cheat_manager.start_cheat_monitor(self)
+            self.cheat_manager.auto_enable_cheats_for_game('nes', rom_file.stem)
 
             # 尝试加载存档
             self.auto_load_save()
@@ -200,51 +391,466 @@ class NESEmulator:
             print(f"ROM加载失败: {e}")
             return False
 
+    def get_prg_rom(self) -> memoryview:
+        """从ROM数据中截取PRG ROM（不复制）"""
+        start = 16 + (512 if self.rom_info.get('trainer') else 0)
+        return memoryview(self.rom_data)[start:start + self.rom_info['prg_size'] * 1024]
+
+    def get_chr_rom(self) -> memoryview:
+        """从ROM数据中截取CHR ROM（不复制），没有CHR ROM时为空"""
+        start = 16 + (512 if self.rom_info.get('trainer') else 0) + self.rom_info['prg_size'] * 1024
+        return memoryview(self.rom_data)[start:start + self.rom_info['chr_size'] * 1024]
+
+    def init_cpu_core(self):
+        """创建总线、Mapper和CPU并执行上电复位"""
+        self.bus = MemoryBus(self.get_prg_rom())
+        self.mapper = create_mapper(self.rom_info['mapper'], self.bus,
+                                    self.get_chr_rom(), self.rom_info['mirroring'])
+        self.cpu = CPU6502(self.bus)
+        self.ppu = None
+        self.apu = None
+        self.scheduler = None
+
+        if self.mapper is None:
+            print(f"⚠️ 暂不支持Mapper {self.rom_info['mapper']}，使用演示模式")
+            self.cpu_active = False
+            return
+
+        self.ppu = PPU(self.mapper)
+        self.ppu.nmi_callback = self.cpu.trigger_nmi
+        cache_stats = self.ppu.tile_cache.get_stats()
+        print(f"CHR图块缓存: {cache_stats['tiles']} 个图块, "
+              f"{cache_stats['bytes'] / 1024:.0f}KB")
+        self.bus.attach_ppu(self.ppu)
+        self.mapper.irq_callback = self.cpu.set_irq
+
+        sample_rate = self.audio_stream.sample_rate if self.audio_stream else SAMPLE_RATE
+        self.apu = APU(self.bus, sample_rate)
+        self.apu.irq_callback = lambda asserted: self.cpu.set_irq(asserted, IRQ_APU)
+        self.bus.attach_apu(self.apu)
+        self.scheduler = Scheduler(self.cpu, self.ppu, self.apu, self.mapper,
+                                   trace=self.trace_scheduler)
+        self.cpu.power_on()
+
+        # 复位向量不在卡带PRG空间内的ROM没有可执行程序，使用演示模式
+        self.cpu_active = self.cpu.pc >= 0x8000
+        if self.cpu_active:
+            print(f"CPU复位向量: ${self.cpu.pc:04X} ({self.mapper.name})")
+        else:
+            print("ROM没有有效的复位向量，使用演示模式")
+
+    def reset_console(self):
+        """复位（R键）：重新创建CPU、PPU、APU、Mapper和调度器，PPU追赶位置与CPU周期重新对齐；
+        与实机复位一样保留内部RAM和卡带RAM"""
+        ram = bytes(self.bus.ram)
+        prg_ram = bytes(self.bus.prg_ram)
+        self.init_cpu_core()
+        self.bus.ram[:] = ram
+        self.bus.prg_ram[:] = prg_ram
+
+    def emulate_frame(self, audio: bool = True):
+        """执行一帧：CPU运行到下一个定时事件，PPU/APU按需追赶
+
+        Args:
+            audio: False时本帧样本不送入音频输出（倒带、预运行等非正常播放）
+        """
+        if not self.rom_loaded or self.paused:
+            return
+
+        self.scheduler.run_frame()
+
+        samples = self.apu.end_frame(self.cpu.cycles)
+        # 快进时静音：样本照常合成（APU状态保持一致），只是不送去播放
+        if audio and self.audio_stream is not None and not self.frame_pacer.fast_forward:
+            self.audio_stream.push(samples)
+            self.audio_stream.pump()
+
+    def state_parts(self) -> Tuple:
+        """即时存档的 (标签, 组件) 列表；演示模式的第一段是游戏变量，由本类自己打包"""
+        if self.cpu_active:
+            parts = (self.cpu, self.bus, self.ppu, self.mapper, self.apu, self.scheduler)
+            return tuple(zip(CPU_SECTIONS, parts))
+        return tuple(zip(DEMO_SECTIONS, (None, self.enemies, self.bullets)))
+
+    def capture_state(self, compress: bool = False) -> bytes:
+        """当前模拟状态的二进制即时存档（不含画面和主机侧设置，不压缩时同一ROM下长度固定）
+
+        Args:
+            compress: 用zlib压缩（写入存档文件时用；倒带和预运行不压缩）
+        """
+        sections = []
+        for tag, part in self.state_parts():
+            sections.append((tag, part.save_state() if part is not None else self.save_demo_state()))
+        return pack_savestate(sections, self.rom_sha1, compress)
+
+    def restore_state(self, data):
+        """恢复 capture_state() 的存档，ROM或模式不符时抛出ValueError（此时状态不变）"""
+        rom_sha1, sections = unpack_savestate(data)
+        if rom_sha1 != self.rom_sha1:
+            raise ValueError("存档与当前ROM不匹配")
+        parts = self.state_parts()
+        for tag, part in parts:
+            section = sections.get(tag)
+            size = part.state_size if part is not None else DEMO_STATE.size
+            if section is None or len(section) != size:
+                raise ValueError("存档与当前模式不符")
+        for tag, part in parts:
+            if part is not None:
+                part.load_state(sections[tag])
+            else:
+                self.load_demo_state(sections[tag])
+
+    def save_demo_state(self) -> bytes:
+        """演示模式的游戏变量和压力测试随机数发生器状态"""
+        rng = self.stress_rng.bit_generator.state
+        return DEMO_STATE.pack(self.player_x, self.player_y, self.score, self.lives, self.level,
+                               self.logic_frame, rng['state']['state'].to_bytes(16, 'little'),
+                               rng['state']['inc'].to_bytes(16, 'little'),
+                               rng['has_uint32'], rng['uinteger'])
+
+    def load_demo_state(self, data):
+        """从 save_demo_state() 的数据恢复"""
+        (self.player_x, self.player_y, self.score, self.lives, self.level, self.logic_frame,
+         rng_state, rng_inc, has_uint32, uinteger) = DEMO_STATE.unpack_from(data)
+        self.stress_rng.bit_generator.state = {
+            'bit_generator': 'PCG64',
+            'state': {'state': int.from_bytes(rng_state, 'little'),
+                      'inc': int.from_bytes(rng_inc, 'little')},
+            'has_uint32': has_uint32, 'uinteger': uinteger
+        }
+
+    def enable_rewind(self, max_mb: int = 32, interval: int = 2):
+        """打开倒带
+
+        Args:
+            max_mb: 快照环的内存上限（MB）
+            interval: 每隔多少帧记录一次快照，按住倒带时每帧退回一个快照
+        """
+        self.rewind = RewindBuffer(max_mb * 1024 * 1024, interval)
+
+    def record_rewind(self):
+        """按间隔记录倒带快照（暂停和倒带过程中不记录）"""
+        if not self.rewinding and not self.paused and self.rewind.due(self.frame_count):
+            self.rewind.record(self.capture_state)
+
+    def rewind_step(self):
+        """倒带键按住时代替正常模拟：恢复上一个快照"""
+        if self.paused:
+            return
+        snapshot = self.rewind.step_back()
+        if snapshot is None:
+            return
+        self.restore_state(snapshot)
+        if self.cpu_active:
+            # 帧缓冲不在快照里，从恢复点静音模拟一帧得到画面
+            self.emulate_frame(audio=False)
+
+    def enable_run_ahead(self, frames: int = 1):
+        """打开预运行：每个显示帧先用当前输入多模拟frames帧，显示后再恢复"""
+        self.run_ahead = RunAhead(frames)
+
+    def run_ahead_active(self) -> bool:
+        """本帧是否预运行（只对CPU模拟有效，暂停、倒带和快进时不做）"""
+        return (self.run_ahead is not None and self.cpu_active and self.netplay is None and
+                not self.paused and not self.rewinding and not self.frame_pacer.fast_forward)
+
+    def render_ahead(self):
+        """预运行并显示：内存快照 -> 静音模拟 -> 显示最后一帧 -> 恢复快照"""
+        self.run_ahead.run(self.capture_state, self.restore_state,
+                           self.emulate_ahead_frame, self.render_game)
+
+    def emulate_ahead_frame(self):
+        """预运行中的一帧：不输出声音"""
+        self.emulate_frame(audio=False)
+
+    def enable_frame_hashes(self, interval: int = 1):
+        """打开逐帧画面校验，每隔interval帧计算一次CRC32"""
+        self.frame_hashes = FrameHashes(interval)
+
+    def hash_frame(self):
+        """对本帧模拟结果求校验值：CPU模式用PPU帧缓冲；演示模式的画面带实时帧率，
+        用游戏状态快照代替"""
+        if self.paused or self.rewinding:
+            return
+        if self.cpu_active:
+            self.frame_hashes.update(self.ppu.framebuffer)
+        else:
+            self.frame_hashes.update(self.capture_state())
+
+    def finish_frame_hashes(self) -> Optional[Dict]:
+        """与基准校验比较（没有基准或要求更新时写入基准），返回结果"""
+        path = self.golden_hashes_path
+        if path is None and self.movie_play_path:
+            path = golden_path(self.movie_play_path)
+        if path is None:
+            return None
+        hashes = self.frame_hashes
+        hashes.rom_sha1 = self.rom_sha1
+        path = Path(path)
+        if self.update_golden or not path.exists():
+            hashes.save(path)
+            self.golden_result = {'golden': str(path), 'status': 'written', 'first_divergence': None}
+            print(f"🔏 画面基准已写入: {path}（{len(hashes)} 个校验值）")
+            return self.golden_result
+
+        golden = FrameHashes.load(path)
+        if golden.rom_sha1 != hashes.rom_sha1:
+            raise ValueError("画面基准与当前ROM不匹配")
+        frame = hashes.first_divergence(golden)
+        self.golden_result = {'golden': str(path), 'status': 'match' if frame is None else 'diverged',
+                              'first_divergence': frame}
+        if frame is None:
+            print(f"✅ 画面与基准一致（{len(hashes)} 个校验值）")
+        else:
+            print(f"❌ 画面与基准不一致: 第 {frame} 帧")
+        return self.golden_result
+
+    def enable_netplay(self, local_port: int, bind: Tuple[str, int], peer: Tuple[str, int],
+                       max_rollback: int = 8, transport=None):
+        """打开回滚联机
+
+        Args:
+            local_port: 本机玩家使用的手柄端口（0为1P，1为2P）
+            bind: 本地UDP地址
+            peer: 对方UDP地址
+            max_rollback: 最多领先对方已确认输入的帧数
+            transport: 自定义传输层（测试工具注入延迟和丢包时用）
+        """
+        if self.rewind is not None:
+            # 回滚自己保存快照；倒带会让两边状态不一致，也不再记录倒带快照
+            print("⚠️ 联机时不能倒带，已关闭倒带")
+            self.rewind = None
+            self.rewinding = False
+        if transport is None:
+            transport = UDPTransport(bind, peer)
+        self.netplay = RollbackSession(transport, local_port, self.capture_state, self.restore_state,
+                                       self.emulate_netplay_frame, max_rollback)
+        print(f"🌐 回滚联机: 本机 {local_port + 1}P, 对方 {peer[0]}:{peer[1]}")
+
+    def netplay_step(self) -> bool:
+        """联机时代替正常模拟：交换输入、必要时回滚，再模拟一帧（领先太多时本帧等待）"""
+        if self.paused:
+            return False
+        return self.netplay.advance(self.buttons)
+
+    def emulate_netplay_frame(self, inputs: Tuple[int, int], audio: bool):
+        """用双方的输入模拟一帧；重新模拟时静音"""
+        if self.bus is not None:
+            self.bus.set_controller(0, inputs[0])
+            self.bus.set_controller(1, inputs[1])
+        if self.cpu_active:
+            self.emulate_frame(audio=audio)
+        else:
+            # 演示模式只有一个玩家，由两边的手柄共同控制（两边合并的结果相同）
+            buttons = inputs[0] | inputs[1]
+            for key, bit in self.button_bits:
+                self.controller[key] = bool(buttons & bit)
+            self.update_game_logic()
+
+    def subprocess_conflicts(self) -> List[str]:
+        """需要本进程模拟核心、因而不能与子进程模拟同时使用的功能"""
+        conflicts = []
+        if self.rewind is not None:
+            conflicts.append("倒带")
+        if self.run_ahead is not None:
+            conflicts.append("预运行")
+        if self.netplay is not None:
+            conflicts.append("联机")
+        if self.movie_play_path or self.movie_record_path:
+            conflicts.append("录像")
+        if self.frame_hashes is not None:
+            conflicts.append("画面校验")
+        return conflicts
+
+    def start_emulation_process(self) -> bool:
+        """在子进程中模拟当前ROM（只支持CPU模拟；ROM只能演示模式运行时返回False）"""
+        # 声音由模拟进程输出，先释放本进程的音频设备
+        audio = self.audio_stream is not None
+        if audio:
+            self.audio_stream.stop()
+            self.audio_stream = None
+            pygame.mixer.quit()
+
+        channel = FrameChannel()
+        # 父进程已初始化SDL，用spawn启动干净的解释器
+        context = multiprocessing.get_context('spawn')
+        memory_writes = context.Queue()
+        process = context.Process(target=emulation_worker, name='nes-emulation',
+                                  args=(self.current_rom_path, channel.name, audio, memory_writes),
+                                  daemon=True)
+        process.start()
+        deadline = time.perf_counter() + 30
+        while channel.status == STATUS_STARTING and process.is_alive() and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        if channel.status != STATUS_RUNNING:
+            print("⚠️ 模拟子进程启动失败（或ROM只能以演示模式运行），继续在本进程中运行")
+            channel.request_stop()
+            process.join(2)
+            channel.close()
+            memory_writes.close()
+            if audio:
+                self.audio_stream = create_audio_stream()
+            return False
+
+        self.frame_channel = channel
+        self.emulation_process = process
+        self.memory_writes = memory_writes
+        self.channel_frame = np.zeros(FRAME_SHAPE, dtype=np.uint8)
+        self.bus = self.mapper = self.cpu = self.ppu = self.apu = self.scheduler = None
+        self.cpu_active = True
+        print(f"🧵 模拟在子进程中运行 (pid {process.pid})")
+        return True
+
+    def receive_frame(self) -> int:
+        """子进程模拟时代替emulate_frame：送出输入，取回最新一帧（没有新帧时沿用上一帧）"""
+        channel = self.frame_channel
+        channel.buttons = self.buttons
+        channel.paused = self.paused
+        return channel.read_latest(self.channel_frame)
+
+    def stop_emulation_process(self):
+        """通知模拟子进程退出并释放共享内存"""
+        channel = self.frame_channel
+        channel.request_stop()
+        self.emulation_process.join(2)
+        if self.emulation_process.is_alive():
+            self.emulation_process.terminate()
+            self.emulation_process.join()
+        stats = self.frame_channel_stats = channel.get_stats()
+        print(f"🧵 子进程模拟: 发布 {stats['published']} 帧, 显示 {stats['received']} 帧, "
+              f"跳过 {stats['skipped']} 帧")
+        channel.close()
+        # 模拟进程已退出，不再等待队列中没送出的写入
+        self.memory_writes.cancel_join_thread()
+        self.memory_writes.close()
+        self.frame_channel = None
+        self.emulation_process = None
+        self.memory_writes = None
+
+    def present_ppu_frame(self):
+        """把PPU帧缓冲整帧转换后写入NES屏幕表面"""
+        framebuffer = self.channel_frame if self.frame_channel is not None else self.ppu.framebuffer
+        if self.paletted_output:
+            pygame.surfarray.blit_array(self.frame_surface, framebuffer.T)
+            self.nes_screen.blit(self.frame_surface, (0, 0))
+        else:
+            np.take(self.nes_palette, framebuffer, axis=0, out=self.rgb_frame)
+            pygame.surfarray.blit_array(self.nes_screen, self.rgb_frame.swapaxes(0, 1))
+
     def init_game_state(self):
         """初始化游戏状态"""
         # 重置游戏对象
         self.player_x = 50
         self.player_y = 200
-        self.enemies = []
-        self.bullets = []
         self.score = 0
         self.lives = 3
         self.level = 1
+        self.logic_frame = 0
+
+        # 压力测试需要更大的实体池
+        capacity = max(64, self.stress_objects)
+        if self.enemies.capacity != capacity:
+            self.enemies = EntityStore(capacity, 15, 15)
+            self.bullets = EntityStore(capacity * 2, 5, 5)
+        self.enemies.clear()
+        self.bullets.clear()
 
         # 生成初始敌人
         for i in range(5):
-            self.enemies.append({
-                'x': 200 + i * 60,
-                'y': 50 + (i % 3) * 50,
-                'dx': -1,
-                'dy': 0,
-                'type': i % 3
-            })
+            self.enemies.spawn(200 + i * 60, 50 + (i % 3) * 50, -1, 0, i % 3)
+        if self.stress_objects:
+            self.spawn_stress_enemies(self.stress_objects - len(self.enemies), random_x=True)
+
+    def spawn_stress_enemies(self, count: int, random_x: bool = False):
+        """压力测试：生成随机位置和速度的敌人"""
+        if count <= 0:
+            return
+        rng = self.stress_rng
+        x = rng.integers(11, self.NES_WIDTH - 20, count) if random_x else self.NES_WIDTH - 21
+        self.enemies.spawn_many(x, rng.integers(11, self.NES_HEIGHT - 20, count),
+                                rng.choice([-2, -1, 1, 2], count), rng.choice([-2, -1, 1, 2], count),
+                                rng.integers(0, 3, count))
 
     def update_controller(self):
         """更新控制器状态"""
-        # 键盘输入
-        keys = pygame.key.get_pressed()
-
-        keyboard_input = {
-            'up': keys[pygame.K_UP] or keys[pygame.K_w],
-            'down': keys[pygame.K_DOWN] or keys[pygame.K_s],
-            'left': keys[pygame.K_LEFT] or keys[pygame.K_a],
-            'right': keys[pygame.K_RIGHT] or keys[pygame.K_d],
-            'a': keys[pygame.K_SPACE] or keys[pygame.K_z],
-            'b': keys[pygame.K_LSHIFT] or keys[pygame.K_x],
-            'start': keys[pygame.K_RETURN],
-            'select': keys[pygame.K_TAB]
-        }
+        if self.movie_mode == 'play':
+            self.play_movie_frame()
+            return
 
-        # 外部控制器输入
-        controller_input = {}
-        if self.use_external_controller:
-            controller_input = self.get_external_controller_input()
+        # 键盘和外部控制器任一输入都有效；直接写入已有的controller字典，每帧不新建对象
+        keys = pygame.key.get_pressed()
+        controller = self.controller
+        external = self.get_external_controller_input() if self.use_external_controller else None
+
+        for key, codes in self.key_bindings:
+            pressed = False
+            for code in codes:
+                if keys[code]:
+                    pressed = True
+                    break
+            if not pressed and external is not None:
+                pressed = external[key]
+            controller[key] = pressed
+
+        # 同步到总线上的1号手柄，录像时记下本帧的按键（联机时由netplay_step分配端口）
+        buttons = 0
+        for key, bit in self.button_bits:
+            if controller[key]:
+                buttons |= bit
+        self.buttons = buttons
+        if self.bus is not None and self.netplay is None:
+            self.bus.set_controller(0, buttons)
+        if self.movie_mode == 'record' and not self.paused and not self.rewinding:
+            self.movie.record(buttons)
+
+    def play_movie_frame(self):
+        """回放录像中的一帧输入，录像结束后恢复实时输入（无界面模式下直接退出）"""
+        if self.movie_frame >= len(self.movie):
+            print(f"🎞️ 录像回放结束（{len(self.movie)} 帧）")
+            self.movie_mode = None
+            if self.headless:
+                self.running = False
+            return
+        ports = self.movie.frame(self.movie_frame)
+        buttons = ports[0]
+        for key, bit in self.button_bits:
+            self.controller[key] = bool(buttons & bit)
+        if self.bus is not None:
+            for port, value in enumerate(ports):
+                self.bus.set_controller(port, value)
+        if not self.paused:
+            self.movie_frame += 1
+
+    def start_movie_recording(self):
+        """从当前状态开始录制输入"""
+        self.movie = InputMovie(self.rom_sha1, self.capture_state())
+        self.movie_mode = 'record'
+        print("🎞️ 开始录制输入")
+
+    def start_movie_playback(self, path) -> bool:
+        """读取录像并恢复到录制开始时的状态，之后的输入都来自录像"""
+        try:
+            movie = InputMovie.load(path)
+            movie.check_rom(self.rom_data or b'')
+            self.restore_state(movie.start_state)
+        except (OSError, ValueError) as e:
+            print(f"❌ 录像回放失败: {e}")
+            return False
+        self.movie = movie
+        self.movie_mode = 'play'
+        self.movie_frame = 0
+        self.rewinding = False
+        print(f"🎞️ 回放录像: {path}（{len(movie)} 帧）")
+        return True
 
-        # 合并输入（键盘或控制器任一输入都有效）
-        for key in self.controller:
-            self.controller[key] = keyboard_input.get(key, False) or controller_input.get(key, False)
+    def stop_movie(self) -> Optional[Path]:
+        """结束录制或回放，录制时写入movie_record_path并返回路径"""
+        path = None
+        if self.movie_mode == 'record' and self.movie_record_path:
+            path = self.movie.save(self.movie_record_path)
+            print(f"🎞️ 录像已保存: {path}（{len(self.movie)} 帧）")
+        self.movie_mode = None
+        return path
 
     def update_game_logic(self):
         """更新游戏逻辑"""
@@ -261,159 +867,192 @@ class NESEmulator:
         if self.controller['down']:
             self.player_y = min(self.NES_HEIGHT - 30, self.player_y + 3)
 
+        bullets = self.bullets
+        enemies = self.enemies
+
         # 射击
-        if self.controller['a'] and self.frame_count % 10 == 0:
-            self.bullets.append({
-                'x': self.player_x + 15,
-                'y': self.player_y,
-                'dx': 5,
-                'dy': 0
-            })
-
-        # 更新子弹
-        for bullet in self.bullets[:]:
-            bullet['x'] += bullet['dx']
-            bullet['y'] += bullet['dy']
-
-            if bullet['x'] > self.NES_WIDTH or bullet['x'] < 0:
-                self.bullets.remove(bullet)
-
-        # 更新敌人
-        for enemy in self.enemies:
-            enemy['x'] += enemy['dx']
-            enemy['y'] += enemy['dy']
-
-            # 边界检测
-            if enemy['x'] <= 10 or enemy['x'] >= self.NES_WIDTH - 20:
-                enemy['dx'] = -enemy['dx']
-            if enemy['y'] <= 10 or enemy['y'] >= self.NES_HEIGHT - 20:
-                enemy['dy'] = -enemy['dy']
+        if self.controller['a'] and self.logic_frame % 10 == 0:
+            bullets.spawn(self.player_x + 15, self.player_y, 5, 0)
+        if self.stress_objects:
+            # 压力测试：每帧从左边缘随机高度发射一批子弹
+            count = max(1, self.stress_objects // 50)
+            bullets.spawn_many(0, self.stress_rng.integers(0, self.NES_HEIGHT - 5, count), 5, 0)
+
+        # 更新子弹，回收飞出屏幕的
+        bullets.move()
+        bullets.cull(0, self.NES_WIDTH)
+
+        # 更新敌人，碰到边界反弹
+        enemies.move()
+        enemies.bounce(10, self.NES_WIDTH - 20, 10, self.NES_HEIGHT - 20)
 
         # 碰撞检测
-        for bullet in self.bullets[:]:
-            for enemy in self.enemies[:]:
-                if (abs(bullet['x'] - enemy['x']) < 15 and
-                    abs(bullet['y'] - enemy['y']) < 15):
-                    self.bullets.remove(bullet)
-                    self.enemies.remove(enemy)
-                    self.score += 10
-                    break
+        hit_bullets, hit_enemies = collide(bullets, enemies)
+        if len(hit_enemies):
+            bullets.active[hit_bullets] = False
+            enemies.active[hit_enemies] = False
+            self.score += 10 * len(hit_enemies)
 
         # 重新生成敌人
-        if len(self.enemies) < 3:
-            self.enemies.append({
-                'x': self.NES_WIDTH - 20,
-                'y': 50 + (len(self.enemies) % 3) * 50,
-                'dx': -1,
-                'dy': 0,
-                'type': len(self.enemies) % 3
-            })
+        if self.stress_objects:
+            self.spawn_stress_enemies(self.stress_objects - len(enemies))
+        elif len(enemies) < 3:
+            count = len(enemies)
+            enemies.spawn(self.NES_WIDTH - 20, 50 + (count % 3) * 50, -1, 0, count % 3)
 
         # 升级
-        if self.score > 0 and self.score % 100 == 0 and self.frame_count % 60 == 0:
+        if self.score > 0 and self.score % 100 == 0 and self.logic_frame % 60 == 0:
             self.level = self.score // 100 + 1
+        self.logic_frame += 1
+
+    def init_layers(self):
+        """注册静态图层：只在失效后重新绘制"""
+        layers = self.layers
+        layers.add_layer('background', self.build_background_layer)
+        layers.add_layer('no_rom', self.build_no_rom_layer)
+        layers.add_layer('hud', lambda: self.build_text_layer(
+            ["SCORE:", "LIVES:", "LEVEL:"], self.small_font, self.WHITE, 15), (10, 10))
+        layers.add_layer('rom_info', lambda: self.build_text_layer(
+            [f"ROM: {self.rom_info.get('name', '')}"], self.small_font, self.WHITE), (10, self.NES_HEIGHT - 20))
+        layers.add_layer('controls', lambda: self.build_text_layer(
+            ["WASD/Arrows: Move", "Space/Z: Fire", "P: Pause",
+             "F5: Quick Save", "F9: Quick Load", "ESC: Exit"], self.small_font, self.WHITE, 12),
+            (self.NES_WIDTH - 120, 10))
+        width, height = self.font.size("PAUSED")
+        layers.add_layer('paused', lambda: self.build_text_layer(["PAUSED"], self.font, self.YELLOW),
+                         ((self.NES_WIDTH - width) // 2, (self.NES_HEIGHT - height) // 2))
+
+        # HUD数值紧跟在标签后面
+        label_width = max(self.small_font.size(label)[0] for label in ("SCORE:", "LIVES:", "LEVEL:"))
+        self.hud_value_x = 10 + label_width + self.small_font.size(" ")[0]
+
+    def build_background_layer(self) -> pygame.Surface:
+        """背景网格图层（不透明，直接覆盖上一帧）"""
+        surface = pygame.Surface((self.NES_WIDTH, self.NES_HEIGHT)).convert(self.nes_screen)
+        surface.fill(self.BLACK)
+        for x in range(0, self.NES_WIDTH, 32):
+            for y in range(0, self.NES_HEIGHT, 32):
+                if (x + y) % 64 == 0:
+                    pygame.draw.rect(surface, (20, 20, 20), (x, y, 32, 32))
+        return surface
+
+    def build_no_rom_layer(self) -> pygame.Surface:
+        """未加载ROM时的整屏提示"""
+        surface = pygame.Surface((self.NES_WIDTH, self.NES_HEIGHT)).convert(self.nes_screen)
+        surface.fill(self.BLACK)
+        text = self.font.render("Please load a ROM file", True, self.WHITE)
+        surface.blit(text, text.get_rect(center=(self.NES_WIDTH//2, self.NES_HEIGHT//2)))
+        return surface
+
+    def build_text_layer(self, lines: List[str], font, color, spacing: int = 0) -> pygame.Surface:
+        """把多行文字画到一个透明图层上"""
+        rendered = [font.render(line, True, color) for line in lines]
+        width = max(text.get_width() for text in rendered)
+        height = spacing * (len(rendered) - 1) + rendered[-1].get_height()
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        for i, text in enumerate(rendered):
+            surface.blit(text, (0, i * spacing))
+        return surface
 
     def render_game(self):
         """渲染游戏画面"""
-        # 清空屏幕
-        self.nes_screen.fill(self.BLACK)
-
-        if not self.rom_loaded:
+        if self.cpu_active:
+            # PPU已经画好了整帧，直接整体转换
+            self.present_ppu_frame()
+            self.render_ui()
+        elif not self.rom_loaded:
             # 显示"请加载ROM"信息
-            text = self.font.render("Please load a ROM file", True, self.WHITE)
-            text_rect = text.get_rect(center=(self.NES_WIDTH//2, self.NES_HEIGHT//2))
-            self.nes_screen.blit(text, text_rect)
+            self.layers.compose(self.nes_screen, ('no_rom',))
         else:
-            # 绘制游戏内容
+            # 绘制游戏内容（背景图层覆盖整帧，不需要先清屏）
             self.render_game_objects()
             self.render_ui()
 
-        # 缩放到屏幕
-        scaled_surface = pygame.transform.scale(self.nes_screen,
-                                              (self.NES_WIDTH * self.SCALE, self.NES_HEIGHT * self.SCALE))
-        self.screen.blit(scaled_surface, (0, 0))
+        # 无界面模式跳过缩放和翻转
+        if self.headless:
+            return
 
-        pygame.display.flip()
+        # 只缩放和提交变化的区域
+        self.presenter.present()
 
     def render_game_objects(self):
         """渲染游戏对象"""
-        # 绘制背景网格
-        for x in range(0, self.NES_WIDTH, 32):
-            for y in range(0, self.NES_HEIGHT, 32):
-                if (x + y) % 64 == 0:
-                    pygame.draw.rect(self.nes_screen, (20, 20, 20), (x, y, 32, 32))
+        # 绘制背景网格（缓存图层）
+        self.layers.compose(self.nes_screen, ('background',))
 
         # 绘制玩家
         player_color = self.GREEN if not self.paused else self.YELLOW
         pygame.draw.rect(self.nes_screen, player_color, (self.player_x, self.player_y, 20, 20))
         pygame.draw.rect(self.nes_screen, self.WHITE, (self.player_x + 5, self.player_y + 5, 10, 10))
 
-        # 绘制敌人
-        for enemy in self.enemies:
-            enemy_colors = [self.RED, (255, 128, 0), (255, 0, 255)]
-            color = enemy_colors[enemy['type']]
-            pygame.draw.rect(self.nes_screen, color, (enemy['x'], enemy['y'], 15, 15))
-
-        # 绘制子弹
-        for bullet in self.bullets:
-            pygame.draw.rect(self.nes_screen, self.YELLOW, (bullet['x'], bullet['y'], 5, 5))
+        # 绘制敌人和子弹：预先填好颜色的小表面一次批量贴上
+        enemies = self.enemies
+        sprites = self.enemy_sprites
+        kinds = enemies.kind[enemies.active].tolist()
+        self.nes_screen.blits([(sprites[kind], position) for kind, position in zip(kinds, enemies.rects())],
+                              doreturn=False)
+        bullet_sprite = self.bullet_sprite
+        self.nes_screen.blits([(bullet_sprite, position) for position in self.bullets.rects()],
+                              doreturn=False)
 
     def render_ui(self):
         """渲染用户界面"""
-        # 分数
-        score_text = self.small_font.render(f"SCORE: {self.score}", True, self.WHITE)
-        self.nes_screen.blit(score_text, (10, 10))
-
-        # 生命
-        lives_text = self.small_font.render(f"LIVES: {self.lives}", True, self.WHITE)
-        self.nes_screen.blit(lives_text, (10, 25))
-
-        # 等级
-        level_text = self.small_font.render(f"LEVEL: {self.level}", True, self.WHITE)
-        self.nes_screen.blit(level_text, (10, 40))
-
-        # ROM信息
+        # 静态图层：HUD标签、ROM信息、暂停和控制提示一次贴上
+        static_layers = []
+        if not self.cpu_active:
+            static_layers.append('hud')
         if self.rom_info:
-            rom_text = self.small_font.render(f"ROM: {self.rom_info['name']}", True, self.WHITE)
-            self.nes_screen.blit(rom_text, (10, self.NES_HEIGHT - 20))
-
-        # 暂停提示
+            static_layers.append('rom_info')
         if self.paused:
-            pause_text = self.font.render("PAUSED", True, self.YELLOW)
-            pause_rect = pause_text.get_rect(center=(self.NES_WIDTH//2, self.NES_HEIGHT//2))
-            self.nes_screen.blit(pause_text, pause_rect)
-
-        # 控制提示
-        if self.frame_count < 300:  # 显示5秒
-            controls = [
-                "WASD/Arrows: Move",
-                "Space/Z: Fire",
-                "P: Pause",
-                "F5: Quick Save",
-                "F9: Quick Load",
-                "ESC: Exit"
-            ]
-            for i, control in enumerate(controls):
-                text = self.small_font.render(control, True, self.WHITE)
-                self.nes_screen.blit(text, (self.NES_WIDTH - 120, 10 + i * 12))
+            static_layers.append('paused')
+        if self.frame_count < 300:  # 控制提示显示5秒
+            static_layers.append('controls')
+        self.layers.compose(self.nes_screen, static_layers)
+
+        if not self.cpu_active:
+            # 分数、生命、等级
+            for i, value in enumerate((self.score, self.lives, self.level)):
+                self.text_cache.draw_number(self.nes_screen, self.small_font, value, self.WHITE,
+                                            (self.hud_value_x, 10 + i * 15))
+
+        # 自动跳帧等级
+        if self.frame_pacer.frameskip:
+            skip_text = self.text_cache.render(self.small_font, f"Frameskip: {self.frame_pacer.frameskip}", self.YELLOW)
+            self.nes_screen.blit(skip_text, (10, self.NES_HEIGHT - 32))
+
+        # 快进速度倍数
+        if self.frame_pacer.fast_forward:
+            label = "Turbo" if self.frame_pacer.turbo else ">>"
+            text = self.text_cache.render(self.small_font, f"{label} x{self.frame_pacer.speed:.1f}", self.YELLOW)
+            self.nes_screen.blit(text, (10, self.NES_HEIGHT - 56))
+
+        # 倒带指示
+        if self.rewinding:
+            text = self.text_cache.render(self.small_font, "<< Rewind", self.YELLOW)
+            self.nes_screen.blit(text, (10, self.NES_HEIGHT - 44))
+
+        # 分阶段耗时曲线
+        if self.profiler is not None and self.profiler.show_graph:
+            self.profiler.draw_graph(self.nes_screen, (self.NES_WIDTH - GRAPH_FRAMES - 4,
+                                                       self.NES_HEIGHT - GRAPH_HEIGHT - 4))
 
         # 显示增强功能状态
         if self.frame_count > 300:  # 5秒后显示状态信息
             status_y = 10
 
             # 作弊码状态
-            cheat_status = self.cheat_manager.get_cheat_status()
-            if cheat_status["enabled_cheats"] > 0:
-                cheat_text = f"Cheats: {cheat_status['enabled_cheats']}"
-                text = self.small_font.render(cheat_text, True, self.YELLOW)
+            enabled_cheats = len(self.cheat_manager.active_cheats)
+            if enabled_cheats > 0:
+                cheat_text = f"Cheats: {enabled_cheats}"
+                text = self.text_cache.render(self.small_font, cheat_text, self.YELLOW)
                 self.nes_screen.blit(text, (self.NES_WIDTH - 80, status_y))
                 status_y += 12
 
             # 控制器状态
-            device_status = self.device_manager.get_device_status()
-            if device_status["controllers"]["count"] > 0:
-                controller_text = f"Controllers: {device_status['controllers']['count']}"
-                text = self.small_font.render(controller_text, True, self.GREEN)
+            controller_count = len(self.device_manager.connected_controllers)
+            if controller_count > 0:
+                controller_text = f"Controllers: {controller_count}"
+                text = self.text_cache.render(self.small_font, controller_text, self.GREEN)
                 self.nes_screen.blit(text, (self.NES_WIDTH - 80, status_y))
                 status_y += 12
 
@@ -422,7 +1061,7 @@ class NESEmulator:
                 time_since_save = time.time() - self.save_manager.last_save_time
                 if time_since_save < 3.0:  # 3秒内显示保存提示
                     save_text = "Auto Saved"
-                    text = self.small_font.render(save_text, True, self.GREEN)
+                    text = self.text_cache.render(self.small_font, save_text, self.GREEN)
                     self.nes_screen.blit(text, (self.NES_WIDTH - 80, status_y))
 
     def handle_events(self):
@@ -431,13 +1070,43 @@ class NESEmulator:
             if event.type == pygame.QUIT:
                 self.running = False
 
+            elif event.type == pygame.WINDOWEXPOSED:
+                # 窗口内容可能已被覆盖，整帧重画
+                self.presenter.invalidate()
+
+            elif event.type == pygame.KEYUP:
+                if event.key == pygame.K_BACKSPACE:
+                    self.rewinding = False
+                elif event.key == pygame.K_BACKQUOTE:
+                    self.frame_pacer.fast_forward_held = False
+
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.running = False
+                elif (event.key == pygame.K_BACKSPACE and self.rewind is not None and
+                      self.movie_mode is None):  # 按住倒带（录像时不可用，联机时倒带已关闭）
+                    self.rewinding = True
+                elif event.key == pygame.K_BACKQUOTE:  # 按住快进
+                    self.frame_pacer.fast_forward_held = True
+                elif event.key == pygame.K_t:  # 加速开关
+                    self.frame_pacer.turbo = not self.frame_pacer.turbo
                 elif event.key == pygame.K_p:
                     self.paused = not self.paused
-                elif event.key == pygame.K_r and self.rom_loaded:
+                    if self.paused:
+                        # 暂停时做游戏中被推迟的第2代回收
+                        self.gc_policy.collect()
+                    else:
+                        # 暂停期间（包括回收）的时间不算作落后，恢复后不跳帧追赶
+                        self.frame_pacer.reset()
+                elif event.key == pygame.K_F3:  # F3 显示脏矩形
+                    self.presenter.show_dirty = not self.presenter.show_dirty
+                elif event.key == pygame.K_F4 and self.profiler is not None:  # F4 显示耗时曲线
+                    self.profiler.show_graph = not self.profiler.show_graph
+                elif event.key == pygame.K_r and self.rom_loaded and self.frame_channel is None:  # 子进程模拟时不可用
                     self.init_game_state()
+                    if self.cpu_active:
+                        self.reset_console()
+                    self.frame_pacer.reset()
 
                 # 存档快捷键
                 elif event.key == pygame.K_F5:  # F5 快速保存
@@ -463,26 +1132,73 @@ class NESEmulator:
                     elif event.key == pygame.K_3:
                         self.manual_load(slot=3)
 
-    def run(self, rom_path: Optional[str] = None):
-        """运行模拟器"""
+    def run(self, rom_path: Optional[str] = None, max_frames: Optional[int] = None,
+            uncapped: bool = False):
+        """运行模拟器
+
+        Args:
+            rom_path: ROM文件路径
+            max_frames: 运行指定帧数后退出，并记录每帧耗时
+            uncapped: 不限制帧率（基准测试用）
+        """
         print("🎮 启动NES模拟器...")
 
+        # 是否子进程模拟在创建模拟器核心之前一次确定
+        if self.subprocess_emulation:
+            conflicts = self.subprocess_conflicts()
+            if conflicts:
+                print(f"⚠️ 子进程模拟不能与{'、'.join(conflicts)}同时使用，改为在本进程中模拟")
+                self.subprocess_emulation = False
+
         if rom_path:
             if not self.load_rom(rom_path):
                 print("ROM加载失败")
                 return False
 
+        # 录像：回放时状态和输入都来自录像文件，未指定帧数时回放到录像结束
+        if self.movie_play_path:
+            if not self.start_movie_playback(self.movie_play_path):
+                return False
+            if not max_frames:
+                max_frames = len(self.movie)
+        elif self.movie_record_path:
+            self.start_movie_recording()
+
         self.running = True
+        if max_frames:
+            self.frame_times = np.zeros(max_frames)
+        frame_times = self.frame_times
+        perf_counter = time.perf_counter
+        frame_pacer = self.frame_pacer
+        gc_policy = self.gc_policy
+        profiler = self.profiler
+        # 启动期间的对象冻结后不再参与回收
+        gc_policy.start_session()
+        frame_pacer.reset()
+        start = frame_start = perf_counter()
 
         try:
             while self.running:
-                self.handle_events()
-                self.update_controller()
-                self.update_game_logic()
-                self.render_game()
-
-                self.clock.tick(60)  # 60 FPS
+                # 跳帧时照常模拟，只跳过渲染
+                render = uncapped or frame_pacer.begin_frame()
+
+                if profiler is not None:
+                    profiler.start_frame()
+                    self.step_frame(render, uncapped, profiler.mark)
+                    profiler.end_frame()
+                else:
+                    self.step_frame(render, uncapped)
+                gc_policy.frame()
+
+                if frame_times is not None:
+                    now = perf_counter()
+                    frame_times[self.frame_count] = now - frame_start
+                    frame_start = now
                 self.frame_count += 1
+                if max_frames and self.frame_count >= max_frames:
+                    self.running = False
+
+            self.benchmark_elapsed = perf_counter() - start
 
         except KeyboardInterrupt:
             print("\n用户中断")
@@ -493,19 +1209,132 @@ class NESEmulator:
 
         finally:
             # 清理资源
+            gc_policy.end_session()
             self.cleanup()
             pygame.quit()
 
         print("👋 NES模拟器已退出")
         return True
 
-    def get_external_controller_input(self) -> Dict:
-        """获取外部控制器输入"""
-        controller_input = {
-            'up': False, 'down': False, 'left': False, 'right': False,
-            'a': False, 'b': False, 'start': False, 'select': False
+    def enable_profiler(self, show_graph: bool = False, log_path: Optional[str] = None):
+        """打开分阶段帧耗时统计
+
+        Args:
+            show_graph: 在画面右下角显示耗时曲线（F4切换）
+            log_path: 退出时写入的JSON路径，默认 reports/frame_profile_<ROM>_<时间>.json
+        """
+        self.profiler = FrameProfiler()
+        self.profiler.show_graph = show_graph
+        self.profile_log = log_path
+
+    def step_frame(self, render: bool, uncapped: bool, mark: Optional[Callable] = None):
+        """一帧：处理事件和输入、模拟、渲染、等待下一帧
+
+        Args:
+            render: 本帧是否渲染（跳帧时只模拟）
+            uncapped: 不等待帧节拍
+            mark: 分阶段计时时在每个阶段结束后调用 mark(阶段下标)，见 FrameProfiler.mark
+        """
+        self.handle_events()
+        if mark is not None:
+            mark(0)
+        self.update_controller()
+        if mark is not None:
+            mark(1)
+
+        # 模拟：CPU模拟（含倒带、联机回滚、子进程取帧）计入emulate_frame，演示模式计入update_game_logic
+        phase = 2
+        if self.rewinding:
+            self.rewind_step()
+        elif self.netplay is not None:
+            self.netplay_step()
+            phase = 2 if self.cpu_active else 3
+        elif self.frame_channel is not None:
+            self.receive_frame()
+        elif self.cpu_active:
+            self.emulate_frame()
+        else:
+            self.update_game_logic()
+            phase = 3
+        if self.rewind is not None:
+            self.record_rewind()
+        if self.frame_hashes is not None:
+            self.hash_frame()
+        if mark is not None:
+            mark(phase)
+
+        if render:
+            if self.run_ahead_active():
+                self.render_ahead()
+                if mark is not None:
+                    # 预运行的额外模拟单独计时，其余是正常的渲染耗时
+                    mark(6, self.run_ahead.last_cost_ns)
+            else:
+                self.render_game()
+            if mark is not None:
+                mark(4)
+
+        if not uncapped:
+            self.frame_pacer.wait()
+            if mark is not None:
+                mark(5)
+
+    def write_profile_log(self) -> Optional[Path]:
+        """把本次会话的分阶段耗时直方图写成JSON"""
+        if self.profiler is None or self.profiler.frames == 0:
+            return None
+        path = self.profile_log
+        if path is None:
+            rom = self.rom_info.get('name', 'none')
+            path = Path('reports') / f"frame_profile_{rom}_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        return self.profiler.write_session(path, {
+            'rom': self.rom_info.get('name'),
+            'mode': 'cpu' if self.cpu_active else 'demo',
+            'renderer': self.presenter.backend,
+            'max_frameskip': self.frame_pacer.max_frameskip
+        })
+
+    def get_benchmark_results(self) -> Dict:
+        """限定帧数运行后的帧率和帧耗时分位数"""
+        if self.frame_times is None or self.frame_count == 0:
+            return {}
+        times = self.frame_times[:self.frame_count] * 1000
+        p50, p95, p99 = np.percentile(times, [50, 95, 99])
+        return {
+            'rom': self.rom_info.get('name'),
+            'mode': 'cpu' if self.cpu_active else 'demo',
+            'entities': 0 if self.cpu_active else len(self.enemies) + len(self.bullets),
+            'frames': self.frame_count,
+            'elapsed_s': round(self.benchmark_elapsed, 3),
+            'fps': round(self.frame_count / self.benchmark_elapsed, 2) if self.benchmark_elapsed else 0.0,
+            'frame_time_ms': {
+                'mean': round(float(times.mean()), 3),
+                'p50': round(float(p50), 3),
+                'p95': round(float(p95), 3),
+                'p99': round(float(p99), 3),
+                'max': round(float(times.max()), 3)
+            },
+            'text_cache': self.text_cache.get_stats(),
+            'gc': self.gc_policy.get_stats(),
+            'rewind': self.rewind.get_stats() if self.rewind is not None else None,
+            'run_ahead': self.run_ahead.get_stats() if self.run_ahead is not None else None,
+            'movie': {'frames': len(self.movie), 'played': self.movie_frame} if self.movie is not None else None,
+            'frame_hashes': self.frame_hashes.get_stats() if self.frame_hashes is not None else None,
+            'golden': self.golden_result,
+            'netplay': self.netplay.get_stats() if self.netplay is not None else None,
+            'frame_channel': self.frame_channel_stats
         }
 
+    def get_external_controller_input(self) -> Dict:
+        """获取外部控制器输入（返回每帧复用的同一个字典）"""
+        controller_input = self.external_input
+        for key in controller_input:
+            controller_input[key] = False
+
+        # 没有连接控制器时不查询设备
+        if not self.device_manager.connected_controllers:
+            return controller_input
+
         try:
             # 获取第一个控制器的输入
             input_state = self.device_manager.get_controller_input(0)
@@ -542,10 +1371,10 @@ class NESEmulator:
 
                 # 按钮映射（通用映射）
                 if len(buttons) >= 4:
-                    controller_input['a'] = buttons[0]      # A按钮
-                    controller_input['b'] = buttons[1]      # B按钮
-                    controller_input['select'] = buttons[2] if len(buttons) > 2 else False  # Select
-                    controller_input['start'] = buttons[3] if len(buttons) > 3 else False   # Start
+                    controller_input['a'] = bool(buttons[0])       # A按钮
+                    controller_input['b'] = bool(buttons[1])       # B按钮
+                    controller_input['select'] = bool(buttons[2])  # Select
+                    controller_input['start'] = bool(buttons[3])   # Start
 
         except Exception as e:
             # 控制器输入失败时静默处理
@@ -558,8 +1387,8 @@ class NESEmulator:
         return {
             "player_x": self.player_x,
             "player_y": self.player_y,
-            "enemies": self.enemies.copy(),
-            "bullets": self.bullets.copy(),
+            "enemies": self.enemies.to_list(),
+            "bullets": self.bullets.to_list(),
             "score": self.score,
             "lives": self.lives,
             "level": self.level,
@@ -572,8 +1401,8 @@ class NESEmulator:
         try:
             self.player_x = game_state.get("player_x", 50)
             self.player_y = game_state.get("player_y", 200)
-            self.enemies = game_state.get("enemies", [])
-            self.bullets = game_state.get("bullets", [])
+            self.enemies.load_list(game_state.get("enemies", []))
+            self.bullets.load_list(game_state.get("bullets", []))
             self.score = game_state.get("score", 0)
             self.lives = game_state.get("lives", 3)
             self.level = game_state.get("level", 1)
@@ -606,8 +1435,16 @@ class NESEmulator:
         """手动保存游戏"""
         if not self.current_rom_path:
             return False
+        if self.frame_channel is not None:
+            # 模拟核心在子进程中，本进程没有可存档的状态
+            print("⚠️ 子进程模拟时不支持即时存档")
+            return False
 
         try:
+            if self.cpu_active:
+                # 模拟器核心用二进制即时存档（CPU、RAM、显存、Mapper等完整状态）
+                return self.save_manager.save_state_data(self.current_rom_path,
+                                                         self.capture_state(compress=True), slot)
             game_state = self.get_game_state()
             success = self.save_manager.save_game(self.current_rom_path, game_state, slot)
             if success:
@@ -622,11 +1459,23 @@ class NESEmulator:
         """手动加载游戏"""
         if not self.current_rom_path:
             return False
+        if self.frame_channel is not None:
+            print("⚠️ 子进程模拟时不支持读取存档")
+            return False
 
         try:
+            if self.cpu_active:
+                data = self.save_manager.load_state_data(self.current_rom_path, slot)
+                if data is None:
+                    return False
+                self.restore_state(data)
+                self.frame_pacer.reset()
+                print(f"📂 即时存档已加载: 插槽 {slot}")
+                return True
             game_state = self.save_manager.load_game(self.current_rom_path, slot)
             if game_state:
                 self.set_game_state(game_state)
+                self.frame_pacer.reset()
                 print(f"📂 手动加载成功: 插槽 {slot}")
                 return True
             else:
@@ -637,27 +1486,121 @@ class NESEmulator:
             print(f"❌ 手动加载失败: {e}")
             return False
 
+    def read_memory(self, address: int) -> int:
+        """读取CPU地址空间的一个字节"""
+        if self.cpu is None:
+            return 0
+        return self.cpu.read(address & 0xFFFF)
+
     def write_memory(self, address: int, value: int):
         """写入内存（用于作弊码）"""
-        # 这是一个模拟的内存写入函数
-        # 在真实的NES模拟器中，这里会修改实际的内存
-        pass
+        if self.memory_writes is not None:
+            # 子进程模拟：由模拟进程在下一帧开始前写入
+            self.memory_writes.put((address & 0xFFFF, value & 0xFF))
+            return
+        if self.cpu is None:
+            return
+        # 经由CPU写入，RAM中已缓存的指令块会随之失效
+        self.cpu.write(address & 0xFFFF, value & 0xFF)
 
     def cleanup(self):
         """清理资源"""
         try:
+            # 保存正在录制的输入录像
+            self.stop_movie()
+
+            # 结束模拟子进程
+            if self.frame_channel is not None:
+                self.stop_emulation_process()
+
+            # 画面校验与基准比较
+            if self.frame_hashes is not None and len(self.frame_hashes):
+                try:
+                    self.finish_frame_hashes()
+                except (OSError, ValueError) as e:
+                    print(f"❌ 画面基准比较失败: {e}")
+
+            # 输出指令块缓存统计（子进程模拟时本进程没有CPU）
+            if self.cpu_active and self.cpu is not None:
+                stats = self.cpu.get_block_cache_stats()
+                print(f"🧠 指令块缓存: 命中 {stats['hits']}, 未命中 {stats['misses']}, "
+                      f"命中率 {stats['hit_rate']:.1%}")
+
+            # 输出调度器跟踪统计
+            if self.scheduler is not None and self.scheduler.trace:
+                trace = self.scheduler.get_trace_stats()
+                print(f"⏱️ 调度器追赶事件（{trace['frames']} 帧平均）: {trace['average']}")
+
+            # 停止音频输出
+            if self.audio_stream is not None:
+                self.audio_stream.stop()
+                stats = self.audio_stream.get_stats()
+                print(f"🔊 音频缓冲: 欠载 {stats['underruns']} 次, 丢弃 {stats['dropped_samples']} 个样本")
+
+            # 分阶段耗时记录
+            profile_path = self.write_profile_log()
+            if profile_path is not None:
+                print(f"📊 帧耗时记录已写入: {profile_path}")
+
+            # 垃圾回收统计
+            stats = self.gc_policy.get_stats()
+            if stats['frames']:
+                print(f"♻️ 垃圾回收: 每帧 {stats['collections_per_frame']} 次, "
+                      f"停顿 {stats['pause_ms_per_frame']}ms/帧, 最长 {stats['max_pause_ms']}ms, "
+                      f"内存块净增 {stats['alloc_blocks_per_frame']}/帧")
+
+            # 倒带快照统计
+            if self.rewind is not None and self.rewind.captures:
+                stats = self.rewind.get_stats()
+                print(f"⏪ 倒带: {stats['snapshots']} 个快照（{stats['frames_covered']} 帧）, "
+                      f"{stats['memory_bytes'] / 1024:.0f}KB, 记录耗时 {stats['capture_ms_mean']}ms")
+
+            # 预运行耗时
+            if self.run_ahead is not None and self.run_ahead.presented:
+                stats = self.run_ahead.get_stats()
+                print(f"⏩ 预运行 {stats['frames']} 帧: 每多一帧 {stats['ms_per_extra_frame']}ms, "
+                      f"快照保存 {stats['capture_ms']}ms, 恢复 {stats['restore_ms']}ms")
+
+            # 回滚联机统计
+            if self.netplay is not None:
+                stats = self.netplay.get_stats()
+                print(f"🌐 联机: {stats['frames']} 帧, 回滚 {stats['rollbacks']} 次"
+                      f"（平均 {stats['mean_depth']} 帧, 每次 {stats['resimulate_ms_per_rollback']}ms）, "
+                      f"等待 {stats['stalls']} 帧, 不同步: {stats['desync_frame']}")
+                self.netplay.transport.close()
+
+            # 文字缓存统计
+            stats = self.text_cache.get_stats()
+            if stats['hits'] + stats['misses']:
+                print(f"🔤 文字缓存: 命中率 {stats['hit_rate']:.1%}, {stats['entries']} 项, "
+                      f"{stats['memory_bytes'] / 1024:.1f}KB")
+
+            # 画面输出统计
+            if not self.headless:
+                stats = self.presenter.get_stats()
+                if stats['backend'] == 'software':
+                    print(f"🖼️ 画面输出: 静止 {stats['idle_frames']}/{stats['frames']} 帧, "
+                          f"整帧 {stats['full_frames']} 帧, 平均 {stats['rects_per_frame']} 个矩形")
+                else:
+                    print(f"🖼️ 画面输出: SDL2渲染器 {stats['frames']} 帧, {stats['scale']}倍缩放")
+
+            # 帧节拍统计
+            pacer_stats = self.frame_pacer.get_stats()
+            if pacer_stats['late_frames']:
+                print(f"⏱️ 超时帧 {pacer_stats['late_frames']}/{pacer_stats['frames']}, "
+                      f"渲染 {pacer_stats['rendered_frames']} 帧")
+            if pacer_stats['fast_forward_frames']:
+                print(f"⏩ 快进 {pacer_stats['fast_forward_frames']} 帧")
+
             # 停止自动保存
             self.save_manager.stop_auto_save()
 
-            # 停止作弊码监控
-            self.cheat_manager.stop_cheat_monitor()
-
             # 停止设备监控
             self.device_manager.stop_device_monitor()
 
-            # 保存作弊码配置
-            if self.current_rom_path:
-                self.cheat_manager.save_cheat_config(self.current_rom_path)
+            # 保存作弊码配置（无界面模式不启用作弊码）
+            if self.current_rom_path and not self.headless:
+                self.cheat_manager.save_cheat_database()
 
             print(f"🧹 资源清理完成")
 
@@ -665,23 +1608,138 @@ class NESEmulator:
             print(f"⚠️ 资源清理出错: {e}")
 
 
+def emulation_worker(rom_path: str, channel_name: str, audio: bool = False, memory_writes=None):
+    """模拟子进程：以60fps模拟ROM，每帧把帧缓冲发布到共享内存，输入和停止请求也从共享内存读取，
+    界面进程的内存写入（作弊码）从memory_writes队列读取"""
+    # 模拟进程的状态信息输出到标准错误，标准输出留给界面进程（基准测试的JSON）
+    sys.stdout = sys.stderr
+    channel = FrameChannel(channel_name)
+    emulator = NESEmulator(headless=True)
+    try:
+        if not emulator.load_rom(rom_path) or not emulator.cpu_active:
+            channel.status = STATUS_FAILED
+            return
+        if audio:
+            # 无界面模式用的是虚拟音频驱动，换回真实设备输出声音
+            pygame.mixer.quit()
+            os.environ.pop('SDL_AUDIODRIVER', None)
+            emulator.audio_stream = create_audio_stream()
+
+        pacer = emulator.frame_pacer
+        pacer.reset()
+        channel.status = STATUS_RUNNING
+        while not channel.stop_requested:
+            pacer.begin_frame()
+            emulator.paused = channel.paused
+            emulator.bus.set_controller(0, channel.buttons)
+            while memory_writes is not None:
+                try:
+                    address, value = memory_writes.get_nowait()
+                except queue.Empty:
+                    break
+                emulator.write_memory(address, value)
+            emulator.emulate_frame()
+            if not emulator.paused:
+                channel.publish(emulator.ppu.framebuffer)
+            pacer.wait()
+    except Exception as e:
+        print(f"❌ 模拟子进程出错: {e}")
+        channel.status = STATUS_FAILED
+    finally:
+        if emulator.audio_stream is not None:
+            emulator.audio_stream.stop()
+        channel.close()
+        pygame.quit()
+
+
 def main():
     """主函数"""
     import argparse
 
     parser = argparse.ArgumentParser(description="简单NES模拟器")
     parser.add_argument("rom", nargs="?", help="ROM文件路径")
-    parser.add_argument("--fullscreen", action="store_true", help="全屏模式")
+    parser.add_argument("--fullscreen", action="store_true", help="全屏模式（按显示分辨率整数倍缩放）")
+    parser.add_argument("--renderer", choices=["software", "sdl2"], default="software",
+                        help="画面输出后端：软件缩放或SDL2渲染器（无硬件加速时退回软件）")
+    parser.add_argument("--paletted", action="store_true", help="使用8位调色板表面输出画面")
+    parser.add_argument("--trace-scheduler", action="store_true", help="统计每帧的调度追赶事件")
+    parser.add_argument("--max-frameskip", type=int, default=4, help="自动跳帧的最大等级（0表示不跳帧）")
+    parser.add_argument("--headless", action="store_true", help="无界面模式（SDL虚拟驱动，不缩放不翻转）")
+    parser.add_argument("--frames", type=int, help="运行指定帧数后退出并输出JSON基准结果")
+    parser.add_argument("--benchmark-out", help="基准结果JSON的写入路径（默认输出到标准输出）")
+    parser.add_argument("--uncapped", action="store_true", help="不限制帧率")
+    parser.add_argument("--stress", type=int, default=0, help="演示模式压力测试：保持指定数量的敌人并持续发射子弹")
+    parser.add_argument("--gc-default", action="store_true", help="保持Python默认的垃圾回收（不冻结、不推迟第2代回收）")
+    parser.add_argument("--profile", action="store_true", help="记录各阶段帧耗时，退出时写入JSON")
+    parser.add_argument("--profile-graph", action="store_true", help="显示各阶段耗时曲线（F4切换，隐含--profile）")
+    parser.add_argument("--profile-log", help="帧耗时JSON路径（默认写入reports目录）")
+    parser.add_argument("--show-dirty", action="store_true", help="框出每帧重画的脏矩形（F3切换）")
+    parser.add_argument("--rewind", action="store_true", help="记录倒带快照（按住Backspace倒带）")
+    parser.add_argument("--rewind-interval", type=int, default=2, help="每隔多少帧记录一次倒带快照")
+    parser.add_argument("--rewind-mb", type=int, default=32, help="倒带快照占用的内存上限（MB）")
+    parser.add_argument("--run-ahead", type=int, default=0, help="预运行帧数，降低输入延迟（0表示关闭）")
+    parser.add_argument("--ff-render-every", type=int, default=4,
+                        help="快进（按住`）和加速（T切换）时每多少帧渲染一帧")
+    parser.add_argument("--record-movie", help="录制每帧的手柄输入，退出时写入指定的录像文件")
+    parser.add_argument("--play-movie", help="回放录像文件（配合--headless可作为可重复的基准测试负载）")
+    parser.add_argument("--hash-frames", type=int, default=0,
+                        help="每隔多少帧计算一次画面CRC32并与基准比较（0表示关闭）")
+    parser.add_argument("--golden", help="画面基准文件（默认为回放录像旁的.crc文件，不存在时写入）")
+    parser.add_argument("--update-golden", action="store_true", help="用本次结果覆盖画面基准")
+    parser.add_argument("--subprocess", action="store_true",
+                        help="在子进程中模拟，帧经共享内存传给界面进程（使用第二个CPU核心）")
+    parser.add_argument("--netplay", metavar="HOST:PORT", help="回滚联机：对方的UDP地址")
+    parser.add_argument("--netplay-bind", type=int, default=7000, help="联机时本机监听的UDP端口")
+    parser.add_argument("--netplay-player", type=int, choices=[1, 2], default=1, help="本机玩家（1P或2P）")
+    parser.add_argument("--netplay-rollback", type=int, default=8, help="最多回滚的帧数")
 
     args = parser.parse_args()
 
-    emulator = NESEmulator()
-
-    if args.fullscreen:
-        pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-
-    success = emulator.run(args.rom)
+    # 基准测试时标准输出只有JSON结果，状态信息改为输出到标准错误
+    benchmark = bool(args.frames or args.play_movie)
+    status_output = contextlib.redirect_stdout(sys.stderr) if benchmark else contextlib.nullcontext()
+    with status_output:
+        emulator = NESEmulator(headless=args.headless, fullscreen=args.fullscreen, renderer=args.renderer)
+        emulator.paletted_output = args.paletted
+        emulator.trace_scheduler = args.trace_scheduler
+        emulator.frame_pacer.max_frameskip = max(0, args.max_frameskip)
+        emulator.frame_pacer.fast_forward_render = max(1, args.ff_render_every)
+        emulator.presenter.show_dirty = args.show_dirty
+        emulator.stress_objects = max(0, args.stress)
+        emulator.gc_policy.enabled = not args.gc_default
+        emulator.subprocess_emulation = args.subprocess
+        if args.profile or args.profile_graph or args.profile_log:
+            emulator.enable_profiler(show_graph=args.profile_graph, log_path=args.profile_log)
+        if args.rewind:
+            emulator.enable_rewind(args.rewind_mb, args.rewind_interval)
+        if args.run_ahead > 0:
+            emulator.enable_run_ahead(args.run_ahead)
+        emulator.movie_record_path = args.record_movie
+        emulator.movie_play_path = args.play_movie
+        if args.netplay:
+            host, _, port = args.netplay.rpartition(':')
+            emulator.enable_netplay(args.netplay_player - 1, ('0.0.0.0', args.netplay_bind),
+                                    (host, int(port)), args.netplay_rollback)
+        if args.hash_frames > 0:
+            emulator.enable_frame_hashes(args.hash_frames)
+            emulator.golden_hashes_path = args.golden
+            emulator.update_golden = args.update_golden
+
+        success = emulator.run(args.rom, max_frames=args.frames, uncapped=args.uncapped)
+
+    if benchmark:
+        results = json.dumps(emulator.get_benchmark_results(), indent=2, ensure_ascii=False)
+        if args.benchmark_out:
+            path = Path(args.benchmark_out)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(results, encoding='utf-8')
+            print(f"📊 基准结果已写入: {path}", file=sys.stderr)
+        else:
+            print(results)
+    if emulator.golden_result is not None and emulator.golden_result['status'] == 'diverged':
+        success = False
     sys.exit(0 if success else 1)
 
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+NES卡带Mapper
+Mapper在加载ROM时按编号从注册表中查找一次，之后直接把自己的寄存器
+写入函数挂到总线页表上。切换bank只替换ROM数据的memoryview切片，不复制数据
+"""
+
+import struct
+from typing import Callable, Dict, Optional, Tuple, Type
+
+PRG_BANK_8K = 0x2000
+CHR_BANK_1K = 0x400
+
+# 名称表镜像方式
+MIRROR_HORIZONTAL = 'horizontal'
+MIRROR_VERTICAL = 'vertical'
+MIRROR_SINGLE_LOWER = 'single_lower'
+MIRROR_SINGLE_UPPER = 'single_upper'
+MIRROR_FOUR_SCREEN = 'four_screen'
+MIRRORING_CODES = (MIRROR_HORIZONTAL, MIRROR_VERTICAL, MIRROR_SINGLE_LOWER,
+                   MIRROR_SINGLE_UPPER, MIRROR_FOUR_SCREEN)
+
+# 快照头：4个PRG槽和8个CHR槽的bank编号、镜像方式；其后是各Mapper自己的寄存器
+MAPPER_STATE = struct.Struct('<4H8HB')
+
+# Mapper注册表: iNES mapper编号 -> Mapper类
+MAPPER_REGISTRY: Dict[int, Type['Mapper']] = {}
+
+
+def register_mapper(number: int):
+    """注册Mapper类的装饰器"""
+    def decorator(cls):
+        MAPPER_REGISTRY[number] = cls
+        cls.number = number
+        return cls
+    return decorator
+
+
+def _noop(*args):
+    pass
+
+
+class Mapper:
+    """Mapper基类
+
+    PRG以8KB为单位映射到总线的4个槽，CHR以1KB为单位映射到8个槽；
+    每个槽保存ROM的memoryview切片和对应的bank编号（标签），
+    CPU指令块缓存用PRG标签区分不同bank下的代码
+    """
+
+    number = -1
+    name = 'Mapper'
+
+    def __init__(self, bus, chr_rom, mirroring: str = MIRROR_HORIZONTAL):
+        """绑定总线并建立上电时的bank映射"""
+        self.bus = bus
+        self.prg_rom = bus.prg_rom
+        self.prg_slots = bus.prg_slots
+        self.prg_tags = bus.prg_tags
+        self.prg_bank_count = max(1, len(self.prg_rom) // PRG_BANK_8K)
+
+        # 没有CHR ROM的卡带使用8KB CHR RAM
+        if chr_rom is not None and len(chr_rom) > 0:
+            self.chr = memoryview(chr_rom)
+            self.chr_writable = False
+        else:
+            self.chr = memoryview(bytearray(0x2000))
+            self.chr_writable = True
+        self.chr_bank_count = max(1, len(self.chr) // CHR_BANK_1K)
+        self.chr_slots = [self.chr[:CHR_BANK_1K]] * 8
+        self.chr_tags = [0] * 8
+
+        self.mirroring = mirroring
+
+        # 外部回调：PPU在需要时替换这些函数
+        self.irq_callback: Callable = _noop
+        self.on_chr_switch: Callable = _noop
+        self.on_mirroring_switch: Callable = _noop
+
+        # 需要按扫描线计数的Mapper（MMC3）设置该钩子
+        self.scanline_hook: Optional[Callable] = None
+
+        bus.map_pages(0x80, 0xFF, writer=self.write_register)
+        self.reset()
+
+        self.register_state = struct.Struct(f'<{len(self.get_registers())}i')
+        self.state_size = MAPPER_STATE.size + self.register_state.size
+
+    def reset(self):
+        """上电/复位时的bank映射"""
+        self.set_prg_32k(0)
+        self.set_chr_8k(0)
+
+    def write_register(self, address: int, value: int):
+        """写入$8000-$FFFF（默认无寄存器）"""
+
+    def get_registers(self) -> Tuple[int, ...]:
+        """快照中保存的Mapper寄存器（bank映射本身由槽标签保存）"""
+        return ()
+
+    def set_registers(self, values: Tuple[int, ...]):
+        """恢复 get_registers() 保存的寄存器"""
+
+    def save_state(self) -> bytes:
+        """bank映射、镜像方式和Mapper寄存器"""
+        return (MAPPER_STATE.pack(*self.prg_tags, *self.chr_tags,
+                                  MIRRORING_CODES.index(self.mirroring)) +
+                self.register_state.pack(*self.get_registers()))
+
+    def load_state(self, data):
+        """从 save_state() 的快照恢复，bank切换照常通知PPU"""
+        values = MAPPER_STATE.unpack_from(data)
+        for slot in range(4):
+            self.set_prg_8k(slot, values[slot])
+        for slot in range(8):
+            self.set_chr_1k(slot, values[4 + slot])
+        self.set_mirroring(MIRRORING_CODES[values[12]])
+        self.set_registers(self.register_state.unpack_from(data, MAPPER_STATE.size))
+
+    # ------------------------------------------------------------------
+    # bank映射
+    # ------------------------------------------------------------------
+
+    def set_prg_8k(self, slot: int, bank: int):
+        """把8KB PRG bank映射到槽 slot（0-3 对应 $8000-$E000）"""
+        bank %= self.prg_bank_count
+        start = bank * PRG_BANK_8K
+        self.prg_slots[slot] = self.prg_rom[start:start + PRG_BANK_8K]
+        self.prg_tags[slot] = bank
+
+    def set_prg_16k(self, slot: int, bank: int):
+        """把16KB PRG bank映射到 $8000（slot=0）或 $C000（slot=1）"""
+        self.set_prg_8k(slot * 2, bank * 2)
+        self.set_prg_8k(slot * 2 + 1, bank * 2 + 1)
+
+    def set_prg_32k(self, bank: int):
+        """映射32KB PRG bank"""
+        for slot in range(4):
+            self.set_prg_8k(slot, bank * 4 + slot)
+
+    def set_chr_1k(self, slot: int, bank: int):
+        """把1KB CHR bank映射到槽 slot（0-7 对应 $0000-$1C00）"""
+        bank %= self.chr_bank_count
+        if self.chr_tags[slot] == bank:
+            return
+        start = bank * CHR_BANK_1K
+        self.chr_slots[slot] = self.chr[start:start + CHR_BANK_1K]
+        self.chr_tags[slot] = bank
+        self.on_chr_switch(slot)
+
+    def set_chr_4k(self, slot: int, bank: int):
+        """映射4KB CHR bank到 $0000（slot=0）或 $1000（slot=1）"""
+        for i in range(4):
+            self.set_chr_1k(slot * 4 + i, bank * 4 + i)
+
+    def set_chr_8k(self, bank: int):
+        """映射8KB CHR bank"""
+        for i in range(8):
+            self.set_chr_1k(i, bank * 8 + i)
+
+    def set_mirroring(self, mirroring: str):
+        """设置名称表镜像方式"""
+        if mirroring != self.mirroring:
+            self.mirroring = mirroring
+            self.on_mirroring_switch(mirroring)
+
+    # ------------------------------------------------------------------
+    # PPU访问CHR
+    # ------------------------------------------------------------------
+
+    def read_chr(self, address: int) -> int:
+        """读取图案表（$0000-$1FFF）"""
+        return self.chr_slots[address >> 10][address & 0x3FF]
+
+    def write_chr(self, address: int, value: int):
+        """写入图案表（仅CHR RAM）"""
+        if self.chr_writable:
+            self.chr_slots[address >> 10][address & 0x3FF] = value
+
+
+@register_mapper(0)
+class NROM(Mapper):
+    """Mapper 0: 固定16KB/32KB PRG，8KB CHR"""
+
+    name = 'NROM'
+
+    def reset(self):
+        """16KB PRG镜像到$C000"""
+        for slot in range(4):
+            self.set_prg_8k(slot, slot)
+        self.set_chr_8k(0)
+
+
+@register_mapper(1)
+class MMC1(Mapper):
+    """Mapper 1: 串行写入的5位移位寄存器控制PRG/CHR/镜像"""
+
+    name = 'MMC1'
+
+    MIRRORING_MODES = (MIRROR_SINGLE_LOWER, MIRROR_SINGLE_UPPER,
+                       MIRROR_VERTICAL, MIRROR_HORIZONTAL)
+
+    def reset(self):
+        """复位移位寄存器并固定最后一个16KB bank到$C000"""
+        self.shift = 0x10
+        self.control = 0x0C
+        self.chr_bank0 = 0
+        self.chr_bank1 = 0
+        self.prg_bank = 0
+        self._update_banks()
+
+    def get_registers(self) -> Tuple[int, ...]:
+        return self.shift, self.control, self.chr_bank0, self.chr_bank1, self.prg_bank
+
+    def set_registers(self, values: Tuple[int, ...]):
+        self.shift, self.control, self.chr_bank0, self.chr_bank1, self.prg_bank = values
+
+    def write_register(self, address: int, value: int):
+        """串行写入：第5次写入时根据地址选择目标寄存器"""
+        if value & 0x80:
+            self.shift = 0x10
+            self.control |= 0x0C
+            self._update_banks()
+            return
+
+        complete = self.shift & 1
+        self.shift = (self.shift >> 1) | ((value & 1) << 4)
+        if not complete:
+            return
+
+        data = self.shift
+        self.shift = 0x10
+        register = (address >> 13) & 3
+        if register == 0:
+            self.control = data
+        elif register == 1:
+            self.chr_bank0 = data
+        elif register == 2:
+            self.chr_bank1 = data
+        else:
+            self.prg_bank = data & 0x0F
+        self._update_banks()
+
+    def _update_banks(self):
+        self.set_mirroring(self.MIRRORING_MODES[self.control & 3])
+
+        # 512KB的SUROM用CHR寄存器第4位选择PRG的256KB半区
+        outer = (self.chr_bank0 & 0x10) if self.prg_bank_count > 32 else 0
+        bank_count_16k = min(self.prg_bank_count // 2, 16) or 1
+        prg_mode = (self.control >> 2) & 3
+        if prg_mode < 2:
+            self.set_prg_32k((outer | (self.prg_bank & 0x0E)) >> 1)
+        elif prg_mode == 2:
+            self.set_prg_16k(0, outer)
+            self.set_prg_16k(1, outer | self.prg_bank)
+        else:
+            self.set_prg_16k(0, outer | self.prg_bank)
+            self.set_prg_16k(1, outer | (bank_count_16k - 1))
+
+        if self.control & 0x10:
+            self.set_chr_4k(0, self.chr_bank0)
+            self.set_chr_4k(1, self.chr_bank1)
+        else:
+            self.set_chr_8k(self.chr_bank0 >> 1)
+
+
+@register_mapper(2)
+class UxROM(Mapper):
+    """Mapper 2: 可切换的16KB bank在$8000，最后一个bank固定在$C000"""
+
+    name = 'UxROM'
+
+    def reset(self):
+        """映射第一个和最后一个16KB bank"""
+        self.set_prg_16k(0, 0)
+        self.set_prg_16k(1, self.prg_bank_count // 2 - 1)
+        self.set_chr_8k(0)
+
+    def write_register(self, address: int, value: int):
+        """选择$8000处的16KB bank"""
+        self.set_prg_16k(0, value)
+
+
+@register_mapper(3)
+class CNROM(Mapper):
+    """Mapper 3: 固定PRG，可切换的8KB CHR bank"""
+
+    name = 'CNROM'
+
+    def reset(self):
+        """固定PRG映射"""
+        for slot in range(4):
+            self.set_prg_8k(slot, slot)
+        self.set_chr_8k(0)
+
+    def write_register(self, address: int, value: int):
+        """选择8KB CHR bank"""
+        self.set_chr_8k(value)
+
+
+@register_mapper(4)
+class MMC3(Mapper):
+    """Mapper 4: 8KB PRG/1KB CHR bank与扫描线IRQ计数器"""
+
+    name = 'MMC3'
+
+    def reset(self):
+        """复位bank寄存器与IRQ计数器"""
+        self.bank_select = 0
+        self.registers = [0, 2, 4, 5, 6, 7, 0, 1]
+        self.irq_latch = 0
+        self.irq_counter = 0
+        self.irq_reload = False
+        self.irq_enabled = False
+        self.scanline_hook = self.clock_scanline
+        self._update_prg()
+        self._update_chr()
+
+    def get_registers(self) -> Tuple[int, ...]:
+        return (self.bank_select, *self.registers, self.irq_latch, self.irq_counter,
+                self.irq_reload, self.irq_enabled)
+
+    def set_registers(self, values: Tuple[int, ...]):
+        self.bank_select = values[0]
+        self.registers[:] = values[1:9]
+        self.irq_latch, self.irq_counter = values[9], values[10]
+        self.irq_reload, self.irq_enabled = bool(values[11]), bool(values[12])
+
+    def write_register(self, address: int, value: int):
+        """按地址范围和奇偶分派8个寄存器"""
+        odd = address & 1
+        if address < 0xA000:
+            if odd:
+                self.registers[self.bank_select & 7] = value
+            else:
+                self.bank_select = value
+            self._update_prg()
+            self._update_chr()
+        elif address < 0xC000:
+            if not odd and self.mirroring != MIRROR_FOUR_SCREEN:
+                self.set_mirroring(MIRROR_HORIZONTAL if value & 1 else MIRROR_VERTICAL)
+        elif address < 0xE000:
+            if odd:
+                self.irq_counter = 0
+                self.irq_reload = True
+            else:
+                self.irq_latch = value
+        else:
+            if odd:
+                self.irq_enabled = True
+            else:
+                self.irq_enabled = False
+                self.irq_callback(False)
+
+    def _update_prg(self):
+        last = self.prg_bank_count - 1
+        r6, r7 = self.registers[6], self.registers[7]
+        if self.bank_select & 0x40:
+            self.set_prg_8k(0, last - 1)
+            self.set_prg_8k(2, r6)
+        else:
+            self.set_prg_8k(0, r6)
+            self.set_prg_8k(2, last - 1)
+        self.set_prg_8k(1, r7)
+        self.set_prg_8k(3, last)
+
+    def _update_chr(self):
+        r = self.registers
+        # 第7位为1时两个2KB bank和四个1KB bank交换位置
+        base_2k = 4 if self.bank_select & 0x80 else 0
+        base_1k = 4 - base_2k
+        self.set_chr_1k(base_2k, r[0] & 0xFE)
+        self.set_chr_1k(base_2k + 1, r[0] | 1)
+        self.set_chr_1k(base_2k + 2, r[1] & 0xFE)
+        self.set_chr_1k(base_2k + 3, r[1] | 1)
+        for i in range(4):
+            self.set_chr_1k(base_1k + i, r[2 + i])
+
+    def clock_scanline(self):
+        """PPU每条渲染扫描线调用一次（对应A12上升沿）"""
+        if self.irq_counter == 0 or self.irq_reload:
+            self.irq_counter = self.irq_latch
+            self.irq_reload = False
+        else:
+            self.irq_counter -= 1
+        if self.irq_counter == 0 and self.irq_enabled:
+            self.irq_callback(True)
+
+    def scanlines_until_irq(self) -> Optional[int]:
+        """预测还需多少次扫描线计数才会触发IRQ，未启用时返回None"""
+        if not self.irq_enabled:
+            return None
+        if self.irq_counter == 0 or self.irq_reload:
+            return self.irq_latch + 1 if self.irq_latch else 1
+        return self.irq_counter
+
+
+def create_mapper(number: int, bus, chr_rom, mirroring: str = MIRROR_HORIZONTAL) -> Optional[Mapper]:
+    """按iNES编号创建Mapper，未支持的编号返回None"""
+    mapper_class = MAPPER_REGISTRY.get(number)
+    if mapper_class is None:
+        return None
+    return mapper_class(bus, chr_rom, mirroring)
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+NES PPU（2C02）
+按扫描线渲染背景和精灵到预分配的 256x240 uint8 调色板索引帧缓冲，
+同一寄存器状态下的多条扫描线用NumPy一次性批量渲染
+"""
+
+import os
+import struct
+import sys
+from typing import Callable
+
+import numpy as np
+
+try:
+    from nes_chr_cache import CHRTileCache, TILES_PER_BANK, FLIP_HORIZONTAL, FLIP_VERTICAL
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from nes_chr_cache import CHRTileCache, TILES_PER_BANK, FLIP_HORIZONTAL, FLIP_VERTICAL
+
+# 标准2C02调色板（64色）
+NES_PALETTE = [
+    (84, 84, 84), (0, 30, 116), (8, 16, 144), (48, 0, 136),
+    (68, 0, 100), (92, 0, 48), (84, 4, 0), (60, 24, 0),
+    (32, 42, 0), (8, 58, 0), (0, 64, 0), (0, 60, 0),
+    (0, 50, 60), (0, 0, 0), (0, 0, 0), (0, 0, 0),
+    (152, 150, 152), (8, 76, 196), (48, 50, 236), (92, 30, 228),
+    (136, 20, 176), (160, 20, 100), (152, 34, 32), (120, 60, 0),
+    (84, 90, 0), (40, 114, 0), (8, 124, 0), (0, 118, 40),
+    (0, 102, 120), (0, 0, 0), (0, 0, 0), (0, 0, 0),
+    (236, 238, 236), (76, 154, 236), (120, 124, 236), (176, 98, 236),
+    (228, 84, 236), (236, 88, 180), (236, 106, 100), (212, 136, 32),
+    (160, 170, 0), (116, 196, 0), (76, 208, 32), (56, 204, 108),
+    (56, 180, 204), (60, 60, 60), (0, 0, 0), (0, 0, 0),
+    (236, 238, 236), (168, 204, 236), (188, 188, 236), (212, 178, 236),
+    (236, 174, 236), (236, 174, 212), (236, 180, 176), (228, 196, 144),
+    (204, 210, 120), (180, 222, 120), (168, 226, 144), (152, 226, 180),
+    (160, 214, 228), (160, 162, 160), (0, 0, 0), (0, 0, 0)
+]
+
+SCREEN_WIDTH = 256
+SCREEN_HEIGHT = 240
+SCANLINES_PER_FRAME = 262
+VBLANK_SCANLINE = 241
+PRE_RENDER_SCANLINE = 261
+
+# 名称表镜像: 逻辑名称表(0-3) -> 物理名称表
+NAMETABLE_LAYOUTS = {
+    'horizontal': (0, 0, 1, 1),
+    'vertical': (0, 1, 0, 1),
+    'single_lower': (0, 0, 0, 0),
+    'single_upper': (1, 1, 1, 1),
+    'four_screen': (0, 1, 2, 3),
+}
+
+
+# 快照头：ctrl/mask/status/OAM地址、v/t/x/w、读缓冲、扫描线和帧号；
+# 其后是名称表、调色板、OAM，以及CHR RAM（只有CHR RAM卡带才有）
+PPU_STATE = struct.Struct('<BBBBHHBBBHI')
+
+_TILE_COLUMNS = np.arange(33)
+
+
+def _noop():
+    pass
+
+
+class PPU:
+    """2C02图像处理器
+
+    寄存器使用loopy模型（v/t/x/w），渲染粒度为扫描线。
+    帧缓冲 ``framebuffer`` 的形状为 (240, 256)，内容是0-63的调色板索引
+    """
+
+    def __init__(self, mapper):
+        """初始化显存、调色板和帧缓冲"""
+        self.mapper = mapper
+
+        # 显存：4个1KB名称表（两屏镜像时只用前两个）和32字节调色板
+        self.vram = bytearray(0x1000)
+        self.vram_np = np.frombuffer(self.vram, dtype=np.uint8).reshape(4, 0x400)
+        self.palette_ram = bytearray(32)
+        self.palette_np = np.frombuffer(self.palette_ram, dtype=np.uint8)
+        self.oam = bytearray(256)
+        self.oam_np = np.frombuffer(self.oam, dtype=np.uint8).reshape(64, 4)
+
+        self.nametables = []
+        self.nametable_map = np.zeros(4, dtype=np.intp)
+        self.set_mirroring(mapper.mirroring)
+        mapper.on_mirroring_switch = self.set_mirroring
+
+        # CHR：预解码图块缓存 + 8个1KB槽当前映射的首个图块编号
+        self.tile_cache = CHRTileCache(mapper.chr)
+        self.tiles = self.tile_cache.tiles
+        self.slot_tiles = np.array([tag * TILES_PER_BANK for tag in mapper.chr_tags], dtype=np.intp)
+        mapper.on_chr_switch = self._on_chr_switch
+
+        # 帧缓冲
+        self.framebuffer = np.zeros((SCREEN_HEIGHT, SCREEN_WIDTH), dtype=np.uint8)
+        self._bg_opaque = np.zeros((SCREEN_HEIGHT, SCREEN_WIDTH), dtype=bool)
+
+        # 寄存器
+        self.ctrl = 0
+        self.mask = 0
+        self.status = 0
+        self.oam_addr = 0
+        self.v = 0
+        self.t = 0
+        self.x = 0
+        self.w = 0
+        self.read_buffer = 0
+
+        # 时序
+        self.scanline = 0
+        self.frame = 0
+        self.frame_complete = False
+        self.nmi_callback: Callable = _noop
+
+        self.state_size = (PPU_STATE.size + len(self.vram) + len(self.palette_ram) + len(self.oam) +
+                           (len(mapper.chr) if mapper.chr_writable else 0))
+
+    # ------------------------------------------------------------------
+    # 映射
+    # ------------------------------------------------------------------
+
+    def set_mirroring(self, mirroring: str):
+        """根据镜像方式重建名称表映射"""
+        layout = NAMETABLE_LAYOUTS.get(mirroring, NAMETABLE_LAYOUTS['horizontal'])
+        view = memoryview(self.vram)
+        self.nametables = [view[page * 0x400:(page + 1) * 0x400] for page in layout]
+        self.nametable_map[:] = layout
+
+    def _on_chr_switch(self, slot: int):
+        self.slot_tiles[slot] = self.mapper.chr_tags[slot] * TILES_PER_BANK
+
+    def _tile_ids(self, addresses):
+        """图案表地址 -> 缓存中的图块编号"""
+        return self.slot_tiles[addresses >> 10] + ((addresses & 0x3FF) >> 4)
+
+    # ------------------------------------------------------------------
+    # CPU寄存器接口（$2000-$2007）
+    # ------------------------------------------------------------------
+
+    def read_register(self, register: int) -> int:
+        """读取PPU寄存器"""
+        if register == 2:
+            value = self.status | (self.read_buffer & 0x1F)
+            self.status &= 0x7F
+            self.w = 0
+            return value
+        if register == 4:
+            return self.oam[self.oam_addr]
+        if register == 7:
+            address = self.v & 0x3FFF
+            if address < 0x3F00:
+                value = self.read_buffer
+                self.read_buffer = self.read_vram(address)
+            else:
+                value = self.read_vram(address)
+                self.read_buffer = self.read_vram(address - 0x1000)
+            self.v = (self.v + (32 if self.ctrl & 0x04 else 1)) & 0x7FFF
+            return value
+        return self.read_buffer
+
+    def write_register(self, register: int, value: int):
+        """写入PPU寄存器"""
+        if register == 0:
+            nmi_was_enabled = self.ctrl & 0x80
+            self.ctrl = value
+            self.t = (self.t & 0xF3FF) | ((value & 0x03) << 10)
+            # vblank期间打开NMI会立即触发
+            if not nmi_was_enabled and value & 0x80 and self.status & 0x80:
+                self.nmi_callback()
+        elif register == 1:
+            self.mask = value
+        elif register == 3:
+            self.oam_addr = value
+        elif register == 4:
+            self.oam[self.oam_addr] = value
+            self.oam_addr = (self.oam_addr + 1) & 0xFF
+        elif register == 5:
+            if self.w:
+                self.t = (self.t & 0x8C1F) | ((value & 0x07) << 12) | ((value & 0xF8) << 2)
+                self.w = 0
+            else:
+                self.t = (self.t & 0xFFE0) | (value >> 3)
+                self.x = value & 0x07
+                self.w = 1
+        elif register == 6:
+            if self.w:
+                self.t = (self.t & 0xFF00) | value
+                self.v = self.t
+                self.w = 0
+            else:
+                self.t = (self.t & 0x00FF) | ((value & 0x3F) << 8)
+                self.w = 1
+        elif register == 7:
+            self.write_vram(self.v & 0x3FFF, value)
+            self.v = (self.v + (32 if self.ctrl & 0x04 else 1)) & 0x7FFF
+
+    def oam_dma(self, data):
+        """$4014 OAM DMA：从当前OAM地址开始写入256字节"""
+        start = self.oam_addr
+        if start == 0:
+            self.oam[:] = data
+        else:
+            for i in range(256):
+                self.oam[(start + i) & 0xFF] = data[i]
+
+    # ------------------------------------------------------------------
+    # 状态快照
+    # ------------------------------------------------------------------
+
+    def save_state(self) -> bytes:
+        """寄存器、时序、显存和OAM（帧缓冲不保存，下一帧会重新渲染）"""
+        header = PPU_STATE.pack(self.ctrl, self.mask, self.status, self.oam_addr,
+                                self.v, self.t, self.x, self.w, self.read_buffer,
+                                self.scanline, self.frame)
+        parts = [header, self.vram, self.palette_ram, self.oam]
+        if self.mapper.chr_writable:
+            parts.append(self.mapper.chr)
+        return b''.join(parts)
+
+    def load_state(self, data):
+        """从 save_state() 的快照恢复（原地写入，numpy视图保持有效）"""
+        data = memoryview(data)
+        (self.ctrl, self.mask, self.status, self.oam_addr,
+         self.v, self.t, self.x, self.w, self.read_buffer,
+         self.scanline, self.frame) = PPU_STATE.unpack_from(data)
+        offset = PPU_STATE.size
+        for buffer in (self.vram, self.palette_ram, self.oam):
+            buffer[:] = data[offset:offset + len(buffer)]
+            offset += len(buffer)
+
+        if self.mapper.chr_writable:
+            # CHR RAM：只让内容变化的图块失效
+            chr_np = self.tile_cache.chr_np
+            restored = np.frombuffer(data, dtype=np.uint8, count=len(chr_np), offset=offset)
+            changed = np.flatnonzero((chr_np.reshape(-1, 16) != restored.reshape(-1, 16)).any(axis=1))
+            if len(changed):
+                chr_np[:] = restored
+                self.tile_cache.dirty.update(changed.tolist())
+
+    # ------------------------------------------------------------------
+    # PPU地址空间
+    # ------------------------------------------------------------------
+
+    def read_vram(self, address: int) -> int:
+        """读取PPU地址空间"""
+        if address < 0x2000:
+            return self.mapper.read_chr(address)
+        if address < 0x3F00:
+            return self.nametables[(address >> 10) & 3][address & 0x3FF]
+        return self.palette_ram[self._palette_index(address)]
+
+    def write_vram(self, address: int, value: int):
+        """写入PPU地址空间"""
+        if address < 0x2000:
+            if self.mapper.chr_writable:
+                self.mapper.write_chr(address, value)
+                self.tile_cache.invalidate(self.mapper.chr_tags[address >> 10] * 0x400 + (address & 0x3FF))
+        elif address < 0x3F00:
+            self.nametables[(address >> 10) & 3][address & 0x3FF] = value
+        else:
+            self.palette_ram[self._palette_index(address)] = value & 0x3F
+
+    @staticmethod
+    def _palette_index(address: int) -> int:
+        index = address & 0x1F
+        # $3F10/$3F14/$3F18/$3F1C 镜像到 $3F00/$3F04/$3F08/$3F0C
+        if index & 0x13 == 0x10:
+            index &= 0x0F
+        return index
+
+    # ------------------------------------------------------------------
+    # 时序
+    # ------------------------------------------------------------------
+
+    @property
+    def rendering_enabled(self) -> bool:
+        """背景或精灵显示是否打开"""
+        return bool(self.mask & 0x18)
+
+    def step_scanline(self):
+        """推进一条扫描线"""
+        self.run_scanlines(1)
+
+    def run_scanlines(self, count: int):
+        """推进count条扫描线，可见区域内相同寄存器状态的扫描线一次渲染"""
+        while count > 0:
+            line = self.scanline
+            if line < SCREEN_HEIGHT:
+                batch = min(count, SCREEN_HEIGHT - line)
+                self.render_lines(line, batch)
+            elif line == VBLANK_SCANLINE:
+                self.status |= 0x80
+                self.frame_complete = True
+                if self.ctrl & 0x80:
+                    self.nmi_callback()
+                batch = 1
+            elif line == PRE_RENDER_SCANLINE:
+                self.status &= 0x1F
+                if self.rendering_enabled:
+                    # 预渲染行把t的垂直滚动位复制到v
+                    self.v = (self.v & 0x041F) | (self.t & 0x7BE0)
+                    if self.mapper.scanline_hook is not None:
+                        self.mapper.scanline_hook()
+                batch = 1
+            elif line < VBLANK_SCANLINE:
+                batch = 1
+            else:
+                batch = min(count, PRE_RENDER_SCANLINE - line)
+
+            count -= batch
+            line += batch
+            if line >= SCANLINES_PER_FRAME:
+                line = 0
+                self.frame += 1
+            self.scanline = line
+
+    # ------------------------------------------------------------------
+    # 渲染
+    # ------------------------------------------------------------------
+
+    def render_lines(self, first: int, count: int):
+        """渲染 [first, first+count) 可见扫描线并推进v寄存器"""
+        rows = self.framebuffer[first:first + count]
+        if not self.rendering_enabled:
+            rows[:] = self.palette_ram[0]
+            return
+
+        self.tile_cache.refresh()
+        mask = self.mask
+        bg_opaque = self._bg_opaque[first:first + count]
+        if mask & 0x08:
+            colors = self._render_background(count)
+            if not mask & 0x02:
+                colors[:, :8] = 0
+            np.not_equal(colors & 0x03, 0, out=bg_opaque)
+        else:
+            colors = np.zeros((count, SCREEN_WIDTH), dtype=np.uint8)
+            bg_opaque[:] = False
+
+        if mask & 0x10:
+            self._render_sprites(first, count, colors, bg_opaque)
+
+        np.take(self.palette_np, colors, out=rows)
+        if mask & 0x01:
+            rows &= 0x30
+
+        self._advance_v(count)
+        hook = self.mapper.scanline_hook
+        if hook is not None:
+            for _ in range(count):
+                hook()
+
+    def _render_background(self, count: int) -> np.ndarray:
+        """返回背景的调色板内索引（0-15，0为透明）"""
+        v = self.v
+        coarse_x = v & 0x1F
+        coarse_y = (v >> 5) & 0x1F
+        nametable = (v >> 10) & 3
+        fine_y = (v >> 12) & 7
+
+        # 行方向：名称表内的像素行（跨过第240行时切换垂直名称表）
+        y = coarse_y * 8 + fine_y + np.arange(count)
+        nt_y = (nametable >> 1) ^ ((y // SCREEN_HEIGHT) & 1)
+        y %= SCREEN_HEIGHT
+        tile_y = y >> 3
+        row_in_tile = y & 7
+
+        # 列方向：33个图块覆盖256像素加细滚动
+        columns = coarse_x + _TILE_COLUMNS
+        nt_x = (nametable & 1) ^ (columns >> 5)
+        tile_x = columns & 31
+
+        physical = self.nametable_map[(nt_y[:, None] << 1) | nt_x[None, :]]
+        names = self.vram_np[physical, (tile_y * 32)[:, None] + tile_x[None, :]]
+        attributes = self.vram_np[physical, 0x3C0 + ((tile_y >> 2) * 8)[:, None] + (tile_x >> 2)[None, :]]
+        shift = ((tile_y & 2) << 1)[:, None] | (tile_x & 2)[None, :]
+        palette_high = ((attributes >> shift) & 3) << 2
+
+        base = 0x1000 if self.ctrl & 0x10 else 0
+        tile_ids = self._tile_ids(base + names.astype(np.intp) * 16)
+        pixels = self.tiles[0, tile_ids, row_in_tile[:, None]]
+        colors = np.where(pixels != 0, pixels | palette_high[:, :, None], 0).astype(np.uint8)
+        colors = colors.reshape(count, 33 * 8)
+        return colors[:, self.x:self.x + SCREEN_WIDTH]
+
+    def _render_sprites(self, first: int, count: int, colors: np.ndarray, bg_opaque: np.ndarray):
+        """把精灵合成到 colors 中（调色板索引16-31）"""
+        height = 16 if self.ctrl & 0x20 else 8
+        oam = self.oam_np
+        tops = oam[:, 0].astype(np.intp) + 1
+        visible = (tops < first + count) & (tops + height > first) & (oam[:, 0] < 0xEF)
+        indices = np.flatnonzero(visible)
+        if indices.size == 0:
+            return
+
+        sprite_colors = np.zeros((count, SCREEN_WIDTH + 8), dtype=np.uint8)
+        sprite_behind = np.zeros((count, SCREEN_WIDTH + 8), dtype=bool)
+        table = 0x1000 if self.ctrl & 0x08 else 0
+
+        # 从低优先级（高编号）到高优先级依次覆盖
+        for index in indices[::-1]:
+            top, tile, attributes, x = (int(value) for value in oam[index])
+            top += 1
+            pixels = self._sprite_pixels(tile, attributes, height, table)
+            start = max(first, top)
+            end = min(first + count, top + height)
+            block = pixels[start - top:end - top]
+            opaque = block != 0
+            target = sprite_colors[start - first:end - first, x:x + 8]
+            target[opaque] = (block | (0x10 | ((attributes & 3) << 2)))[opaque]
+            behind = sprite_behind[start - first:end - first, x:x + 8]
+            behind[opaque] = bool(attributes & 0x20)
+
+            if index == 0:
+                self._check_sprite_zero(start - first, end - first, x, opaque, bg_opaque)
+
+        sprite_colors = sprite_colors[:, :SCREEN_WIDTH]
+        if not self.mask & 0x04:
+            sprite_colors[:, :8] = 0
+        show = (sprite_colors != 0) & ~(sprite_behind[:, :SCREEN_WIDTH] & bg_opaque)
+        np.copyto(colors, sprite_colors, where=show)
+
+    def _sprite_pixels(self, tile: int, attributes: int, height: int, table: int) -> np.ndarray:
+        """从图块缓存取出一个精灵的像素块（已处理翻转），形状 (height, 8)"""
+        variant = ((attributes >> 6) & 1) * FLIP_HORIZONTAL + ((attributes >> 7) & 1) * FLIP_VERTICAL
+        if height == 8:
+            return self.tiles[variant, self._tile_ids(table + tile * 16)]
+
+        # 8x16精灵：上下两个图块，垂直翻转时交换顺序
+        table = (tile & 1) * 0x1000
+        top = self._tile_ids(table + (tile & 0xFE) * 16)
+        bottom = self._tile_ids(table + (tile | 0x01) * 16)
+        if attributes & 0x80:
+            top, bottom = bottom, top
+        return np.concatenate((self.tiles[variant, top], self.tiles[variant, bottom]))
+
+    def _check_sprite_zero(self, row_start: int, row_end: int, x: int,
+                           opaque: np.ndarray, bg_opaque: np.ndarray):
+        """0号精灵与不透明背景重叠时设置命中标志"""
+        if self.status & 0x40 or not self.mask & 0x08:
+            return
+        width = min(8, 255 - x)
+        if width <= 0:
+            return
+        hits = opaque[:, :width] & bg_opaque[row_start:row_end, x:x + width]
+        if not (self.mask & 0x06) == 0x06 and x < 8:
+            hits[:, :8 - x] = False
+        if hits.any():
+            self.status |= 0x40
+
+    def _advance_v(self, count: int):
+        """每条扫描线结束时：垂直位递增，水平位从t复制"""
+        v = self.v
+        y = ((v >> 5) & 0x1F) * 8 + ((v >> 12) & 7) + count
+        nametable_y = (v >> 11) & 1
+        if y >= SCREEN_HEIGHT:
+            nametable_y ^= (y // SCREEN_HEIGHT) & 1
+            y %= SCREEN_HEIGHT
+        self.v = ((y & 7) << 12) | (nametable_y << 11) | ((y >> 3) << 5)
+        self.v |= self.t & 0x041F
+
+
+def palette_lut(palette=None) -> np.ndarray:
+    """64色RGB查找表，形状 (64, 3)"""
+    return np.array(palette or NES_PALETTE, dtype=np.uint8)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+CPU/PPU/APU追赶式调度器
+CPU一直运行到下一个定时事件（vblank、Mapper IRQ、APU帧IRQ），
+中途访问PPU/APU寄存器或写Mapper时才让对应设备追赶到当前周期，
+PPU在两次追赶之间的所有扫描线一次批量渲染
+"""
+
+import os
+import struct
+import sys
+from collections import deque
+from typing import Dict, Optional
+
+try:
+    from nes_ppu import SCREEN_HEIGHT, SCANLINES_PER_FRAME, VBLANK_SCANLINE, PRE_RENDER_SCANLINE
+except ImportError:
+    sys.path.append(os.path.dirname(__file__))
+    from nes_ppu import SCREEN_HEIGHT, SCANLINES_PER_FRAME, VBLANK_SCANLINE, PRE_RENDER_SCANLINE
+
+DOTS_PER_SCANLINE = 341
+
+# 追赶事件（跟踪模式下按帧计数）
+EVENT_PPU_REGISTER = 'ppu_register'
+EVENT_OAM_DMA = 'oam_dma'
+EVENT_APU_REGISTER = 'apu_register'
+EVENT_MAPPER_WRITE = 'mapper_write'
+EVENT_SPRITE_ZERO = 'sprite_zero'
+EVENT_MAPPER_IRQ = 'mapper_irq'
+EVENT_APU_IRQ = 'apu_irq'
+EVENT_END_OF_FRAME = 'end_of_frame'
+
+# 快照：PPU已处理到的点位
+SCHEDULER_STATE = struct.Struct('<q')
+
+
+class Scheduler:
+    """追赶式调度器
+
+    PPU位置以PPU点（CPU周期 x 3）记录在 ``ppu_dots`` 中，
+    一条扫描线在CPU越过它的结束点后才被处理；vblank所在的241行例外，
+    CPU一到达它的第1点就处理，使$2002第7位和NMI与真机同一点出现。
+    0号精灵命中只能通过读$2002观察到，而读$2002会先让PPU追赶，
+    因此它属于寄存器访问事件；跟踪模式单独统计追赶中产生的命中
+    """
+
+    def __init__(self, cpu, ppu, apu=None, mapper=None, trace: bool = False):
+        """接管总线上PPU、I/O和Mapper页的处理函数"""
+        self.cpu = cpu
+        self.ppu = ppu
+        self.apu = apu
+        self.mapper = mapper
+        self.ppu_dots = cpu.cycles * 3
+        self.state_size = SCHEDULER_STATE.size
+
+        self.trace = trace
+        self.frame_events: Dict[str, int] = {}
+        self.trace_history = deque(maxlen=600)
+
+        self._install_hooks()
+
+    # ------------------------------------------------------------------
+    # 总线钩子
+    # ------------------------------------------------------------------
+
+    def _install_hooks(self):
+        bus = self.cpu.bus
+        cpu = self.cpu
+        sync_ppu = self.sync_ppu
+        read_ppu = bus.read_table[0x20]
+        write_ppu = bus.write_table[0x20]
+        read_io = bus.read_table[0x40]
+        write_io = bus.write_table[0x40]
+
+        def read_ppu_synced(address: int) -> int:
+            sync_ppu(EVENT_PPU_REGISTER)
+            return read_ppu(address)
+
+        def write_ppu_synced(address: int, value: int):
+            sync_ppu(EVENT_PPU_REGISTER)
+            write_ppu(address, value)
+            # $2000/$2001会改变NMI和渲染开关，重新计算下一个事件
+            if address & 6 == 0:
+                cpu.stop_run()
+
+        def read_io_synced(address: int) -> int:
+            if address == 0x4015 and self.trace:
+                self._count(EVENT_APU_REGISTER)
+            return read_io(address)
+
+        def write_io_synced(address: int, value: int):
+            if address == 0x4014:
+                sync_ppu(EVENT_OAM_DMA)
+            elif address < 0x4018 and address != 0x4016:
+                if self.trace:
+                    self._count(EVENT_APU_REGISTER)
+                write_io(address, value)
+                # 帧计数器或通道开关可能改变IRQ时间
+                if address == 0x4015 or address == 0x4017:
+                    cpu.stop_run()
+                return
+            write_io(address, value)
+
+        bus.map_pages(0x20, 0x3F, read_ppu_synced, write_ppu_synced)
+        bus.map_pages(0x40, 0x40, read_io_synced, write_io_synced)
+
+        if self.mapper is not None:
+            write_mapper = self.mapper.write_register
+
+            def write_mapper_synced(address: int, value: int):
+                # bank切换、镜像和IRQ设置只影响之后的扫描线
+                sync_ppu(EVENT_MAPPER_WRITE)
+                write_mapper(address, value)
+                cpu.stop_run()
+
+            bus.map_pages(0x80, 0xFF, writer=write_mapper_synced)
+
+    # ------------------------------------------------------------------
+    # 追赶
+    # ------------------------------------------------------------------
+
+    def _count(self, event: str):
+        self.frame_events[event] = self.frame_events.get(event, 0) + 1
+
+    def sync_ppu(self, event: Optional[str] = None):
+        """让PPU处理CPU当前周期之前已经结束的所有扫描线（以及已开始的vblank行）"""
+        dots = self.cpu.cycles * 3 - self.ppu_dots
+        lines = dots // DOTS_PER_SCANLINE
+        if (lines >= 0 and dots > lines * DOTS_PER_SCANLINE
+                and (self.ppu.scanline + lines) % SCANLINES_PER_FRAME == VBLANK_SCANLINE):
+            # vblank在241行第1点置位，不等这一行结束；ppu_dots会暂时领先CPU
+            lines += 1
+        if lines <= 0:
+            if self.trace and event is not None:
+                self._count(event)
+            return
+        ppu = self.ppu
+        if self.trace:
+            if event is not None:
+                self._count(event)
+            hit_before = ppu.status & 0x40
+            ppu.run_scanlines(lines)
+            if ppu.status & 0x40 and not hit_before:
+                self._count(EVENT_SPRITE_ZERO)
+            self._count('ppu_batches')
+            self.frame_events['ppu_lines'] = self.frame_events.get('ppu_lines', 0) + lines
+        else:
+            ppu.run_scanlines(lines)
+        self.ppu_dots += lines * DOTS_PER_SCANLINE
+
+    def _cycle_after_lines(self, lines: int) -> int:
+        """PPU再处理lines条扫描线时对应的CPU周期"""
+        return -(-(self.ppu_dots + lines * DOTS_PER_SCANLINE) // 3)
+
+    def _lines_until_hooks(self, count: int) -> int:
+        """从当前扫描线起，触发count次Mapper扫描线计数需要处理的扫描线数"""
+        line = self.ppu.scanline
+        lines = 0
+        while True:
+            if line < SCREEN_HEIGHT:
+                step = min(count, SCREEN_HEIGHT - line)
+                count -= step
+            elif line == PRE_RENDER_SCANLINE:
+                step = 1
+                count -= 1
+            else:
+                step = PRE_RENDER_SCANLINE - line
+            lines += step
+            line = (line + step) % SCANLINES_PER_FRAME
+            if count <= 0:
+                return lines
+
+    def next_event(self):
+        """返回 (CPU周期, 事件名)：vblank开始（241行第1点）、Mapper IRQ或APU帧IRQ中最早的一个"""
+        lines = (VBLANK_SCANLINE - self.ppu.scanline) % SCANLINES_PER_FRAME
+        cycle = -(-(self.ppu_dots + lines * DOTS_PER_SCANLINE + 1) // 3)
+        event = EVENT_END_OF_FRAME
+
+        mapper = self.mapper
+        if mapper is not None and mapper.scanline_hook is not None and self.ppu.rendering_enabled:
+            count = mapper.scanlines_until_irq()
+            if count is not None:
+                irq_cycle = self._cycle_after_lines(self._lines_until_hooks(count))
+                if irq_cycle < cycle:
+                    cycle, event = irq_cycle, EVENT_MAPPER_IRQ
+
+        if self.apu is not None:
+            irq_cycle = self.apu.next_irq_cycle()
+            if irq_cycle is not None and irq_cycle < cycle:
+                cycle, event = max(irq_cycle, self.cpu.cycles), EVENT_APU_IRQ
+
+        return cycle, event
+
+    def run_frame(self):
+        """运行到PPU进入vblank（完成一帧画面）为止"""
+        cpu = self.cpu
+        ppu = self.ppu
+        ppu.frame_complete = False
+        while not ppu.frame_complete:
+            target, event = self.next_event()
+            if cpu.cycles < target:
+                cpu.run(target - cpu.cycles)
+            if cpu.cycles >= target:
+                if event == EVENT_APU_IRQ:
+                    self.apu.run_until(cpu.cycles)
+                    if self.trace:
+                        self._count(event)
+                    continue
+                self.sync_ppu(event)
+            else:
+                # 寄存器写入提前结束了本次运行
+                self.sync_ppu()
+
+        if self.trace:
+            self.trace_history.append(self.frame_events)
+            self.frame_events = {}
+
+    def save_state(self) -> bytes:
+        """PPU追赶位置（CPU/PPU各自保存自己的状态）"""
+        return SCHEDULER_STATE.pack(self.ppu_dots)
+
+    def load_state(self, data):
+        """从 save_state() 的快照恢复"""
+        self.ppu_dots, = SCHEDULER_STATE.unpack(data)
+
+    def get_trace_stats(self) -> Dict:
+        """跟踪模式下每帧追赶事件的平均值和最大值"""
+        frames = len(self.trace_history)
+        totals: Dict[str, int] = {}
+        peaks: Dict[str, int] = {}
+        for events in self.trace_history:
+            for name, count in events.items():
+                totals[name] = totals.get(name, 0) + count
+                peaks[name] = max(peaks.get(name, 0), count)
+        return {
+            'frames': frames,
+            'average': {name: round(total / frames, 2) for name, total in sorted(totals.items())} if frames else {},
+            'max': dict(sorted(peaks.items()))
+        }
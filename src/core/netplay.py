@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+回滚联机（rollback netplay）
+两台机器各自运行完整的模拟，每帧通过UDP交换本地手柄输入。
+对方的输入还没到时先用它最近一次确认的输入作为预测继续模拟，不等待网络；
+之后收到的真实输入与预测不同时，恢复出错那一帧之前的内存快照，用正确的输入重新模拟到当前帧。
+
+每个数据包带上还没被对方确认的全部本地输入（丢包由后续的包补上），
+以及最近一个双方输入都已确认的帧的状态CRC32，用来发现两边模拟结果不一致（desync）
+"""
+
+import heapq
+import random
+import socket
+import struct
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+NETPLAY_MAGIC = b'NP'
+NETPLAY_VERSION = 1
+
+# 数据包：标识、版本、第一个输入的帧号、已确认收到的对方帧号、校验帧号（-1表示没有）、CRC32、输入个数；
+# 其后是逐帧的1字节手柄输入
+PACKET_HEADER = struct.Struct('<2sBIiiIB')
+
+# 每个数据包最多携带的输入帧数
+INPUT_WINDOW = 64
+
+
+class UDPTransport:
+    """非阻塞UDP收发"""
+
+    def __init__(self, bind: Tuple[str, int], peer: Optional[Tuple[str, int]] = None):
+        """
+        Args:
+            bind: 本地地址，端口为0时由系统分配
+            peer: 对方地址
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(bind)
+        self.address = self.sock.getsockname()
+        self.peer = peer
+
+    def send(self, data: bytes):
+        """发送一个数据包（对方尚未启动时静默丢弃）"""
+        try:
+            self.sock.sendto(data, self.peer)
+        except OSError:
+            pass
+
+    def receive(self) -> List[bytes]:
+        """取出所有已到达的数据包"""
+        packets = []
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # 对方端口未打开时Linux会在下一次接收时报告ICMP错误，忽略即可
+                continue
+            packets.append(data)
+        return packets
+
+    def close(self):
+        """关闭套接字"""
+        self.sock.close()
+
+
+class LossyTransport:
+    """测试用：给发出的数据包加上延迟、抖动和丢包"""
+
+    def __init__(self, transport, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 loss: float = 0.0, seed: int = 0, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            transport: 实际收发的传输层
+            latency_ms: 固定延迟
+            jitter_ms: 额外的随机延迟上限
+            loss: 丢包率（0~1）
+            seed: 随机数种子
+            clock: 计时函数（秒），测试工具用模拟时间
+        """
+        self.transport = transport
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.clock = clock
+        self.pending = []
+        self.sequence = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def send(self, data: bytes):
+        """按丢包率丢弃，否则延迟后发出"""
+        self.sent += 1
+        if self.rng.random() < self.loss:
+            self.dropped += 1
+            return
+        due = self.clock() + self.latency + self.rng.random() * self.jitter
+        self.sequence += 1
+        heapq.heappush(self.pending, (due, self.sequence, data))
+        self.flush()
+
+    def flush(self):
+        """发出已到时间的数据包"""
+        now = self.clock()
+        pending = self.pending
+        while pending and pending[0][0] <= now:
+            self.transport.send(heapq.heappop(pending)[2])
+
+    def receive(self) -> List[bytes]:
+        """先发出到期的数据包，再接收"""
+        self.flush()
+        return self.transport.receive()
+
+    def close(self):
+        """关闭实际的传输层"""
+        self.transport.close()
+
+
+class RollbackSession:
+    """一方的回滚联机状态"""
+
+    def __init__(self, transport, local_port: int, capture: Callable[[], bytes],
+                 restore: Callable[[bytes], None], emulate: Callable[[Tuple[int, int], bool], None],
+                 max_rollback: int = 8, clock: Callable[[], int] = time.perf_counter_ns):
+        """
+        Args:
+            transport: 传输层（send/receive）
+            local_port: 本地玩家的手柄端口（0或1）
+            capture: 保存内存快照
+            restore: 恢复内存快照
+            emulate: 用 (1号手柄, 2号手柄) 的输入模拟一帧，第二个参数为False时是重新模拟（应静音）
+            max_rollback: 最多领先对方已确认输入的帧数，超过时暂停等待
+            clock: 纳秒计时函数
+        """
+        self.transport = transport
+        self.local_port = local_port
+        self.capture = capture
+        self.restore = restore
+        self.emulate = emulate
+        # 领先的帧数受限于一个数据包能补发的输入数
+        self.max_rollback = max(1, min(max_rollback, INPUT_WINDOW // 2 - 2))
+        self.clock = clock
+
+        # frame: 下一个要模拟的帧；remote_frame: 对方输入连续确认到的帧；
+        # remote_ack: 对方连续收到的本地输入帧
+        self.frame = 0
+        self.remote_frame = -1
+        self.remote_ack = -1
+        self.local_inputs: Dict[int, int] = {}
+        self.remote_inputs: Dict[int, int] = {}
+        self.used_remote: Dict[int, int] = {}
+        # states[f]: 模拟第f帧之前的快照
+        self.states: Dict[int, bytes] = {}
+        self.pruned_frame = 0
+
+        # checksums[f]: 第f帧模拟完后的状态CRC32（只记双方输入都已确认的帧）
+        self.checksums: Dict[int, int] = {}
+        self.remote_checksums: Dict[int, int] = {}
+        self.checked_frame = -1
+        self.desync_frame: Optional[int] = None
+
+        self.rollbacks = 0
+        self.resimulated_frames = 0
+        self.max_depth = 0
+        self.resimulate_ns = 0
+        self.stalls = 0
+        self.packets_sent = 0
+        self.packets_received = 0
+
+    def advance(self, local_input: int) -> bool:
+        """收包、必要时回滚，再用本地输入和对方的（预测）输入模拟一帧；领先太多时返回False不模拟"""
+        self.poll()
+        if self.frame - self.remote_frame > self.max_rollback:
+            self.stalls += 1
+            self.send_inputs()
+            return False
+
+        frame = self.frame
+        local_input &= 0xFF
+        self.local_inputs[frame] = local_input
+        self.send_inputs()
+
+        self.states[frame] = self.capture()
+        remote = self.remote_inputs.get(frame)
+        if remote is None:
+            remote = self.predict()
+        self.used_remote[frame] = remote
+        self.emulate(self.ordered(local_input, remote), True)
+        self.frame = frame + 1
+        self.update_checksums()
+        self.prune()
+        return True
+
+    def predict(self) -> int:
+        """预测对方输入：重复最近一次确认的输入"""
+        return self.remote_inputs.get(self.remote_frame, 0)
+
+    def ordered(self, local_input: int, remote_input: int) -> Tuple[int, int]:
+        """按手柄端口排列双方输入"""
+        if self.local_port == 0:
+            return local_input, remote_input
+        return remote_input, local_input
+
+    def poll(self):
+        """接收对方的输入和校验值，发现预测错误时回滚"""
+        earliest = None
+        for packet in self.transport.receive():
+            if len(packet) < PACKET_HEADER.size:
+                continue
+            magic, version, first, ack, check_frame, checksum, count = PACKET_HEADER.unpack_from(packet)
+            if magic != NETPLAY_MAGIC or version != NETPLAY_VERSION:
+                continue
+            self.packets_received += 1
+            if ack > self.remote_ack:
+                self.remote_ack = ack
+            if check_frame >= 0:
+                self.remote_checksums[check_frame] = checksum
+            inputs = packet[PACKET_HEADER.size:PACKET_HEADER.size + count]
+            for frame in range(max(first, self.remote_frame + 1), first + len(inputs)):
+                if frame in self.remote_inputs:
+                    continue
+                value = inputs[frame - first]
+                self.remote_inputs[frame] = value
+                if frame < self.frame and self.used_remote[frame] != value:
+                    if earliest is None or frame < earliest:
+                        earliest = frame
+
+        remote_inputs = self.remote_inputs
+        while self.remote_frame + 1 in remote_inputs:
+            self.remote_frame += 1
+        if earliest is not None:
+            self.rollback(earliest)
+        self.update_checksums()
+
+    def rollback(self, start: int):
+        """恢复第start帧之前的快照，用已知输入重新模拟到当前帧"""
+        begin = self.clock()
+        self.restore(self.states[start])
+        for frame in range(start, self.frame):
+            if frame != start:
+                self.states[frame] = self.capture()
+            remote = self.remote_inputs.get(frame)
+            if remote is None:
+                remote = self.predict()
+            self.used_remote[frame] = remote
+            self.emulate(self.ordered(self.local_inputs[frame], remote), False)
+        depth = self.frame - start
+        self.rollbacks += 1
+        self.resimulated_frames += depth
+        self.resimulate_ns += self.clock() - begin
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def update_checksums(self):
+        """对双方输入都已确认、且已有结束快照的帧记录CRC32，并与对方的校验值比较"""
+        while self.checked_frame < self.remote_frame and self.checked_frame + 2 < self.frame:
+            frame = self.checked_frame + 1
+            self.checksums[frame] = zlib.crc32(self.states[frame + 1])
+            self.checked_frame = frame
+        remote_checksums = self.remote_checksums
+        for frame in [f for f in remote_checksums if f <= self.checked_frame]:
+            remote = remote_checksums.pop(frame)
+            local = self.checksums.get(frame)
+            if local is not None and local != remote and self.desync_frame is None:
+                self.desync_frame = frame
+                print(f"❌ 联机不同步: 第 {frame} 帧两边状态不一致")
+
+    def send_inputs(self):
+        """发送对方还没确认的本地输入、已确认的对方帧号和最近的校验值"""
+        last = self.frame if self.frame in self.local_inputs else self.frame - 1
+        first = max(self.remote_ack + 1, last - INPUT_WINDOW + 1, 0)
+        local_inputs = self.local_inputs
+        inputs = bytes(local_inputs[frame] for frame in range(first, last + 1))
+        check_frame = self.checked_frame
+        checksum = self.checksums.get(check_frame, 0)
+        self.transport.send(PACKET_HEADER.pack(NETPLAY_MAGIC, NETPLAY_VERSION, first, self.remote_frame,
+                                               check_frame, checksum, len(inputs)) + inputs)
+        self.packets_sent += 1
+
+    def prune(self):
+        """丢弃不会再用到的快照、输入和校验值"""
+        # 最早可能回滚到对方未确认的第一帧；计算校验值还需要下一帧之前的快照
+        oldest = min(self.remote_frame + 1, self.checked_frame + 2, self.remote_ack + 1)
+        for frame in range(self.pruned_frame, oldest - 1):
+            self.states.pop(frame, None)
+            self.used_remote.pop(frame, None)
+            self.local_inputs.pop(frame, None)
+            self.remote_inputs.pop(frame, None)
+            self.checksums.pop(frame - INPUT_WINDOW, None)
+        self.pruned_frame = max(self.pruned_frame, oldest - 1)
+
+    def get_stats(self) -> Dict:
+        """回滚频率、深度、重新模拟耗时和网络统计"""
+        frames = self.frame or 1
+        rollbacks = self.rollbacks or 1
+        return {
+            'frames': self.frame,
+            'rollbacks': self.rollbacks,
+            'rollbacks_per_frame': round(self.rollbacks / frames, 4),
+            'mean_depth': round(self.resimulated_frames / rollbacks, 2),
+            'max_depth': self.max_depth,
+            'resimulated_frames': self.resimulated_frames,
+            'resimulate_ms_per_rollback': round(self.resimulate_ns / rollbacks / 1e6, 4),
+            'resimulate_ms_per_frame': round(self.resimulate_ns / frames / 1e6, 4),
+            'stalls': self.stalls,
+            'checked_frames': self.checked_frame + 1,
+            'desync_frame': self.desync_frame,
+            'packets_sent': self.packets_sent,
+            'packets_received': self.packets_received
+        }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+倒带环形缓冲
+每隔若干帧记录一次状态快照。只保留最新快照的完整副本，更早的快照都保存为
+“与后一个快照的异或差”再用zlib压缩：相邻快照大部分字节相同，异或后几乎全是0，
+压缩后通常只有几百字节。倒带时从最新快照依次异或回去；
+总占用超过上限时丢弃最旧的差分
+"""
+
+import time
+import zlib
+from collections import deque
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class RewindBuffer:
+    """内存受限的快照差分环"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, interval: int = 2,
+                 level: int = 1, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            max_bytes: 完整快照、工作缓冲和所有压缩差分的总字节数上限
+            interval: 每隔多少帧记录一次快照
+            level: zlib压缩级别（1最快）
+            clock: 计时函数
+        """
+        self.max_bytes = max_bytes
+        self.interval = max(1, interval)
+        self.level = level
+        self.clock = clock
+
+        # current: 最新快照；deltas[i] 解压后与第i+1个快照异或得到第i个快照
+        self.current: Optional[np.ndarray] = None
+        self.scratch: Optional[np.ndarray] = None
+        self.deltas = deque()
+        self.delta_bytes = 0
+
+        self.captures = 0
+        self.evicted = 0
+        self.capture_time = 0.0
+        self.max_capture_time = 0.0
+
+    def __len__(self) -> int:
+        """可以倒回的快照数（含最新快照）"""
+        return len(self.deltas) + (self.current is not None)
+
+    def clear(self):
+        """丢弃所有快照（例如更换ROM后）"""
+        self.current = None
+        self.scratch = None
+        self.deltas.clear()
+        self.delta_bytes = 0
+
+    def due(self, frame: int) -> bool:
+        """本帧是否需要记录快照"""
+        return frame % self.interval == 0
+
+    def memory_bytes(self) -> int:
+        """当前占用的字节数"""
+        if self.current is None:
+            return 0
+        return self.current.nbytes + self.scratch.nbytes + self.delta_bytes
+
+    def push(self, snapshot):
+        """记录一个新快照"""
+        state = np.frombuffer(snapshot, dtype=np.uint8)
+        current = self.current
+        if current is None or len(current) != len(state):
+            # 第一次记录或快照布局改变：重新开始
+            self.clear()
+            self.current = state.copy()
+            self.scratch = np.empty_like(self.current)
+        else:
+            np.bitwise_xor(state, current, out=self.scratch)
+            delta = zlib.compress(self.scratch, self.level)
+            self.deltas.append(delta)
+            self.delta_bytes += len(delta)
+            current[:] = state
+            while self.deltas and self.memory_bytes() > self.max_bytes:
+                self.delta_bytes -= len(self.deltas.popleft())
+                self.evicted += 1
+
+    def record(self, capture: Callable[[], bytes]):
+        """调用capture取得快照并记录，耗时统计包含序列化、异或和压缩"""
+        start = self.clock()
+        self.push(capture())
+        elapsed = self.clock() - start
+        self.captures += 1
+        self.capture_time += elapsed
+        if elapsed > self.max_capture_time:
+            self.max_capture_time = elapsed
+
+    def step_back(self) -> Optional[bytes]:
+        """退回上一个快照并返回它，已经是最旧的快照时返回None"""
+        if not self.deltas:
+            return None
+        delta = self.deltas.pop()
+        self.delta_bytes -= len(delta)
+        np.bitwise_xor(self.current, np.frombuffer(zlib.decompress(delta), dtype=np.uint8),
+                       out=self.current)
+        return self.current.tobytes()
+
+    def get_stats(self) -> Dict:
+        """快照数量、覆盖帧数、内存占用、平均差分大小和记录耗时"""
+        captures = self.captures or 1
+        snapshot_bytes = len(self.current) if self.current is not None else 0
+        return {
+            'snapshots': len(self),
+            'interval': self.interval,
+            'frames_covered': len(self) * self.interval,
+            'snapshot_bytes': snapshot_bytes,
+            'memory_bytes': self.memory_bytes(),
+            'max_bytes': self.max_bytes,
+            'delta_bytes_mean': round(self.delta_bytes / len(self.deltas), 1) if self.deltas else 0.0,
+            'evicted': self.evicted,
+            'capture_ms_mean': round(self.capture_time * 1000 / captures, 4),
+            'capture_ms_max': round(self.max_capture_time * 1000, 4)
+        }
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+预运行（run-ahead）降低输入延迟
+正常模拟完一帧后，保存内存快照，用当前输入再静音模拟N帧，显示最后一帧的画面，
+然后恢复快照。游戏对输入的反应通常要晚一到两帧才出现在画面上，
+预运行把这几帧提前算出来；代价是每个显示帧多模拟N帧，
+统计中按“每多预运行一帧”的耗时给出，便于选择N
+"""
+
+import time
+from typing import Callable, Dict
+
+
+class RunAhead:
+    """预运行与耗时统计"""
+
+    def __init__(self, frames: int = 1, clock: Callable[[], int] = time.perf_counter_ns):
+        """
+        Args:
+            frames: 每个显示帧预先模拟的帧数
+            clock: 纳秒计时函数
+        """
+        self.frames = max(1, frames)
+        self.clock = clock
+
+        self.presented = 0
+        self.capture_ns = 0
+        self.emulate_ns = 0
+        self.restore_ns = 0
+        self.max_cost_ns = 0
+        # 最近一次预运行的额外耗时（不含显示），分阶段计时用
+        self.last_cost_ns = 0
+
+    def run(self, capture: Callable[[], bytes], restore: Callable[[bytes], None],
+            emulate: Callable[[], None], present: Callable[[], None]):
+        """保存快照 -> 预先模拟frames帧 -> 显示 -> 恢复快照"""
+        clock = self.clock
+        start = clock()
+        state = capture()
+        captured = clock()
+        for _ in range(self.frames):
+            emulate()
+        emulated = clock()
+        present()
+        presented = clock()
+        restore(state)
+        end = clock()
+
+        cost = (captured - start) + (emulated - captured) + (end - presented)
+        self.capture_ns += captured - start
+        self.emulate_ns += emulated - captured
+        self.restore_ns += end - presented
+        self.presented += 1
+        self.last_cost_ns = cost
+        if cost > self.max_cost_ns:
+            self.max_cost_ns = cost
+
+    def get_stats(self) -> Dict:
+        """快照保存/恢复耗时和每多预运行一帧的耗时（毫秒）"""
+        presented = self.presented or 1
+        return {
+            'frames': self.frames,
+            'presented': self.presented,
+            'capture_ms': round(self.capture_ns / presented / 1e6, 4),
+            'restore_ms': round(self.restore_ns / presented / 1e6, 4),
+            'ms_per_extra_frame': round(self.emulate_ns / presented / self.frames / 1e6, 4),
+            'cost_ms_per_frame': round((self.capture_ns + self.emulate_ns + self.restore_ns) /
+                                       presented / 1e6, 4),
+            'max_cost_ms': round(self.max_cost_ns / 1e6, 3)
+        }
@@ -151,6 +151,51 @@ class SaveManager:
             print(f"❌ 加载游戏失败: {e}")
             return None
 
+    def get_state_path(self, game_id: str, slot: int = 1) -> Path:
+        """获取二进制即时存档路径"""
+        return self.saves_dir / f"{game_id}_slot_{slot}.state"
+
+    def save_state_data(self, rom_path: str, data: bytes, slot: int = 1) -> bool:
+        """保存模拟器核心的二进制即时存档（savestate格式，不经过pickle）"""
+        try:
+            game_id = self.get_game_id(rom_path)
+            state_path = self.get_state_path(game_id, slot)
+            state_path.write_bytes(data)
+
+            save_info = self.load_save_info(game_id)
+            now = time.time()
+            save_info["slots"][str(slot)] = {
+                "timestamp": now,
+                "datetime": datetime.now().isoformat(),
+                "size": len(data),
+                "checksum": hashlib.md5(data, usedforsecurity=False).hexdigest(),
+                "format": "savestate"
+            }
+            save_info["last_played"] = now
+            save_info["total_saves"] = save_info.get("total_saves", 0) + 1
+            with open(self.get_save_info_path(game_id), 'w', encoding='utf-8') as f:
+                json.dump(save_info, f, indent=2, ensure_ascii=False)
+
+            print(f"💾 即时存档已保存: 插槽 {slot}（{len(data)} 字节）")
+            return True
+
+        except Exception as e:
+            print(f"❌ 保存即时存档失败: {e}")
+            return False
+
+    def load_state_data(self, rom_path: str, slot: int = 1) -> Optional[bytes]:
+        """读取二进制即时存档，不存在时返回None"""
+        try:
+            state_path = self.get_state_path(self.get_game_id(rom_path), slot)
+            if not state_path.exists():
+                print(f"📁 即时存档不存在: 插槽 {slot}")
+                return None
+            return state_path.read_bytes()
+
+        except Exception as e:
+            print(f"❌ 读取即时存档失败: {e}")
+            return None
+
     def load_save_info(self, game_id: str) -> Dict:
         """加载存档信息"""
         info_path = self.get_save_info_path(game_id)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+二进制即时存档格式
+固定布局的文件头和段表用struct打包，其后依次是各段数据
+（CPU寄存器、RAM、显存、OAM、Mapper寄存器等，都直接从bytearray/ndarray的缓冲区拼接，不经过Python对象）：
+
+    文件头  标识 'NESS'、版本、标志、段数、ROM SHA-1、数据长度
+    段表    每段 4字节标签 + 长度
+    数据    各段按段表顺序紧密排列，标志位0置位时整体用zlib压缩
+
+同一ROM、同一模式下布局固定，倒带、预运行和即时存档都用这一种格式；
+读取时只生成memoryview切片，不复制数据
+"""
+
+import struct
+import zlib
+from typing import Dict, Iterable, Tuple
+
+SAVESTATE_MAGIC = b'NESS'
+SAVESTATE_VERSION = 1
+
+# 标志位
+FLAG_ZLIB = 0x01
+
+SAVESTATE_HEADER = struct.Struct('<4sHBB20sI')
+SECTION_ENTRY = struct.Struct('<4sI')
+
+
+def pack_savestate(sections: Iterable[Tuple[bytes, bytes]], rom_sha1: bytes = bytes(20),
+                   compress: bool = False, level: int = 1) -> bytes:
+    """把(标签, 数据)各段打包成存档
+
+    Args:
+        sections: 段标签（4字节）和支持缓冲区协议的数据
+        rom_sha1: 对应ROM的SHA-1
+        compress: 是否用zlib压缩数据部分
+        level: zlib压缩级别
+    """
+    sections = tuple(sections)
+    table = b''.join(SECTION_ENTRY.pack(tag, len(data)) for tag, data in sections)
+    payload = b''.join(data for _, data in sections)
+    size = len(payload)
+    if compress:
+        payload = zlib.compress(payload, level)
+    header = SAVESTATE_HEADER.pack(SAVESTATE_MAGIC, SAVESTATE_VERSION,
+                                   FLAG_ZLIB if compress else 0, len(sections), rom_sha1, size)
+    return b''.join((header, table, payload))
+
+
+def unpack_savestate(data) -> Tuple[bytes, Dict[bytes, memoryview]]:
+    """解析存档，返回ROM SHA-1和 {标签: 数据视图}；格式不对时抛出ValueError"""
+    data = memoryview(data)
+    if len(data) < SAVESTATE_HEADER.size:
+        raise ValueError("存档数据太小")
+    magic, version, flags, count, rom_sha1, size = SAVESTATE_HEADER.unpack_from(data)
+    if magic != SAVESTATE_MAGIC:
+        raise ValueError("不是即时存档数据")
+    if version != SAVESTATE_VERSION:
+        raise ValueError(f"不支持的存档版本: {version}")
+
+    offset = SAVESTATE_HEADER.size
+    table_end = offset + count * SECTION_ENTRY.size
+    if len(data) < table_end:
+        raise ValueError("存档段表不完整")
+    entries = [SECTION_ENTRY.unpack_from(data, offset + i * SECTION_ENTRY.size) for i in range(count)]
+
+    payload = data[table_end:]
+    if flags & FLAG_ZLIB:
+        try:
+            payload = memoryview(zlib.decompress(payload))
+        except zlib.error as e:
+            raise ValueError(f"存档解压失败: {e}")
+    if len(payload) != size or sum(length for _, length in entries) != size:
+        raise ValueError("存档长度与文件头不符")
+
+    sections = {}
+    offset = 0
+    for tag, length in entries:
+        sections[tag] = payload[offset:offset + length]
+        offset += length
+    return rom_sha1, sections
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+文字渲染缓存
+按 (字体, 字符串, 颜色) 缓存 font.render 的结果，超过容量时淘汰最久未使用的项；
+数字从预渲染的字形条逐位贴出，分数变化不会不断产生新的缓存项
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import pygame
+
+DIGITS = "0123456789"
+
+
+class DigitStrip:
+    """一种字体和颜色的0-9字形条"""
+
+    def __init__(self, font, color):
+        glyphs = [font.render(digit, True, color) for digit in DIGITS]
+        self.offsets: List[int] = []
+        width = 0
+        for glyph in glyphs:
+            self.offsets.append(width)
+            width += glyph.get_width()
+        self.widths = [glyph.get_width() for glyph in glyphs]
+        self.height = max(glyph.get_height() for glyph in glyphs)
+
+        self.surface = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        for glyph, offset in zip(glyphs, self.offsets):
+            self.surface.blit(glyph, (offset, 0))
+        self.areas = [pygame.Rect(offset, 0, glyph_width, self.height)
+                      for offset, glyph_width in zip(self.offsets, self.widths)]
+
+    def draw(self, target: pygame.Surface, value: int, position: Tuple[int, int]) -> int:
+        """把非负整数逐位贴到target上，返回绘制宽度"""
+        x, y = position
+        start = x
+        surface = self.surface
+        sequence = []
+        for char in str(value):
+            digit = ord(char) - 48
+            sequence.append((surface, (x, y), self.areas[digit]))
+            x += self.widths[digit]
+        target.blits(sequence, doreturn=False)
+        return x - start
+
+
+class TextCache:
+    """有容量上限的LRU文字缓存"""
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.strips: Dict[tuple, DigitStrip] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, font, text: str, color) -> pygame.Surface:
+        """返回缓存的文字Surface，未命中时渲染并放入缓存"""
+        key = (font, text, color)
+        entries = self.entries
+        surface = entries.get(key)
+        if surface is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        entries[key] = surface
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def draw_number(self, target: pygame.Surface, font, value: int, color,
+                    position: Tuple[int, int]) -> int:
+        """用字形条绘制非负整数，返回绘制宽度"""
+        key = (font, color)
+        strip = self.strips.get(key)
+        if strip is None:
+            self.misses += 1
+            strip = self.strips[key] = DigitStrip(font, color)
+        else:
+            self.hits += 1
+        return strip.draw(target, value, position)
+
+    def clear(self):
+        """清空缓存（更换字体后调用）"""
+        self.entries.clear()
+        self.strips.clear()
+
+    def get_memory_usage(self) -> int:
+        """缓存Surface占用的像素内存（字节）"""
+        total = 0
+        for surface in self.entries.values():
+            total += surface.get_pitch() * surface.get_height()
+        for strip in self.strips.values():
+            total += strip.surface.get_pitch() * strip.surface.get_height()
+        return total
+
+    def get_stats(self) -> Dict:
+        """命中率和内存统计"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'digit_strips': len(self.strips),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'memory_bytes': self.get_memory_usage()
+        }
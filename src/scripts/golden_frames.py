@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+GamePlayer-Raspberry 画面基准回归测试
+对 data/roms 下的每个ROM无界面、不限帧率地回放输入录像，逐帧计算画面CRC32：
+第一次运行时生成录像（固定的按键脚本）和画面基准，以后的运行与基准比较，
+报告每个ROM第一个不一致的帧。修改模拟器核心（提速优化等）后运行一次即可确认画面没有变化
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.nes_emulator import NESEmulator
+from core.input_movie import InputMovie, rom_hash
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# 按键位（与 CONTROLLER_BUTTONS 顺序相同）
+BUTTON_A = 0x01
+BUTTON_START = 0x08
+BUTTON_LEFT = 0x40
+BUTTON_RIGHT = 0x80
+
+
+def scripted_input(frame: int) -> int:
+    """固定的按键脚本：每2秒按一下Start进入游戏，其余时间左右移动并连按A"""
+    if frame % 120 < 4:
+        return BUTTON_START
+    buttons = BUTTON_RIGHT if (frame // 90) % 2 == 0 else BUTTON_LEFT
+    if frame % 8 < 4:
+        buttons |= BUTTON_A
+    return buttons
+
+
+def create_movie(rom_path: Path, movie_path: Path, frames: int) -> InputMovie:
+    """从刚加载ROM时的状态开始，按按键脚本生成录像"""
+    emulator = NESEmulator(headless=True)
+    if not emulator.load_rom(str(rom_path)):
+        raise ValueError(f"ROM加载失败: {rom_path}")
+    movie = InputMovie(rom_hash(emulator.rom_data), emulator.capture_state())
+    for frame in range(frames):
+        movie.record(scripted_input(frame))
+    movie.save(movie_path)
+    return movie
+
+
+def check_rom(rom_path: Path, movie_path: Path, frames: int, interval: int, update: bool) -> dict:
+    """回放一个ROM的录像并与画面基准比较"""
+    if update or not movie_path.exists():
+        create_movie(rom_path, movie_path, frames)
+
+    emulator = NESEmulator(headless=True)
+    emulator.movie_play_path = str(movie_path)
+    emulator.enable_frame_hashes(interval)
+    emulator.update_golden = update
+    if not emulator.run(str(rom_path), uncapped=True) or emulator.golden_result is None:
+        return {'rom': rom_path.name, 'status': 'error', 'error': '回放失败'}
+    results = emulator.get_benchmark_results()
+    return {
+        'rom': rom_path.name,
+        'mode': results['mode'],
+        'frames': results['frames'],
+        'fps': results['fps'],
+        'status': emulator.golden_result['status'],
+        'first_divergence': emulator.golden_result['first_divergence']
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="画面基准回归测试")
+    parser.add_argument("--roms", default=str(PROJECT_ROOT / "data" / "roms"), help="ROM目录")
+    parser.add_argument("--golden-dir", default=str(PROJECT_ROOT / "data" / "golden"),
+                        help="录像和画面基准目录")
+    parser.add_argument("--frames", type=int, default=600, help="新生成录像的帧数")
+    parser.add_argument("--interval", type=int, default=1, help="每隔多少帧计算一次CRC32")
+    parser.add_argument("--update", action="store_true", help="重新生成录像和画面基准")
+    parser.add_argument("--report", help="把结果写成JSON")
+    args = parser.parse_args()
+
+    roms_dir = Path(args.roms)
+    golden_dir = Path(args.golden_dir)
+    roms = sorted(roms_dir.rglob("*.nes"))
+    if not roms:
+        print(f"❌ 没有找到ROM: {args.roms}")
+        return 1
+
+    rows = []
+    for rom_path in roms:
+        # 子目录中可能有同名ROM，录像按相对路径存放
+        movie_path = golden_dir / rom_path.relative_to(roms_dir).with_suffix('.nesmov')
+        try:
+            row = check_rom(rom_path, movie_path, args.frames, args.interval, args.update)
+        except (OSError, ValueError) as e:
+            row = {'rom': rom_path.name, 'status': 'error', 'error': str(e)}
+        row['rom'] = str(rom_path.relative_to(roms_dir))
+        rows.append(row)
+
+    print("\n" + "=" * 60)
+    for row in rows:
+        if row['status'] == 'diverged':
+            print(f"❌ {row['rom']}: 第 {row['first_divergence']} 帧开始不一致")
+        elif row['status'] == 'error':
+            print(f"⚠️ {row['rom']}: {row.get('error', '运行失败')}")
+        else:
+            status = '一致' if row['status'] == 'match' else '已写入基准'
+            print(f"✅ {row['rom']}: {status}（{row['frames']} 帧, {row['fps']} fps）")
+
+    failed = [row for row in rows if row['status'] in ('diverged', 'error')]
+    print(f"📊 {len(rows)} 个ROM, {len(failed)} 个失败, 基准目录: {golden_dir}")
+    if args.report:
+        report = Path(args.report)
+        report.parent.mkdir(parents=True, exist_ok=True)
+        report.write_text(json.dumps(rows, indent=2, ensure_ascii=False), encoding='utf-8')
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+结构数组实体存储的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+
+from core.entity_store import EntityStore, collide
+
+
+def brute_force_collide(a: EntityStore, b: EntityStore):
+    """逐对检查的参考实现：每个a按顺序击中第一个未被击中的b"""
+    taken = set()
+    pairs = []
+    for i in a.indices():
+        for j in b.indices():
+            if j in taken:
+                continue
+            if (a.x[i] < b.x[j] + b.width and b.x[j] < a.x[i] + a.width and
+                    a.y[i] < b.y[j] + b.height and b.y[j] < a.y[i] + a.height):
+                taken.add(j)
+                pairs.append((int(i), int(j)))
+                break
+    return pairs
+
+
+class TestEntityStore(unittest.TestCase):
+    """实体存储测试"""
+
+    def test_spawn_and_capacity(self):
+        """测试复用空闲槽位，池满时丢弃"""
+        store = EntityStore(3, 5, 5)
+        self.assertEqual([store.spawn(i, 0, 1, 0) for i in range(3)], [0, 1, 2])
+        self.assertEqual(store.spawn(9, 9, 0, 0), -1)
+        store.active[1] = False
+        self.assertEqual(store.spawn(7, 7, 0, 0), 1)
+        self.assertEqual(store.spawn_many(np.arange(4), 0, 1, 0), 0)
+        self.assertEqual(store.dropped, 5)
+        self.assertEqual(len(store), 3)
+
+    def test_move_bounce_cull(self):
+        """测试移动、边界反弹和出界回收"""
+        store = EntityStore(4, 5, 5)
+        store.spawn(11, 50, -1, 0)
+        store.spawn(100, 219, 0, 1)
+        store.move()
+        store.bounce(10, 236, 10, 220)
+        self.assertEqual(store.dx[:2].tolist(), [1, 0])
+        self.assertEqual(store.dy[:2].tolist(), [0, -1])
+
+        bullets = EntityStore(4, 5, 5)
+        bullets.spawn_many(np.array([0, 250, 254]), 0, 5, 0)
+        bullets.move()
+        bullets.cull(0, 256)
+        self.assertEqual(bullets.rects(), [(5, 0), (255, 0)])
+
+    def test_collide_matches_brute_force(self):
+        """测试向量化碰撞与逐对检查结果一致"""
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            enemies = EntityStore(40, 15, 15)
+            bullets = EntityStore(40, 5, 5)
+            enemies.spawn_many(rng.integers(0, 80, 30), rng.integers(0, 80, 30), 1, 1)
+            bullets.spawn_many(rng.integers(0, 80, 25), rng.integers(0, 80, 25), 5, 0)
+            enemies.active[rng.integers(0, 40, 8)] = False
+            hit_bullets, hit_enemies = collide(bullets, enemies)
+            self.assertEqual(sorted(zip(hit_bullets.tolist(), hit_enemies.tolist())),
+                             sorted(brute_force_collide(bullets, enemies)))
+
+    def test_collide_skips_taken_target(self):
+        """测试第一个重叠的敌人已被击中时，后面的子弹改为击中另一个重叠的敌人"""
+        enemies = EntityStore(4, 15, 15)
+        enemies.spawn(20, 20, 0, 0)
+        enemies.spawn(26, 20, 0, 0)
+        bullets = EntityStore(4, 5, 5)
+        bullets.spawn(22, 22, 0, 0)   # 只与敌人0重叠
+        bullets.spawn(28, 22, 0, 0)   # 与敌人0和1都重叠
+        hit_bullets, hit_enemies = collide(bullets, enemies)
+        self.assertEqual(list(zip(hit_bullets.tolist(), hit_enemies.tolist())), [(0, 0), (1, 1)])
+
+    def test_move_skips_free_slots(self):
+        """测试空闲槽位不随移动改变"""
+        store = EntityStore(3, 5, 5)
+        store.spawn(10, 10, 2, 3)
+        store.spawn(20, 20, 1, 1)
+        store.active[1] = False
+        store.move()
+        self.assertEqual(store.x[:2].tolist(), [12, 20])
+        self.assertEqual(store.y[:2].tolist(), [13, 20])
+
+    def test_save_list_roundtrip(self):
+        """测试与存档的字典列表格式互相转换"""
+        store = EntityStore(8, 15, 15)
+        store.spawn(200, 50, -1, 0, 2)
+        store.spawn(30, 40, 1, -1, 1)
+        entities = store.to_list()
+        self.assertEqual(entities[0], {'x': 200, 'y': 50, 'dx': -1, 'dy': 0, 'type': 2})
+        restored = EntityStore(8, 15, 15)
+        restored.load_list(entities)
+        self.assertEqual(restored.to_list(), entities)
+
+
+if __name__ == '__main__':
+    unittest.main()
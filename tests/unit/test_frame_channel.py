@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+共享内存帧通道的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+
+from core.frame_channel import FrameChannel, WRITING, STATUS_RUNNING
+
+
+class TestFrameChannel(unittest.TestCase):
+    """帧通道测试"""
+
+    def setUp(self):
+        self.writer = FrameChannel()
+        self.reader = FrameChannel(self.writer.name)
+        self.frame = np.zeros((240, 256), dtype=np.uint8)
+        self.out = np.empty_like(self.frame)
+
+    def tearDown(self):
+        self.reader.close()
+        self.writer.close()
+
+    def test_reads_latest_frame(self):
+        """测试读取最新一帧，没有新帧时返回0并统计跳过的帧"""
+        self.assertEqual(self.reader.read_latest(self.out), 0)
+        for value in (1, 2, 3):
+            self.frame[:] = value
+            self.writer.publish(self.frame)
+        self.assertEqual(self.reader.read_latest(self.out), 3)
+        self.assertTrue((self.out == 3).all())
+        self.assertEqual(self.reader.read_latest(self.out), 0)
+
+        self.frame[:] = 4
+        self.writer.publish(self.frame)
+        self.writer.publish(self.frame)
+        self.assertEqual(self.reader.read_latest(self.out), 5)
+        self.assertEqual(self.reader.get_stats(), {'published': 5, 'received': 2, 'skipped': 1, 'retries': 0})
+
+    def test_rejects_frame_being_overwritten(self):
+        """测试写入端已开始覆盖同一个缓冲时不返回这一帧"""
+        self.writer.publish(self.frame)
+        self.writer.header[WRITING] = 3
+        self.assertEqual(self.reader.read_latest(self.out, attempts=2), 0)
+        self.assertEqual(self.reader.retries, 2)
+
+    def test_control_flags(self):
+        """测试手柄输入、暂停、停止和状态在两端共享"""
+        self.writer.buttons = 0x81
+        self.writer.paused = True
+        self.writer.request_stop()
+        self.reader.status = STATUS_RUNNING
+        self.assertEqual(self.reader.buttons, 0x81)
+        self.assertTrue(self.reader.paused)
+        self.assertTrue(self.reader.stop_requested)
+        self.assertEqual(self.writer.status, STATUS_RUNNING)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+逐帧画面校验的单元测试
+"""
+
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+
+from core.frame_hashes import FrameHashes, golden_path
+
+
+class TestFrameHashes(unittest.TestCase):
+    """画面校验测试"""
+
+    def test_interval_and_crc(self):
+        """测试按间隔计算帧缓冲的CRC32"""
+        hashes = FrameHashes(interval=3)
+        framebuffer = np.zeros((240, 256), dtype=np.uint8)
+        for i in range(7):
+            framebuffer[0, 0] = i
+            hashes.update(framebuffer)
+        self.assertEqual(len(hashes), 3)
+        framebuffer[0, 0] = 6
+        self.assertEqual(hashes.hashes[2], zlib.crc32(framebuffer.tobytes()))
+
+    def test_first_divergence(self):
+        """测试报告第一个不一致的帧号"""
+        golden = FrameHashes(interval=2)
+        current = FrameHashes(interval=2)
+        for i in range(10):
+            golden.update(bytes([i]))
+            current.update(bytes([i if i < 6 else 0]))
+        self.assertEqual(current.first_divergence(golden), 6)
+        self.assertIsNone(golden.first_divergence(golden))
+        # 长度不同：较短一方结束后的第一帧
+        shorter = FrameHashes(interval=2)
+        for i in range(4):
+            shorter.update(bytes([i]))
+        self.assertEqual(shorter.first_divergence(golden), 4)
+        with self.assertRaises(ValueError):
+            FrameHashes(interval=1).first_divergence(golden)
+
+    def test_save_load_roundtrip(self):
+        """测试基准文件放在录像旁边并能读回"""
+        hashes = FrameHashes(interval=1, rom_sha1=b'\x01' * 20)
+        for i in range(5):
+            hashes.update(bytes([i]))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = golden_path(Path(temp_dir) / "run.nesmov")
+            self.assertEqual(path.suffix, '.crc')
+            hashes.save(path)
+            loaded = FrameHashes.load(path)
+            self.assertEqual(list(loaded.hashes), list(hashes.hashes))
+            self.assertEqual(loaded.rom_sha1, hashes.rom_sha1)
+            path.write_bytes(path.read_bytes()[:-1])
+            with self.assertRaises(ValueError):
+                FrameHashes.load(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+帧节拍器的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.frame_pacer import FramePacer, NTSC_FRAME_RATE
+
+
+class FakeClock:
+    """可控的时钟：sleep和每帧工作量都直接推进时间"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        # 自旋等待时每次读取推进10微秒
+        self.now += 0.00001
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+
+def make_pacer(**kwargs):
+    clock = FakeClock()
+    return clock, FramePacer(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+class TestFramePacer(unittest.TestCase):
+    """帧节拍器测试"""
+
+    def test_no_drift(self):
+        """测试绝对时间表不累积误差"""
+        clock, pacer = make_pacer()
+        pacer.reset()
+        start = clock.now
+        for _ in range(600):
+            pacer.begin_frame()
+            clock.now += 0.005
+            pacer.wait()
+        self.assertAlmostEqual(clock.now - start, 600 / NTSC_FRAME_RATE, delta=0.001)
+        self.assertEqual(pacer.frameskip, 0)
+
+    def test_frameskip_rises_and_recovers(self):
+        """测试连续超时提高跳帧等级，之后按时运行逐级恢复"""
+        clock, pacer = make_pacer(max_frameskip=3)
+        pacer.reset()
+        for _ in range(20):
+            if pacer.begin_frame():
+                clock.now += 0.025
+            else:
+                clock.now += 0.010
+            pacer.wait()
+        self.assertGreaterEqual(pacer.frameskip, 1)
+        self.assertLess(pacer.rendered_frames, pacer.frames)
+
+        for _ in range(pacer.recover_frames * 4):
+            pacer.begin_frame()
+            clock.now += 0.002
+            pacer.wait()
+        self.assertEqual(pacer.frameskip, 0)
+
+    def test_skip_pattern(self):
+        """测试跳帧等级2时每3帧渲染1帧"""
+        clock, pacer = make_pacer()
+        pacer.frameskip = 2
+        rendered = [pacer.begin_frame() for _ in range(9)]
+        self.assertEqual(rendered.count(True), 3)
+
+    def test_resync_after_stall(self):
+        """测试长时间卡顿后重新对齐而不是连续追赶"""
+        clock, pacer = make_pacer(max_frameskip=0)
+        pacer.reset()
+        pacer.begin_frame()
+        clock.now += 1.0
+        pacer.wait()
+        self.assertEqual(pacer.resyncs, 1)
+        pacer.begin_frame()
+        before = clock.now
+        pacer.wait()
+        self.assertGreater(clock.now - before, pacer.frame_duration * 0.9)
+
+    def test_fast_forward(self):
+        """测试快进时不等待、每k帧渲染一帧并统计速度倍数，松开后不追赶"""
+        clock, pacer = make_pacer(fast_forward_render=4)
+        pacer.reset()
+        pacer.turbo = True
+        start = clock.now
+        rendered = []
+        for _ in range(400):
+            rendered.append(pacer.begin_frame())
+            clock.now += 0.002
+            pacer.wait()
+        self.assertEqual(rendered.count(True), 100)
+        self.assertLess(clock.now - start, 400 * 0.0021)
+        self.assertGreater(pacer.speed, 7)
+        self.assertEqual(pacer.frameskip, 0)
+
+        pacer.turbo = False
+        pacer.begin_frame()
+        before = clock.now
+        pacer.wait()
+        self.assertAlmostEqual(clock.now - before, pacer.frame_duration, delta=0.001)
+        self.assertEqual(pacer.get_stats()['fast_forward_frames'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+脏矩形画面输出的单元测试
+"""
+
+import os
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+import pygame
+
+from core.frame_presenter import (DirtyRectPresenter, create_renderer_presenter,
+                                  integer_scale, letterbox_rect, merge_dirty_tiles)
+
+
+class TestMergeDirtyTiles(unittest.TestCase):
+    """脏块合并测试"""
+
+    def test_merges_runs_and_rows(self):
+        """测试同一行的连续块和上下相同范围的段合并成一个矩形"""
+        mask = np.zeros((15, 16), dtype=bool)
+        mask[3:6, 2:5] = True
+        mask[0, 10] = True
+        self.assertEqual(sorted(merge_dirty_tiles(mask)), [(2, 3, 3, 3), (10, 0, 1, 1)])
+
+    def test_empty_mask(self):
+        """测试没有脏块时不产生矩形"""
+        self.assertEqual(merge_dirty_tiles(np.zeros((15, 16), dtype=bool)), [])
+
+
+class TestLetterbox(unittest.TestCase):
+    """整数倍缩放和黑边测试"""
+
+    def test_integer_scale(self):
+        """测试按显示分辨率取最大整数倍"""
+        self.assertEqual(integer_scale((1920, 1080), (256, 240)), 4)
+        self.assertEqual(integer_scale((768, 720), (256, 240)), 3)
+        self.assertEqual(integer_scale((200, 200), (256, 240)), 1)
+
+    def test_letterbox_rect(self):
+        """测试目标矩形居中"""
+        self.assertEqual(letterbox_rect((1920, 1080), (256, 240)), pygame.Rect(448, 60, 1024, 960))
+        self.assertEqual(letterbox_rect((768, 720), (256, 240)), pygame.Rect(0, 0, 768, 720))
+
+
+class TestDirtyRectPresenter(unittest.TestCase):
+    """脏矩形输出测试"""
+
+    def setUp(self):
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((768, 720))
+        self.source = pygame.Surface((256, 240))
+        self.presenter = DirtyRectPresenter(self.screen, self.source)
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_static_frame_is_idle(self):
+        """测试首帧整帧输出，画面不变时不提交任何矩形"""
+        self.assertEqual(self.presenter.present(), [pygame.Rect(0, 0, 768, 720)])
+        for _ in range(3):
+            self.source.fill((0, 0, 0))
+            self.assertEqual(self.presenter.present(), [])
+        self.assertEqual(self.presenter.get_stats()['idle_frames'], 3)
+
+    def test_partial_update(self):
+        """测试只缩放并提交变化的块"""
+        self.presenter.present()
+        self.source.fill((255, 0, 0), (20, 40, 8, 8))
+        rects = self.presenter.present()
+        self.assertEqual(rects, [pygame.Rect(48, 96, 48, 48)])
+        self.assertEqual(self.screen.get_at((62, 122))[:3], (255, 0, 0))
+        self.assertEqual(self.screen.get_at((0, 0))[:3], (0, 0, 0))
+
+    def test_invalidate_forces_full_update(self):
+        """测试invalidate后下一帧整帧输出"""
+        self.presenter.present()
+        self.presenter.invalidate()
+        self.assertEqual(self.presenter.present(), [pygame.Rect(0, 0, 768, 720)])
+
+    def test_overlay_redraws_previous_rects(self):
+        """测试调试框区域在下一帧被重画以擦除旧框"""
+        self.presenter.show_dirty = True
+        self.presenter.present()
+        self.source.fill((0, 255, 0), (100, 100, 4, 4))
+        rects = self.presenter.present()
+        self.assertEqual(self.screen.get_at(rects[0].topleft)[:3], (255, 0, 255))
+        self.presenter.show_dirty = False
+        self.assertEqual(self.presenter.present(), rects)
+        self.assertEqual(self.screen.get_at(rects[0].topleft)[:3], (0, 0, 0))
+        self.assertEqual(self.presenter.present(), [])
+
+    def test_letterboxed_screen(self):
+        """测试显示表面较大时居中输出并提交整个窗口"""
+        screen = pygame.display.set_mode((1920, 1080))
+        presenter = DirtyRectPresenter(screen, self.source)
+        self.assertEqual(presenter.scale, 4)
+        self.assertEqual(presenter.present(), [pygame.Rect(0, 0, 1920, 1080)])
+        self.source.fill((255, 0, 0), (0, 0, 4, 4))
+        self.assertEqual(presenter.present(), [pygame.Rect(448, 60, 64, 64)])
+        self.assertEqual(screen.get_at((448, 60))[:3], (255, 0, 0))
+        self.assertEqual(screen.get_at((447, 60))[:3], (0, 0, 0))
+
+
+class TestRendererPresenter(unittest.TestCase):
+    """SDL2渲染器输出测试（虚拟驱动只有软件渲染器）"""
+
+    def setUp(self):
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pygame.display.init()
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_present(self):
+        """测试纹理上传和整数倍居中"""
+        source = pygame.Surface((256, 240), 0, 32)
+        presenter = create_renderer_presenter(source, "test", (800, 720), accelerated=-1)
+        if presenter is None:
+            self.skipTest("没有可用的SDL2渲染器")
+        self.assertEqual(presenter.dest, pygame.Rect(16, 0, 768, 720))
+        for _ in range(3):
+            presenter.present()
+        self.assertEqual(presenter.get_stats()['frames'], 3)
+        presenter.window.destroy()
+
+
+if __name__ == '__main__':
+    unittest.main()
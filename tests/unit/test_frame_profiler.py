@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+分阶段帧耗时统计的单元测试
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import pygame
+
+from core.frame_profiler import FrameProfiler, PHASES, PHASE_COLORS, GRAPH_HEIGHT
+
+
+class TestFrameProfiler(unittest.TestCase):
+    """帧耗时统计测试"""
+
+    def test_histogram_buckets(self):
+        """测试耗时按2的幂微秒分桶"""
+        profiler = FrameProfiler()
+        profiler.record(0, 500)           # <1us
+        profiler.record(0, 1_500)         # [1, 2)us
+        profiler.record(0, 3_000_000)     # [2048, 4096)us
+        histogram = profiler.histograms[0]
+        self.assertEqual(histogram[0], 1)
+        self.assertEqual(histogram[1], 1)
+        self.assertEqual(histogram[12], 1)
+        self.assertEqual(profiler.maxima[0], 3_000_000)
+
+    def test_stats_per_frame(self):
+        """测试按帧平均和只输出出现过的阶段"""
+        profiler = FrameProfiler(graph_frames=4)
+        for _ in range(6):
+            profiler.record(PHASES.index('render_game'), 2_000_000)
+            profiler.end_frame()
+        stats = profiler.get_stats()
+        self.assertEqual(stats['frames'], 6)
+        self.assertEqual(list(stats['phases']), ['render_game'])
+        self.assertEqual(stats['phases']['render_game']['per_frame_ms'], 2.0)
+        self.assertEqual(profiler.recent_index, 2)
+        self.assertEqual(profiler.current, [0] * len(PHASES))
+
+    def test_mark_splits_nested_phase(self):
+        """测试mark按阶段结束时间计时，单独计时的部分从下一个阶段中扣除"""
+        profiler = FrameProfiler()
+        profiler.start_frame()
+        profiler.last_mark -= 5_000
+        profiler.mark(0)
+        self.assertGreaterEqual(profiler.current[0], 5_000)
+        profiler.last_mark -= 3_000
+        profiler.mark(6, 1_000)
+        profiler.mark(4)
+        self.assertEqual(profiler.current[6], 1_000)
+        self.assertGreaterEqual(profiler.current[4], 2_000)
+        self.assertLess(profiler.current[4], 3_000_000)
+
+    def test_write_session(self):
+        """测试会话JSON包含元数据和直方图"""
+        profiler = FrameProfiler()
+        profiler.record(0, 10_000)
+        profiler.end_frame()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = profiler.write_session(Path(temp_dir) / "sub" / "profile.json", {'rom': 'test'})
+            report = json.loads(path.read_text(encoding='utf-8'))
+        self.assertEqual(report['rom'], 'test')
+        self.assertEqual(report['frames'], 1)
+        self.assertEqual(len(report['bucket_edges_us']), len(report['phases']['handle_events']['histogram']))
+
+    def test_graph_stacks_phases(self):
+        """测试耗时曲线按阶段从下往上堆叠"""
+        profiler = FrameProfiler(graph_frames=8)
+        profiler.record(0, 4_166_667)     # 1/4帧预算
+        profiler.record(4, 4_166_667)
+        profiler.end_frame()
+        surface = pygame.Surface((64, 64))
+        profiler.draw_graph(surface, (0, 0))
+        column = 7                        # 最新一帧在最右边
+        self.assertEqual(surface.get_at((column, GRAPH_HEIGHT - 1))[:3], PHASE_COLORS[0])
+        self.assertEqual(surface.get_at((column, GRAPH_HEIGHT - 15))[:3], PHASE_COLORS[4])
+        self.assertEqual(surface.get_at((column, 0))[:3], (24, 24, 24))
+
+
+if __name__ == '__main__':
+    unittest.main()
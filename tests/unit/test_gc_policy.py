@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+垃圾回收策略的单元测试
+"""
+
+import gc
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.gc_policy import GCPolicy, GEN2_DISABLED_THRESHOLD
+
+
+class TestGCPolicy(unittest.TestCase):
+    """回收策略测试"""
+
+    def setUp(self):
+        self.threshold = gc.get_threshold()
+        self.policy = GCPolicy()
+
+    def tearDown(self):
+        self.policy.end_session()
+        gc.set_threshold(*self.threshold)
+        gc.unfreeze()
+
+    def test_session_freezes_and_restores(self):
+        """测试进入游戏时冻结对象并关闭自动第2代回收，退出时恢复"""
+        self.policy.start_session()
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertEqual(gc.get_threshold()[2], GEN2_DISABLED_THRESHOLD)
+        self.policy.end_session()
+        self.assertEqual(gc.get_threshold(), self.threshold)
+        self.assertEqual(gc.get_freeze_count(), 0)
+
+    def test_counts_automatic_collections(self):
+        """测试统计游戏中的回收，暂停时的手动回收单独计数"""
+        self.policy.start_session()
+        gc.collect(0)
+        self.policy.frame()
+        self.policy.collect()
+        self.policy.frame()
+        stats = self.policy.get_stats()
+        self.assertEqual(stats['collections'], {'gen0': 1, 'gen1': 0, 'gen2': 0})
+        self.assertEqual(stats['manual_collections'], 1)
+        self.assertEqual(stats['frames'], 2)
+        self.assertEqual(stats['collections_per_frame'], 0.5)
+
+    def test_safety_collection(self):
+        """测试长时间不暂停时，第1代回收次数或内存块增长超过上限后整体回收"""
+        self.policy.start_session()
+        self.policy.safety_gen1_collections = 2
+        gc.collect(1)
+        self.policy.frame()
+        self.assertEqual(self.policy.safety_collections, 0)
+        gc.collect(1)
+        self.policy.frame()
+        self.assertEqual(self.policy.safety_collections, 1)
+        self.assertEqual(gc.get_count()[2], 0)
+        self.assertEqual(self.policy.get_stats()['collections']['gen2'], 1)
+
+        self.policy.safety_gen1_collections = 1 << 30
+        self.policy.safety_heap_growth = 1000
+        garbage = [[i] for i in range(2000)]
+        self.policy.frame()
+        self.assertEqual(self.policy.safety_collections, 2)
+        del garbage
+
+    def test_disabled_keeps_defaults(self):
+        """测试关闭策略时只统计，不改变回收设置"""
+        policy = GCPolicy(enabled=False)
+        policy.start_session()
+        self.assertEqual(gc.get_threshold(), self.threshold)
+        policy.collect()
+        policy.end_session()
+        self.assertEqual(policy.get_stats()['manual_collections'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
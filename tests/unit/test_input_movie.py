@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+输入录像的单元测试
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.input_movie import InputMovie, MOVIE_HEADER, rom_hash
+
+
+class TestInputMovie(unittest.TestCase):
+    """输入录像测试"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "sub" / "test.nesmov"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_save_load_roundtrip(self):
+        """测试每个端口每帧1字节，保存后读回内容一致"""
+        movie = InputMovie(rom_hash(b'rom'), b'state')
+        for i in range(10):
+            movie.record(i, 0x80 | i)
+        path = movie.save(self.path)
+        self.assertEqual(path.stat().st_size, MOVIE_HEADER.size + 5 + 20)
+
+        loaded = InputMovie.load(path)
+        self.assertEqual(len(loaded), 10)
+        self.assertEqual(loaded.start_state, b'state')
+        self.assertEqual(bytes(loaded.frame(3)), bytes([3, 0x83]))
+        loaded.check_rom(b'rom')
+        with self.assertRaises(ValueError):
+            loaded.check_rom(b'other')
+
+    def test_rejects_bad_file(self):
+        """测试标识或长度不对的文件抛出ValueError"""
+        movie = InputMovie(rom_hash(b'rom'), b'state')
+        movie.record(1)
+        data = movie.save(self.path).read_bytes()
+        self.path.write_bytes(data[:-1])
+        with self.assertRaises(ValueError):
+            InputMovie.load(self.path)
+        self.path.write_bytes(b'XXXX' + data[4:])
+        with self.assertRaises(ValueError):
+            InputMovie.load(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
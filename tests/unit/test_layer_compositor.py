@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+静态图层合成器的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import pygame
+
+from core.layer_compositor import LayerCompositor
+
+
+class TestLayerCompositor(unittest.TestCase):
+    """图层合成测试"""
+
+    def setUp(self):
+        self.calls = 0
+        self.color = (255, 0, 0)
+        self.compositor = LayerCompositor()
+        self.compositor.add_layer('box', self.build_box, (4, 2))
+
+    def build_box(self):
+        self.calls += 1
+        surface = pygame.Surface((8, 8))
+        surface.fill(self.color)
+        return surface
+
+    def test_builds_once(self):
+        """测试图层只绘制一次，之后每帧直接贴缓存"""
+        target = pygame.Surface((32, 32))
+        for _ in range(10):
+            self.compositor.compose(target, ('box',))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(target.get_at((4, 2))[:3], (255, 0, 0))
+        self.assertEqual(target.get_at((3, 2))[:3], (0, 0, 0))
+        self.assertEqual(self.compositor.get_stats()['blits'], 10)
+
+    def test_invalidate_rebuilds(self):
+        """测试失效后下次使用时重建"""
+        target = pygame.Surface((32, 32))
+        self.compositor.compose(target, ('box',))
+        self.color = (0, 0, 255)
+        self.compositor.invalidate('box')
+        self.compositor.compose(target, ('box',))
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(target.get_at((11, 9))[:3], (0, 0, 255))
+
+    def test_compose_order(self):
+        """测试按给定顺序叠加图层"""
+        self.compositor.add_layer('top', lambda: pygame.Surface((2, 2)), (4, 2))
+        target = pygame.Surface((32, 32))
+        self.compositor.compose(target, ('box', 'top'))
+        self.assertEqual(target.get_at((4, 2))[:3], (0, 0, 0))
+        self.assertEqual(target.get_at((6, 4))[:3], (255, 0, 0))
+        self.compositor.compose(target, [])
+        self.assertEqual(self.compositor.get_stats()['blits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+NES APU的单元测试
+"""
+
+import os
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+
+from core.nes_bus import MemoryBus
+from core.nes_apu import APU, AudioStream, NOISE_SEQUENCES, pygame
+
+
+class FakeCPU:
+    cycles = 0
+
+
+def make_apu():
+    bus = MemoryBus(bytes(0x8000))
+    bus.cpu = FakeCPU()
+    apu = APU(bus, 44100)
+    bus.attach_apu(apu)
+    return bus, apu
+
+
+class TestAPU(unittest.TestCase):
+    """APU测试"""
+
+    def test_frame_sample_count(self):
+        """测试每帧样本数与采样率一致"""
+        bus, apu = make_apu()
+        counts = [len(apu.end_frame(29781 * (frame + 1))) for frame in range(60)]
+        self.assertAlmostEqual(sum(counts), 44100 * 60 * 29781 / 1789773, delta=2)
+
+    def test_pulse_frequency(self):
+        """测试方波频率"""
+        bus, apu = make_apu()
+        bus.write(0x4015, 0x01)
+        bus.write(0x4000, 0xBF)
+        bus.write(0x4002, 0xFD)
+        bus.write(0x4003, 0x00)
+        samples = apu.end_frame(29781).astype(np.int32)
+        # timer=253 -> 1789773 / (16 * 254) ≈ 440Hz
+        high = samples > samples.mean()
+        rising = np.count_nonzero(high[1:] & ~high[:-1])
+        self.assertAlmostEqual(rising, 440 * 29781 / 1789773, delta=1.5)
+
+    def test_length_counter_and_status(self):
+        """测试长度计数器和$4015状态"""
+        bus, apu = make_apu()
+        bus.write(0x4015, 0x0F)
+        bus.write(0x4017, 0x40)
+        bus.write(0x4003, 0x18)  # 长度表索引3 -> 2
+        bus.write(0x400F, 0x18)
+        self.assertEqual(bus.read(0x4015) & 0x09, 0x09)
+        bus.cpu.cycles = 29830
+        self.assertEqual(bus.read(0x4015) & 0x0F, 0)
+
+    def test_frame_irq(self):
+        """测试4步模式的帧IRQ"""
+        bus, apu = make_apu()
+        irq = []
+        apu.irq_callback = irq.append
+        bus.write(0x4017, 0x00)
+        apu.run_until(29830)
+        self.assertEqual(irq, [True])
+        self.assertEqual(bus.read(0x4015) & 0x40, 0x40)
+        self.assertEqual(irq, [True, False])
+
+    def test_dmc_output(self):
+        """测试DMC增量输出读取样本数据"""
+        bus, apu = make_apu()
+        bus.write(0x4010, 0x0F)
+        bus.write(0x4011, 0x40)
+        bus.write(0x4012, 0x00)
+        bus.write(0x4013, 0x01)
+        bus.write(0x4015, 0x10)
+        apu.end_frame(29781)
+        # 样本全为0：电平持续下降
+        self.assertLess(apu.dmc.level, 0x40)
+        self.assertEqual(bus.read(0x4015) & 0x10, 0)
+
+    def test_noise_sequences(self):
+        """测试LFSR周期长度"""
+        self.assertEqual(len(NOISE_SEQUENCES[0]), 32767)
+        self.assertEqual(len(NOISE_SEQUENCES[1]), 93)
+
+
+class TestAudioStream(unittest.TestCase):
+    """音频流测试"""
+
+    def setUp(self):
+        if pygame is None:
+            self.skipTest("pygame未安装")
+        os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+        try:
+            pygame.mixer.init()
+        except pygame.error as e:
+            self.skipTest(f"音频不可用: {e}")
+
+    def tearDown(self):
+        pygame.mixer.quit()
+
+    def test_reuses_buffers(self):
+        """测试始终复用同一组Sound缓冲"""
+        stream = AudioStream(chunk_size=256)
+        sounds = list(stream.sounds)
+        for _ in range(20):
+            stream.push(np.full(300, 1000, dtype=np.int16))
+            stream.pump()
+        self.assertEqual(len(stream.sounds), 3)
+        self.assertTrue(all(a is b for a, b in zip(sounds, stream.sounds)))
+        self.assertLessEqual(stream.fifo_length, len(stream.fifo))
+
+    def test_fifo_drops_oldest(self):
+        """测试积压超过上限时丢弃最旧样本"""
+        stream = AudioStream(chunk_size=128, max_chunks=2)
+        stream.push(np.arange(200, dtype=np.int16))
+        stream.push(np.arange(200, 300, dtype=np.int16))
+        self.assertEqual(stream.fifo_length, 256)
+        self.assertEqual(stream.dropped_samples, 44)
+        self.assertEqual(int(stream.fifo[0]), 44)
+
+
+if __name__ == '__main__':
+    unittest.main()
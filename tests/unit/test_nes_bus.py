@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+NES内存总线的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.nes_bus import MemoryBus
+
+
+class FakePPU:
+    """记录寄存器访问的PPU替身"""
+
+    def __init__(self):
+        self.writes = []
+
+    def read_register(self, register: int) -> int:
+        return 0x80 | register
+
+    def write_register(self, register: int, value: int):
+        self.writes.append((register, value))
+
+
+class TestMemoryBus(unittest.TestCase):
+    """内存总线测试"""
+
+    def test_ram_mirroring(self):
+        """测试内部RAM的镜像"""
+        bus = MemoryBus()
+        bus.write(0x0012, 0x34)
+        self.assertEqual(bus.read(0x0812), 0x34)
+        self.assertEqual(bus.read(0x1812), 0x34)
+        bus.write(0x1FFF, 0x56)
+        self.assertEqual(bus.ram[0x7FF], 0x56)
+
+    def test_prg_mapping(self):
+        """测试16KB PRG镜像到$C000，32KB直接映射"""
+        prg = bytearray(0x4000)
+        prg[0] = 0x11
+        prg[0x3FFF] = 0x22
+        bus = MemoryBus(bytes(prg))
+        self.assertEqual(bus.read(0x8000), 0x11)
+        self.assertEqual(bus.read(0xC000), 0x11)
+        self.assertEqual(bus.read(0xFFFF), 0x22)
+        self.assertEqual(bus.prg_tags, [0, 1, 0, 1])
+
+        prg = bytearray(0x8000)
+        prg[0x4000] = 0x33
+        bus = MemoryBus(bytes(prg))
+        self.assertEqual(bus.read(0xC000), 0x33)
+        self.assertEqual(bus.prg_tags, [0, 1, 2, 3])
+
+    def test_rom_is_read_only(self):
+        """测试写入ROM区不会修改PRG"""
+        bus = MemoryBus(bytes(0x4000))
+        bus.write(0x8000, 0xFF)
+        self.assertEqual(bus.read(0x8000), 0)
+
+    def test_prg_ram(self):
+        """测试$6000-$7FFF的PRG RAM"""
+        bus = MemoryBus()
+        bus.write(0x6000, 0xAB)
+        bus.write(0x7FFF, 0xCD)
+        self.assertEqual(bus.read(0x6000), 0xAB)
+        self.assertEqual(bus.prg_ram[0x1FFF], 0xCD)
+
+    def test_open_bus(self):
+        """测试未映射区域返回地址高字节"""
+        bus = MemoryBus()
+        self.assertEqual(bus.read(0x5123), 0x51)
+        self.assertEqual(bus.read(0x2002), 0x20)
+
+    def test_ppu_registers(self):
+        """测试PPU寄存器按8字节镜像"""
+        bus = MemoryBus()
+        ppu = FakePPU()
+        bus.attach_ppu(ppu)
+        self.assertEqual(bus.read(0x2002), 0x82)
+        self.assertEqual(bus.read(0x3FFA), 0x82)
+        bus.write(0x2008, 0x10)
+        self.assertEqual(ppu.writes, [(0, 0x10)])
+
+    def test_controller_shift_register(self):
+        """测试手柄的串行读取"""
+        bus = MemoryBus()
+        # A + Start + Right
+        bus.set_controller(0, 0b10001001)
+        bus.write(0x4016, 1)
+        bus.write(0x4016, 0)
+        bits = [bus.read(0x4016) & 1 for _ in range(10)]
+        self.assertEqual(bits, [1, 0, 0, 1, 0, 0, 0, 1, 1, 1])
+        self.assertEqual(bus.read(0x4017) & 1, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+CHR图块缓存的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.nes_chr_cache import (CHRTileCache, PLANE_LUT, FLIP_NONE, FLIP_HORIZONTAL,
+                                FLIP_VERTICAL, FLIP_BOTH)
+
+
+class TestCHRTileCache(unittest.TestCase):
+    """CHR图块缓存测试"""
+
+    def test_plane_lut(self):
+        """测试位平面解码表"""
+        self.assertEqual(list(PLANE_LUT[0x80 | (0x01 << 8)]), [1, 0, 0, 0, 0, 0, 0, 2])
+
+    def test_flip_variants(self):
+        """测试翻转版本"""
+        chr_data = bytearray(0x2000)
+        # 图块1：左上角一个颜色1像素
+        chr_data[16] = 0x80
+        cache = CHRTileCache(chr_data)
+        self.assertEqual(cache.tiles[FLIP_NONE, 1, 0, 0], 1)
+        self.assertEqual(cache.tiles[FLIP_HORIZONTAL, 1, 0, 7], 1)
+        self.assertEqual(cache.tiles[FLIP_VERTICAL, 1, 7, 0], 1)
+        self.assertEqual(cache.tiles[FLIP_BOTH, 1, 7, 7], 1)
+        self.assertEqual(cache.tiles[FLIP_NONE, 1].sum(), 1)
+
+    def test_bank_layout_and_memory(self):
+        """测试按1KB bank组织和内存统计"""
+        chr_data = bytearray(0x4000)
+        chr_data[0x400 * 9] = 0xFF
+        cache = CHRTileCache(bytes(chr_data))
+        self.assertEqual(cache.bank_count, 16)
+        self.assertEqual(list(cache.bank_tiles(9)[0, 0]), [1] * 8)
+        stats = cache.get_stats()
+        self.assertEqual(stats['tiles'], 1024)
+        self.assertEqual(stats['bytes'], 1024 * 4 * 64)
+
+    def test_invalidate(self):
+        """测试只重新解码失效的图块"""
+        chr_data = bytearray(0x2000)
+        cache = CHRTileCache(chr_data)
+        chr_data[0x35] = 0xFF
+        cache.invalidate(0x35)
+        cache.invalidate(0x3A)
+        cache.refresh()
+        self.assertEqual(cache.decoded_tiles, 512 + 1)
+        self.assertEqual(list(cache.tiles[FLIP_NONE, 3, 5]), [1] * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
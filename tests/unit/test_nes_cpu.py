@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+6502 CPU核心的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.nes_bus import MemoryBus
+from core.nes_cpu import (CPU6502, build_benchmark_prg, benchmark_cpu,
+                          CYCLES_PER_FRAME, MAX_BLOCK_LENGTH)
+
+
+def make_cpu(program: bytes) -> CPU6502:
+    """创建从$8000开始执行指定程序的CPU"""
+    prg = bytearray(0x4000)
+    prg[:len(program)] = program
+    # NMI -> $9000, RESET -> $8000, IRQ -> $9000
+    prg[0x3FFA:0x4000] = bytes([0x00, 0x90, 0x00, 0x80, 0x00, 0x90])
+    prg[0x1000] = 0x40  # $9000: RTI
+    cpu = CPU6502(MemoryBus(bytes(prg)))
+    cpu.power_on()
+    return cpu
+
+
+class TestCPU6502(unittest.TestCase):
+    """CPU指令测试"""
+
+    def test_reset_vector(self):
+        """测试上电复位"""
+        cpu = make_cpu(b'')
+        self.assertEqual(cpu.pc, 0x8000)
+        self.assertEqual(cpu.sp, 0xFD)
+        self.assertEqual(cpu.get_status() & 0x04, 0x04)
+
+    def test_adc_flags(self):
+        """测试ADC的进位和溢出标志"""
+        # LDA #$7F; ADC #$01
+        cpu = make_cpu(bytes([0xA9, 0x7F, 0x69, 0x01]))
+        cpu.step()
+        cpu.step()
+        self.assertEqual(cpu.a, 0x80)
+        self.assertEqual(cpu.v, 1)
+        self.assertEqual(cpu.c, 0)
+        self.assertEqual(cpu.get_status() & 0x80, 0x80)
+
+        # SEC; LDA #$FF; ADC #$00 -> 0, C=1, Z=1
+        cpu = make_cpu(bytes([0x38, 0xA9, 0xFF, 0x69, 0x00]))
+        for _ in range(3):
+            cpu.step()
+        self.assertEqual(cpu.a, 0x00)
+        self.assertEqual(cpu.c, 1)
+        self.assertEqual(cpu.get_status() & 0x02, 0x02)
+
+    def test_sbc_and_cmp(self):
+        """测试SBC与CMP"""
+        # SEC; LDA #$10; SBC #$20; CMP #$F0
+        cpu = make_cpu(bytes([0x38, 0xA9, 0x10, 0xE9, 0x20, 0xC9, 0xF0]))
+        for _ in range(4):
+            cpu.step()
+        self.assertEqual(cpu.a, 0xF0)
+        self.assertEqual(cpu.c, 1)
+        self.assertEqual(cpu.get_status() & 0x02, 0x02)
+
+    def test_bit_sets_n_and_z_together(self):
+        """测试BIT指令同时设置N和Z"""
+        # LDA #$C0; STA $10; LDA #$01; BIT $10
+        cpu = make_cpu(bytes([0xA9, 0xC0, 0x85, 0x10, 0xA9, 0x01, 0x24, 0x10]))
+        for _ in range(4):
+            cpu.step()
+        status = cpu.get_status()
+        self.assertEqual(status & 0x82, 0x82)
+        self.assertEqual(status & 0x40, 0x40)
+
+        # 状态寄存器压栈再恢复后保持一致
+        cpu.set_status(status)
+        self.assertEqual(cpu.get_status(), status)
+
+    def test_jsr_rts(self):
+        """测试子程序调用"""
+        # JSR $8010; LDX #$05 ... $8010: LDA #$42; RTS
+        program = bytearray(0x20)
+        program[0:5] = bytes([0x20, 0x10, 0x80, 0xA2, 0x05])
+        program[0x10:0x13] = bytes([0xA9, 0x42, 0x60])
+        cpu = make_cpu(bytes(program))
+        self.assertEqual(cpu.step(), 6)
+        self.assertEqual(cpu.pc, 0x8010)
+        cpu.step()
+        self.assertEqual(cpu.step(), 6)
+        cpu.step()
+        self.assertEqual((cpu.a, cpu.x, cpu.sp), (0x42, 0x05, 0xFD))
+
+    def test_branch_cycles(self):
+        """测试分支周期：不跳转2，跳转3"""
+        # LDX #$00; BNE +2; BEQ +0
+        cpu = make_cpu(bytes([0xA2, 0x00, 0xD0, 0x02, 0xF0, 0x00]))
+        cpu.step()
+        self.assertEqual(cpu.step(), 2)
+        self.assertEqual(cpu.step(), 3)
+        self.assertEqual(cpu.pc, 0x8006)
+
+    def test_page_cross_penalty(self):
+        """测试跨页读取的额外周期"""
+        # LDX #$01; LDA $02FF,X; STA $02FF,X
+        cpu = make_cpu(bytes([0xA2, 0x01, 0xBD, 0xFF, 0x02, 0x9D, 0xFF, 0x02]))
+        cpu.step()
+        self.assertEqual(cpu.step(), 5)
+        self.assertEqual(cpu.step(), 5)
+
+    def test_jmp_indirect_page_bug(self):
+        """测试JMP间接寻址的页边界缺陷"""
+        cpu = make_cpu(bytes([0x6C, 0xFF, 0x02]))
+        cpu.bus.ram[0x2FF] = 0x34
+        cpu.bus.ram[0x200] = 0x12
+        cpu.bus.ram[0x300] = 0x99
+        cpu.step()
+        self.assertEqual(cpu.pc, 0x1234)
+
+    def test_nmi(self):
+        """测试NMI进入与RTI返回"""
+        cpu = make_cpu(bytes([0xEA, 0xEA]))
+        cpu.trigger_nmi()
+        self.assertEqual(cpu.step(), 7)
+        self.assertEqual(cpu.pc, 0x9000)
+        cpu.step()
+        self.assertEqual(cpu.pc, 0x8000)
+
+    def test_run_frame(self):
+        """测试整帧运行的周期计数"""
+        cpu = CPU6502(MemoryBus(build_benchmark_prg()))
+        cpu.power_on()
+        start = cpu.cycles
+        executed = cpu.run(CYCLES_PER_FRAME)
+        self.assertGreaterEqual(executed, CYCLES_PER_FRAME)
+        self.assertLess(executed, CYCLES_PER_FRAME + MAX_BLOCK_LENGTH * 8)
+        self.assertEqual(cpu.cycles - start, executed)
+
+    def test_benchmark(self):
+        """测试基准测试输出"""
+        result = benchmark_cpu(frames=2)
+        self.assertEqual(result['frames'], 2)
+        self.assertGreater(result['cycles_per_second'], 0)
+        self.assertGreater(result['block_cache']['hits'], 0)
+
+
+class TestBlockCache(unittest.TestCase):
+    """指令块缓存测试"""
+
+    def test_matches_interpreter(self):
+        """测试缓存执行与逐条解释执行结果一致"""
+        cached = CPU6502(MemoryBus(build_benchmark_prg()), block_cache=True)
+        plain = CPU6502(MemoryBus(build_benchmark_prg()), block_cache=False)
+        cached.power_on()
+        plain.power_on()
+        cached.run(CYCLES_PER_FRAME * 3)
+        while plain.cycles < cached.cycles:
+            plain.step()
+
+        self.assertEqual(plain.cycles, cached.cycles)
+        self.assertEqual((plain.a, plain.x, plain.pc), (cached.a, cached.x, cached.pc))
+        self.assertEqual(cached.bus.ram, plain.bus.ram)
+        self.assertGreater(cached.get_block_cache_stats()['hit_rate'], 0.9)
+        self.assertEqual(plain.get_block_cache_stats()['hits'], 0)
+
+    def test_ram_code_invalidation(self):
+        """测试写入RAM中已缓存的代码会使指令块失效"""
+        # $8000: JSR $0300; JMP $8000
+        cpu = make_cpu(bytes([0x20, 0x00, 0x03, 0x4C, 0x00, 0x80]))
+        # $0300: LDA #$01; RTS
+        cpu.bus.ram[0x300:0x303] = bytes([0xA9, 0x01, 0x60])
+        cpu.run(40)
+        self.assertEqual(cpu.a, 0x01)
+        self.assertIn(0x0300, cpu.blocks)
+
+        # 通过镜像地址$0B01修改立即数
+        cpu.write(0x0B01, 0x07)
+        self.assertNotIn(0x0300, cpu.blocks)
+        cpu.run(40)
+        self.assertEqual(cpu.a, 0x07)
+        self.assertGreater(cpu.get_block_cache_stats()['invalidations'], 0)
+
+    def test_write_to_running_block(self):
+        """测试改写正在执行的块中后面的指令时，块在写入后结束，执行的是新指令"""
+        # $8000: JSR $0300; STX $10; JMP $8005
+        cpu = make_cpu(bytes([0x20, 0x00, 0x03, 0x86, 0x10, 0x4C, 0x05, 0x80]))
+        # $0300: LDA #$07; STA $0306; LDX #$01; RTS（STA改写LDX的立即数）
+        cpu.bus.ram[0x300:0x308] = bytes([0xA9, 0x07, 0x8D, 0x06, 0x03, 0xA2, 0x01, 0x60])
+        for _ in range(10):
+            cpu.run(20)
+        self.assertEqual(cpu.bus.ram[0x10], 0x07)
+
+    def test_stack_page_code_not_cached(self):
+        """测试栈页中的代码不进入缓存，压栈覆盖后执行的是新指令"""
+        # $8000: JSR $01F0; JMP $8000
+        cpu = make_cpu(bytes([0x20, 0xF0, 0x01, 0x4C, 0x00, 0x80]))
+        # $01F0: LDA #$01; RTS
+        cpu.bus.ram[0x1F0:0x1F3] = bytes([0xA9, 0x01, 0x60])
+        cpu.run(40)
+        self.assertEqual(cpu.a, 0x01)
+        self.assertNotIn(0x01F0, cpu.blocks)
+
+        # 压栈改写立即数
+        cpu.sp = 0xF1
+        cpu._push(0x07)
+        cpu.sp = 0xFD
+        cpu.run(40)
+        self.assertEqual(cpu.a, 0x07)
+
+    def test_block_stops_before_stack_page(self):
+        """测试从零页开始的块在进入栈页之前结束"""
+        cpu = make_cpu(b'')
+        # $00FE: NOP; NOP; NOP（第三个NOP在栈页）
+        cpu.bus.ram[0xFE:0x101] = bytes([0xEA, 0xEA, 0xEA])
+        block = cpu._decode_block(0x00FE, 0x00FE)
+        self.assertEqual(len(block), 2)
+        self.assertEqual(block[-1][3], 0x0100)
+        self.assertNotIn(1, cpu.code_pages)
+
+    def test_key_includes_prg_bank(self):
+        """测试缓存键区分不同的PRG bank"""
+        cpu = make_cpu(bytes([0xEA, 0x4C, 0x00, 0x80]))
+        cpu.run(20)
+        self.assertIn(0x8000, cpu.blocks)
+
+        cpu.prg_tags[0] = 5
+        cpu.pc = 0x8000
+        misses = cpu.block_misses
+        cpu.run(5)
+        self.assertEqual(cpu.block_misses, misses + 1)
+        self.assertIn(0x8000 | (5 << 16), cpu.blocks)
+
+
+if __name__ == '__main__':
+    unittest.main()
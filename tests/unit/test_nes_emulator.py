@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+NESEmulator无界面运行的单元测试
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import pygame
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.nes_emulator import NESEmulator
+from core.input_movie import InputMovie, rom_hash
+from core.frame_hashes import FrameHashes
+from core.frame_channel import FrameChannel, STATUS_RUNNING
+
+
+def write_test_rom(path: Path):
+    """写入一个打开NMI和渲染后死循环的NROM测试ROM"""
+    prg = bytearray(0x8000)
+    code = [0xA9, 0x40, 0x8D, 0x17, 0x40,
+            0xA9, 0x80, 0x8D, 0x00, 0x20,
+            0xA9, 0x1E, 0x8D, 0x01, 0x20,
+            0x4C, 0x0F, 0x80]
+    prg[:len(code)] = bytes(code)
+    prg[0x1000] = 0x40
+    prg[0x7FFA:0x8000] = bytes([0x00, 0x90, 0x00, 0x80, 0x00, 0x90])
+    header = b'NES\x1a' + bytes([2, 1, 1, 0]) + bytes(8)
+    path.write_bytes(header + bytes(prg) + bytes(range(256)) * 32)
+
+
+class TestHeadlessEmulator(unittest.TestCase):
+    """无界面模式测试"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        self.rom_path = Path(self.temp_dir.name) / "test.nes"
+        write_test_rom(self.rom_path)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def test_benchmark_run(self):
+        """测试限定帧数运行并输出帧耗时统计"""
+        emulator = NESEmulator(headless=True)
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=20, uncapped=True))
+        results = emulator.get_benchmark_results()
+        self.assertEqual(results['mode'], 'cpu')
+        self.assertEqual(results['frames'], 20)
+        self.assertGreater(results['fps'], 0)
+        times = results['frame_time_ms']
+        self.assertLessEqual(times['p50'], times['p95'])
+        self.assertLessEqual(times['p95'], times['p99'])
+
+    def test_benchmark_stdout_is_json(self):
+        """测试命令行基准测试的标准输出只有JSON，也可以写入--benchmark-out指定的文件"""
+        script = Path(__file__).parent.parent.parent / "src" / "core" / "nes_emulator.py"
+        command = [sys.executable, str(script), str(self.rom_path), "--headless", "--frames", "3", "--uncapped"]
+        result = subprocess.run(command, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(json.loads(result.stdout)['frames'], 3)
+        self.assertIn("NES", result.stderr)
+
+        out_path = Path(self.temp_dir.name) / "reports" / "bench.json"
+        result = subprocess.run(command + ["--benchmark-out", str(out_path)],
+                                capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "")
+        self.assertEqual(json.loads(out_path.read_text(encoding='utf-8'))['mode'], 'cpu')
+
+    def test_demo_mode_without_rom(self):
+        """测试没有ROM时也能无界面运行"""
+        emulator = NESEmulator(headless=True)
+        self.assertTrue(emulator.run(None, max_frames=5, uncapped=True))
+        self.assertEqual(emulator.get_benchmark_results()['mode'], 'demo')
+
+    def test_stress_mode(self):
+        """测试演示模式压力测试保持上千个实体"""
+        demo_rom = Path(self.temp_dir.name) / "demo.nes"
+        demo_rom.write_bytes(b'NES\x1a' + bytes([2, 1, 0, 0]) + bytes(8) + bytes(0x8000 + 0x2000))
+        emulator = NESEmulator(headless=True)
+        emulator.stress_objects = 1000
+        self.assertTrue(emulator.run(str(demo_rom), max_frames=30, uncapped=True))
+        results = emulator.get_benchmark_results()
+        self.assertEqual(results['mode'], 'demo')
+        self.assertGreater(results['entities'], 1000)
+
+    def test_controller_state_reused(self):
+        """测试每帧复用同一组控制器状态对象"""
+        emulator = NESEmulator(headless=True)
+        controller = emulator.controller
+        external = emulator.get_external_controller_input()
+        for _ in range(3):
+            emulator.update_controller()
+        self.assertIs(emulator.controller, controller)
+        self.assertIs(emulator.get_external_controller_input(), external)
+        self.assertFalse(any(controller.values()))
+        self.assertTrue(emulator.run(None, max_frames=3, uncapped=True))
+        self.assertEqual(emulator.gc_policy.get_stats()['frames'], 3)
+
+    def test_loading_rom_collects(self):
+        """测试游戏中选择新ROM时整体回收一次"""
+        emulator = NESEmulator(headless=True)
+        emulator.gc_policy.start_session()
+        try:
+            self.assertTrue(emulator.load_rom(str(self.rom_path)))
+        finally:
+            emulator.gc_policy.end_session()
+        self.assertEqual(emulator.gc_policy.get_stats()['manual_collections'], 1)
+
+    def test_reset_key_resets_every_component(self):
+        """测试R键复位所有部件，PPU追赶位置与CPU周期对齐，内部RAM保留"""
+        emulator = NESEmulator(headless=True)
+        self.assertTrue(emulator.load_rom(str(self.rom_path)))
+        for _ in range(5):
+            emulator.emulate_frame(audio=False)
+        emulator.bus.ram[0x42] = 0x99
+        old_ppu = emulator.ppu
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r, mod=0))
+        emulator.handle_events()
+
+        self.assertIsNot(emulator.ppu, old_ppu)
+        self.assertEqual(emulator.ppu.frame, 0)
+        self.assertIs(emulator.scheduler.ppu, emulator.ppu)
+        self.assertLess(emulator.cpu.cycles * 3 - emulator.scheduler.ppu_dots, 341)
+        self.assertEqual(emulator.bus.ram[0x42], 0x99)
+
+        # 复位后的时序与刚加载ROM时相同
+        fresh = NESEmulator(headless=True)
+        self.assertTrue(fresh.load_rom(str(self.rom_path)))
+        for _ in range(3):
+            emulator.emulate_frame(audio=False)
+            fresh.emulate_frame(audio=False)
+        self.assertEqual(emulator.cpu.cycles, fresh.cpu.cycles)
+        self.assertEqual(emulator.ppu.frame, fresh.ppu.frame)
+        self.assertEqual(emulator.scheduler.ppu_dots, fresh.scheduler.ppu_dots)
+
+    def test_unpause_resets_pacer(self):
+        """测试恢复暂停后帧节拍从当前时间重新开始，暂停的时间不算作落后"""
+        emulator = NESEmulator(headless=True)
+        pacer = emulator.frame_pacer
+        pacer.reset()
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p, mod=0))
+        emulator.handle_events()
+        self.assertTrue(emulator.paused)
+        # 模拟暂停了很久
+        pacer.deadline -= 10.0
+        pacer.late_streak = 5
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p, mod=0))
+        emulator.handle_events()
+        self.assertFalse(emulator.paused)
+        self.assertGreater(pacer.deadline, pacer.clock())
+        self.assertEqual(pacer.late_streak, 0)
+        self.assertTrue(pacer.begin_frame())
+
+    def test_cleanup_saves_cheat_config(self):
+        """测试退出时保存金手指配置"""
+        emulator = NESEmulator(headless=True)
+        emulator.current_rom_path = str(self.rom_path)
+        emulator.headless = False
+        self.assertTrue(emulator.cheat_manager.enable_cheat('nes', 'common', 'infinite_time'))
+        emulator.cleanup()
+        config = json.loads((Path("config") / "cheats" / "general_cheats.json").read_text(encoding='utf-8'))
+        self.assertTrue(config['nes']['common_cheats']['infinite_time']['enabled'])
+
+    def test_profiler_log(self):
+        """测试打开分阶段计时后退出时写入会话JSON"""
+        log_path = Path(self.temp_dir.name) / "profile.json"
+        emulator = NESEmulator(headless=True)
+        emulator.enable_profiler(show_graph=True, log_path=str(log_path))
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=10, uncapped=True))
+        report = json.loads(log_path.read_text(encoding='utf-8'))
+        self.assertEqual(report['frames'], 10)
+        self.assertEqual(report['mode'], 'cpu')
+        self.assertIn('emulate_frame', report['phases'])
+        self.assertNotIn('pacer_wait', report['phases'])
+
+    def test_profiled_run_matches_plain_run(self):
+        """测试分阶段计时走同一个step_frame：倒带和预运行照常工作，模拟结果不变"""
+        plain = NESEmulator(headless=True)
+        plain.enable_rewind(max_mb=1, interval=1)
+        plain.enable_run_ahead(1)
+        self.assertTrue(plain.run(str(self.rom_path), max_frames=10, uncapped=True))
+        emulator = NESEmulator(headless=True)
+        emulator.enable_rewind(max_mb=1, interval=1)
+        emulator.enable_run_ahead(1)
+        emulator.enable_profiler()
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=10, uncapped=True))
+        self.assertEqual(emulator.cpu.cycles, plain.cpu.cycles)
+        self.assertEqual(len(emulator.rewind), len(plain.rewind))
+        stats = emulator.profiler.get_stats()
+        self.assertEqual(stats['frames'], 10)
+        self.assertIn('emulate_frame', stats['phases'])
+        self.assertIn('run_ahead', stats['phases'])
+
+    def test_rewind(self):
+        """测试记录倒带快照并逐个退回"""
+        emulator = NESEmulator(headless=True)
+        emulator.enable_rewind(max_mb=1, interval=1)
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=20, uncapped=True))
+        self.assertEqual(emulator.get_benchmark_results()['rewind']['snapshots'], 20)
+
+        frame = emulator.ppu.frame
+        emulator.rewinding = True
+        for _ in range(5):
+            emulator.rewind_step()
+        # 退回5个快照后又静音模拟了一帧来生成画面
+        self.assertEqual(emulator.ppu.frame, frame - 4)
+        self.assertEqual(len(emulator.rewind), 15)
+
+    def test_run_ahead_matches_plain_run(self):
+        """测试预运行显示提前的画面但不改变模拟结果"""
+        plain = NESEmulator(headless=True)
+        self.assertTrue(plain.run(str(self.rom_path), max_frames=10, uncapped=True))
+        emulator = NESEmulator(headless=True)
+        emulator.enable_run_ahead(2)
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=10, uncapped=True))
+        self.assertEqual(emulator.cpu.cycles, plain.cpu.cycles)
+        self.assertEqual(emulator.ppu.frame, plain.ppu.frame)
+        self.assertEqual(bytes(emulator.bus.ram), bytes(plain.bus.ram))
+        stats = emulator.get_benchmark_results()['run_ahead']
+        self.assertEqual(stats['presented'], 10)
+        self.assertGreater(stats['ms_per_extra_frame'], 0)
+
+    def test_turbo_bypasses_pacer(self):
+        """测试加速模式不按60fps等待，每k帧渲染一帧"""
+        emulator = NESEmulator(headless=True)
+        emulator.frame_pacer.turbo = True
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=120))
+        results = emulator.get_benchmark_results()
+        self.assertGreater(results['fps'], 70)
+        stats = emulator.frame_pacer.get_stats()
+        self.assertEqual(stats['fast_forward_frames'], 120)
+        self.assertEqual(stats['rendered_frames'], 30)
+
+    def test_movie_replay_is_deterministic(self):
+        """测试录像回放重现同样的输入和最终状态"""
+        demo_rom = Path(self.temp_dir.name) / "demo.nes"
+        demo_rom.write_bytes(b'NES\x1a' + bytes([2, 1, 0, 0]) + bytes(8) + bytes(0x8000 + 0x2000))
+        movie_path = Path(self.temp_dir.name) / "run.nesmov"
+        recorder = NESEmulator(headless=True)
+        recorder.stress_objects = 200
+        recorder.movie_record_path = str(movie_path)
+        self.assertTrue(recorder.run(str(demo_rom), max_frames=30, uncapped=True))
+        self.assertEqual(len(InputMovie.load(movie_path)), 30)
+
+        # 改成按住A和右键，回放两次结果一致
+        movie = InputMovie.load(movie_path)
+        movie.inputs[0::2] = bytes([0x81]) * len(movie)
+        movie.save(movie_path)
+        states = []
+        for _ in range(2):
+            player = NESEmulator(headless=True)
+            player.stress_objects = 200
+            player.movie_play_path = str(movie_path)
+            self.assertTrue(player.run(str(demo_rom), uncapped=True))
+            self.assertEqual(player.get_benchmark_results()['movie'], {'frames': 30, 'played': 30})
+            states.append(player.capture_state())
+        self.assertEqual(states[0], states[1])
+        self.assertGreater(player.player_x, recorder.player_x)
+        self.assertGreater(len(player.bullets), 0)
+
+    def test_movie_rom_mismatch(self):
+        """测试录像与ROM不匹配时拒绝回放"""
+        movie_path = Path(self.temp_dir.name) / "run.nesmov"
+        InputMovie(b'\0' * 20, b'').save(movie_path)
+        emulator = NESEmulator(headless=True)
+        emulator.movie_play_path = str(movie_path)
+        self.assertFalse(emulator.run(str(self.rom_path), uncapped=True))
+
+    def test_golden_frame_hashes(self):
+        """测试回放录像时写入画面基准，再次回放时比较并报告第一个不一致的帧"""
+        movie_path = Path(self.temp_dir.name) / "run.nesmov"
+        recorder = NESEmulator(headless=True)
+        recorder.load_rom(str(self.rom_path))
+        movie = InputMovie(rom_hash(recorder.rom_data), recorder.capture_state())
+        for _ in range(12):
+            movie.record(0)
+        movie.save(movie_path)
+
+        results = []
+        for _ in range(2):
+            emulator = NESEmulator(headless=True)
+            emulator.movie_play_path = str(movie_path)
+            emulator.enable_frame_hashes(2)
+            self.assertTrue(emulator.run(str(self.rom_path), uncapped=True))
+            results.append(emulator.golden_result)
+        self.assertEqual(results[0]['status'], 'written')
+        self.assertEqual(results[1]['status'], 'match')
+
+        # 篡改第3个校验值（第4帧）
+        golden = FrameHashes.load(results[0]['golden'])
+        self.assertEqual(len(golden), 6)
+        golden.hashes[2] ^= 1
+        golden.save(results[0]['golden'])
+        emulator = NESEmulator(headless=True)
+        emulator.movie_play_path = str(movie_path)
+        emulator.enable_frame_hashes(2)
+        self.assertTrue(emulator.run(str(self.rom_path), uncapped=True))
+        self.assertEqual(emulator.golden_result['status'], 'diverged')
+        self.assertEqual(emulator.golden_result['first_divergence'], 4)
+
+    def test_quick_save_uses_binary_savestate(self):
+        """测试CPU模式的即时存档写成二进制格式并能恢复"""
+        emulator = NESEmulator(headless=True)
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=10, uncapped=True))
+        state = emulator.capture_state()
+        self.assertTrue(emulator.manual_save(slot=2))
+        saved = list(Path("saves").glob("*_slot_2.state"))
+        self.assertEqual(len(saved), 1)
+        self.assertEqual(saved[0].read_bytes()[:4], b'NESS')
+
+        for _ in range(5):
+            emulator.emulate_frame(audio=False)
+        self.assertNotEqual(emulator.capture_state(), state)
+        self.assertTrue(emulator.manual_load(slot=2))
+        self.assertEqual(emulator.capture_state(), state)
+
+        # 其他ROM或模式的存档被拒绝，状态不变
+        other = NESEmulator(headless=True)
+        with self.assertRaises(ValueError):
+            emulator.restore_state(other.capture_state())
+        self.assertEqual(emulator.capture_state(), state)
+
+    def test_subprocess_emulation(self):
+        """测试在子进程中模拟，帧经共享内存传回界面进程"""
+        emulator = NESEmulator(headless=True)
+        emulator.subprocess_emulation = True
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=30))
+        self.assertIsNone(emulator.frame_channel)
+        stats = emulator.get_benchmark_results()['frame_channel']
+        self.assertGreater(stats['published'], 0)
+        self.assertGreater(stats['received'], 0)
+        self.assertEqual(emulator.get_benchmark_results()['mode'], 'cpu')
+        # 界面进程不创建自己的模拟器核心
+        self.assertIsNone(emulator.cpu)
+        self.assertIsNone(emulator.ppu)
+
+    def test_subprocess_forwards_memory_writes(self):
+        """测试子进程模拟时内存写入转给模拟进程，不经过本进程"""
+        emulator = NESEmulator(headless=True)
+        emulator.subprocess_emulation = True
+        try:
+            self.assertTrue(emulator.load_rom(str(self.rom_path)))
+            self.assertIsNotNone(emulator.frame_channel)
+            self.assertIsNone(emulator.cpu)
+            emulator.write_memory(0x0010, 0x1FF)
+            # 模拟进程每帧开始前取走队列中的写入
+            deadline = time.perf_counter() + 5
+            while not emulator.memory_writes.empty() and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(emulator.memory_writes.empty())
+            self.assertEqual(emulator.frame_channel.status, STATUS_RUNNING)
+        finally:
+            emulator.stop_emulation_process()
+        self.assertIsNone(emulator.memory_writes)
+
+    def test_subprocess_refused_with_local_features(self):
+        """测试需要本进程核心的功能（录像、倒带、预运行、画面校验）打开时不启用子进程模拟"""
+        movie_path = Path(self.temp_dir.name) / "run.nesmov"
+        setups = (
+            lambda emulator: setattr(emulator, 'movie_record_path', str(movie_path)),
+            lambda emulator: setattr(emulator, 'movie_play_path', str(movie_path)),
+            lambda emulator: emulator.enable_rewind(max_mb=1),
+            lambda emulator: emulator.enable_run_ahead(1),
+            lambda emulator: emulator.enable_frame_hashes(1),
+        )
+        for setup in setups:
+            emulator = NESEmulator(headless=True)
+            emulator.subprocess_emulation = True
+            setup(emulator)
+            self.assertTrue(emulator.run(str(self.rom_path), max_frames=5, uncapped=True))
+            self.assertFalse(emulator.subprocess_emulation)
+            self.assertIsNone(emulator.frame_channel_stats)
+            # 本进程的核心在模拟
+            self.assertGreater(emulator.ppu.frame, 0)
+
+    def test_quick_save_blocked_in_subprocess_mode(self):
+        """测试子进程模拟时拒绝即时存档和读档（本进程没有模拟核心）"""
+        emulator = NESEmulator(headless=True)
+        self.assertTrue(emulator.load_rom(str(self.rom_path)))
+        emulator.frame_channel = FrameChannel()
+        try:
+            self.assertFalse(emulator.manual_save(slot=1))
+            self.assertFalse(emulator.manual_load(slot=1))
+        finally:
+            emulator.frame_channel.close()
+        self.assertEqual(list(Path("saves").glob("*.state")), [])
+
+    def test_netplay_demo_mode_uses_both_ports(self):
+        """测试演示模式联机时2P的输入也能控制玩家"""
+        demo_rom = Path(self.temp_dir.name) / "demo.nes"
+        demo_rom.write_bytes(b'NES\x1a' + bytes([2, 1, 0, 0]) + bytes(8) + bytes(0x8000 + 0x2000))
+        emulator = NESEmulator(headless=True)
+        self.assertTrue(emulator.load_rom(str(demo_rom)))
+        self.assertFalse(emulator.cpu_active)
+        right = dict(emulator.button_bits)['right']
+        x = emulator.player_x
+        emulator.emulate_netplay_frame((0, right), True)
+        self.assertGreater(emulator.player_x, x)
+
+    def test_netplay_disables_rewind(self):
+        """测试联机时关闭倒带，不再额外记录倒带快照"""
+        emulator = NESEmulator(headless=True)
+        emulator.enable_rewind(max_mb=1, interval=1)
+        emulator.enable_netplay(0, ('127.0.0.1', 0), ('127.0.0.1', 9), max_rollback=4)
+        self.assertIsNone(emulator.rewind)
+        self.assertTrue(emulator.run(str(self.rom_path), max_frames=3, uncapped=True))
+        self.assertIsNone(emulator.get_benchmark_results()['rewind'])
+        self.assertEqual(emulator.netplay.frame, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+NES Mapper的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.nes_bus import MemoryBus
+from core.nes_mapper import create_mapper, MAPPER_REGISTRY
+
+
+def make_rom(prg_banks_8k: int, chr_banks_1k: int = 8):
+    """生成每个bank首字节为bank编号的PRG/CHR数据"""
+    prg = bytearray(prg_banks_8k * 0x2000)
+    for bank in range(prg_banks_8k):
+        prg[bank * 0x2000] = bank
+    chr_rom = bytearray(chr_banks_1k * 0x400)
+    for bank in range(chr_banks_1k):
+        chr_rom[bank * 0x400] = bank
+    return bytes(prg), bytes(chr_rom)
+
+
+def make_mapper(number: int, prg_banks_8k: int, chr_banks_1k: int = 8):
+    prg, chr_rom = make_rom(prg_banks_8k, chr_banks_1k)
+    bus = MemoryBus(prg)
+    return bus, create_mapper(number, bus, chr_rom, 'horizontal')
+
+
+def prg_banks(bus):
+    return [bus.read(address) for address in (0x8000, 0xA000, 0xC000, 0xE000)]
+
+
+class TestMappers(unittest.TestCase):
+    """Mapper测试"""
+
+    def test_registry(self):
+        """测试注册表包含首批Mapper"""
+        for number in (0, 1, 2, 3, 4):
+            self.assertIn(number, MAPPER_REGISTRY)
+        self.assertIsNone(create_mapper(99, MemoryBus(), b''))
+
+    def test_nrom(self):
+        """测试NROM的16KB镜像"""
+        bus, mapper = make_mapper(0, 2)
+        self.assertEqual(prg_banks(bus), [0, 1, 0, 1])
+
+    def test_bank_switch_is_zero_copy(self):
+        """测试bank切换只替换memoryview切片"""
+        bus, mapper = make_mapper(2, 16)
+        mapper.write_register(0x8000, 3)
+        self.assertIs(bus.prg_slots[0].obj, bus.prg_rom.obj)
+        self.assertEqual(prg_banks(bus), [6, 7, 14, 15])
+        self.assertEqual(bus.prg_tags, [6, 7, 14, 15])
+
+    def test_cnrom_chr(self):
+        """测试CNROM切换8KB CHR bank"""
+        bus, mapper = make_mapper(3, 4, chr_banks_1k=32)
+        switched = []
+        mapper.on_chr_switch = switched.append
+        bus.write(0x8000, 2)
+        self.assertEqual(mapper.read_chr(0x0000), 16)
+        self.assertEqual(mapper.read_chr(0x1C00), 23)
+        self.assertEqual(switched, list(range(8)))
+
+    def test_mmc1_serial_writes(self):
+        """测试MMC1的5次串行写入"""
+        bus, mapper = make_mapper(1, 16, chr_banks_1k=32)
+        self.assertEqual(prg_banks(bus), [0, 1, 14, 15])
+
+        def serial_write(address, value):
+            for i in range(5):
+                bus.write(address, (value >> i) & 1)
+
+        serial_write(0xE000, 2)
+        self.assertEqual(prg_banks(bus), [4, 5, 14, 15])
+
+        # 控制寄存器: 垂直镜像, 固定$8000, 4KB CHR模式
+        serial_write(0x8000, 0b11010)
+        self.assertEqual(mapper.mirroring, 'vertical')
+        self.assertEqual(prg_banks(bus), [0, 1, 4, 5])
+        serial_write(0xC000, 3)
+        self.assertEqual(mapper.read_chr(0x1000), 12)
+
+        # 第7位复位移位寄存器
+        bus.write(0x8000, 1)
+        bus.write(0x8000, 0x80)
+        self.assertEqual(mapper.shift, 0x10)
+
+    def test_mmc3_banks(self):
+        """测试MMC3的PRG模式与CHR反转"""
+        bus, mapper = make_mapper(4, 16, chr_banks_1k=64)
+        bus.write(0x8000, 6)
+        bus.write(0x8001, 3)
+        bus.write(0x8000, 7)
+        bus.write(0x8001, 5)
+        self.assertEqual(prg_banks(bus), [3, 5, 14, 15])
+        bus.write(0x8000, 0x40)
+        self.assertEqual(prg_banks(bus), [14, 5, 3, 15])
+
+        bus.write(0x8000, 0x00)
+        bus.write(0x8001, 10)
+        self.assertEqual(mapper.read_chr(0x0000), 10)
+        self.assertEqual(mapper.read_chr(0x0400), 11)
+        bus.write(0x8000, 0x80)
+        self.assertEqual(mapper.read_chr(0x1000), 10)
+
+        bus.write(0xA000, 0)
+        self.assertEqual(mapper.mirroring, 'vertical')
+
+    def test_mmc3_scanline_irq(self):
+        """测试MMC3扫描线IRQ计数与预测"""
+        bus, mapper = make_mapper(4, 4)
+        irq = []
+        mapper.irq_callback = irq.append
+        bus.write(0xC000, 3)
+        bus.write(0xC001, 0)
+        bus.write(0xE001, 0)
+        self.assertEqual(mapper.scanlines_until_irq(), 4)
+
+        for _ in range(3):
+            mapper.scanline_hook()
+        self.assertEqual(irq, [])
+        self.assertEqual(mapper.scanlines_until_irq(), 1)
+        mapper.scanline_hook()
+        self.assertEqual(irq, [True])
+
+        bus.write(0xE000, 0)
+        self.assertEqual(irq, [True, False])
+        self.assertIsNone(mapper.scanlines_until_irq())
+
+    def test_mmc3_state_roundtrip(self):
+        """测试Mapper快照恢复bank映射、镜像和IRQ寄存器"""
+        bus, mapper = make_mapper(4, 16, chr_banks_1k=64)
+        bus.write(0x8000, 0x46)
+        bus.write(0x8001, 3)
+        bus.write(0xC000, 9)
+        bus.write(0xA000, 0)
+        state = mapper.save_state()
+        self.assertEqual(len(state), mapper.state_size)
+
+        bus.write(0x8000, 0x06)
+        bus.write(0x8001, 7)
+        bus.write(0xC000, 1)
+        bus.write(0xA000, 1)
+        mapper.load_state(state)
+        self.assertEqual(prg_banks(bus), [14, 1, 3, 15])
+        self.assertEqual(mapper.mirroring, 'vertical')
+        self.assertEqual(mapper.irq_latch, 9)
+        self.assertEqual(mapper.bank_select, 0x46)
+
+    def test_chr_ram(self):
+        """测试没有CHR ROM时使用可写的CHR RAM"""
+        bus = MemoryBus(bytes(0x8000))
+        mapper = create_mapper(0, bus, b'')
+        mapper.write_chr(0x1234, 0x5A)
+        self.assertEqual(mapper.read_chr(0x1234), 0x5A)
+
+
+if __name__ == '__main__':
+    unittest.main()
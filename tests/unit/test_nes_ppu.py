@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+NES PPU的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+
+from core.nes_bus import MemoryBus
+from core.nes_mapper import create_mapper
+from core.nes_ppu import PPU, palette_lut, VBLANK_SCANLINE
+
+
+def make_ppu(mirroring: str = 'horizontal'):
+    """CHR-RAM卡带上的PPU，已连接到总线"""
+    bus = MemoryBus(bytes(0x8000))
+    mapper = create_mapper(0, bus, b'', mirroring)
+    ppu = PPU(mapper)
+    bus.attach_ppu(ppu)
+    return bus, mapper, ppu
+
+
+def set_address(bus, address: int):
+    bus.write(0x2006, address >> 8)
+    bus.write(0x2006, address & 0xFF)
+
+
+def write_tile(bus, tile: int, rows_lo, rows_hi, table: int = 0):
+    set_address(bus, table + tile * 16)
+    for value in list(rows_lo) + list(rows_hi):
+        bus.write(0x2007, value)
+
+
+class TestPPU(unittest.TestCase):
+    """PPU测试"""
+
+    def test_palette_lut(self):
+        """测试64色查找表"""
+        self.assertEqual(palette_lut().shape, (64, 3))
+
+    def test_vram_buffered_read(self):
+        """测试$2007读取延迟一次和名称表镜像"""
+        bus, mapper, ppu = make_ppu('vertical')
+        set_address(bus, 0x2005)
+        bus.write(0x2007, 0x42)
+        set_address(bus, 0x2805)
+        bus.read(0x2007)
+        self.assertEqual(bus.read(0x2007), 0x42)
+
+    def test_palette_mirrors(self):
+        """测试$3F10镜像到$3F00，调色板读取不经过缓冲"""
+        bus, mapper, ppu = make_ppu()
+        set_address(bus, 0x3F10)
+        bus.write(0x2007, 0x21)
+        set_address(bus, 0x3F00)
+        self.assertEqual(bus.read(0x2007), 0x21)
+
+    def test_vblank_nmi(self):
+        """测试vblank标志与NMI"""
+        bus, mapper, ppu = make_ppu()
+        fired = []
+        ppu.nmi_callback = lambda: fired.append(ppu.scanline)
+        bus.write(0x2000, 0x80)
+        ppu.run_scanlines(VBLANK_SCANLINE + 1)
+        self.assertEqual(fired, [VBLANK_SCANLINE])
+        self.assertTrue(ppu.frame_complete)
+        self.assertEqual(bus.read(0x2002) & 0x80, 0x80)
+        self.assertEqual(bus.read(0x2002) & 0x80, 0)
+
+    def test_background_render(self):
+        """测试背景图块、属性和细滚动"""
+        bus, mapper, ppu = make_ppu()
+        write_tile(bus, 1, [0xFF] * 8, [0x00] * 8)
+        set_address(bus, 0x2000)
+        bus.write(0x2007, 1)
+        set_address(bus, 0x23C0)
+        bus.write(0x2007, 0x01)
+        set_address(bus, 0x3F00)
+        for value in (0x0F, 0x01, 0x02, 0x03, 0x0F, 0x11, 0x12, 0x13):
+            bus.write(0x2007, value)
+
+        bus.write(0x2005, 0)
+        bus.write(0x2005, 0)
+        bus.write(0x2000, 0)
+        bus.write(0x2001, 0x0A)
+        set_address(bus, 0x0000)
+        ppu.run_scanlines(240)
+
+        self.assertEqual(list(ppu.framebuffer[0, :8]), [0x11] * 8)
+        self.assertEqual(ppu.framebuffer[0, 8], 0x0F)
+        self.assertEqual(ppu.framebuffer[239, 0], 0x0F)
+
+        # 水平滚动3像素
+        bus.read(0x2002)
+        bus.write(0x2005, 3)
+        bus.write(0x2005, 0)
+        ppu.v = ppu.t
+        ppu.render_lines(0, 1)
+        self.assertEqual(list(ppu.framebuffer[0, :6]), [0x11] * 5 + [0x0F])
+
+    def test_sprites_and_zero_hit(self):
+        """测试精灵翻转、优先级和0号精灵命中"""
+        bus, mapper, ppu = make_ppu()
+        write_tile(bus, 1, [0xFF] * 8, [0x00] * 8)
+        write_tile(bus, 2, [0x80] + [0] * 7, [0x00] * 8)
+        set_address(bus, 0x2000)
+        bus.write(0x2007, 1)
+        set_address(bus, 0x3F00)
+        for value in [0x0F, 0x01, 0x02, 0x03] + [0x0F] * 12 + [0x0F, 0x21, 0x22, 0x23]:
+            bus.write(0x2007, value)
+
+        # 0号精灵：图块2，水平翻转，位于(0, 3)
+        ppu.oam[0:4] = bytes([2, 2, 0x40, 0])
+        # 1号精灵：图块2，在背景之后
+        ppu.oam[4:8] = bytes([19, 2, 0x20, 40])
+        for index in range(2, 64):
+            ppu.oam[index * 4] = 0xFF
+
+        bus.write(0x2001, 0x1E)
+        set_address(bus, 0x0000)
+        ppu.run_scanlines(240)
+
+        self.assertEqual(ppu.framebuffer[3, 7], 0x21)
+        self.assertEqual(ppu.framebuffer[3, 0], 0x01)
+        self.assertEqual(ppu.framebuffer[20, 40], 0x21)
+        self.assertTrue(ppu.status & 0x40)
+
+        # 精灵放到背景图块之外：不再命中
+        ppu.status = 0
+        ppu.oam[3] = 100
+        ppu.v = ppu.t
+        ppu.render_lines(0, 240)
+        self.assertFalse(ppu.status & 0x40)
+
+    def test_chr_ram_write_invalidates_tile(self):
+        """测试CHR RAM写入后只重新解码对应图块"""
+        bus, mapper, ppu = make_ppu()
+        decoded = ppu.tile_cache.decoded_tiles
+        write_tile(bus, 5, [0xFF] * 8, [0xFF] * 8)
+        self.assertEqual(ppu.tile_cache.dirty, {5})
+        ppu.tile_cache.refresh()
+        self.assertEqual(ppu.tile_cache.decoded_tiles, decoded + 1)
+        self.assertTrue(np.all(ppu.tiles[0, 5] == 3))
+
+    def test_oam_dma(self):
+        """测试$4014 OAM DMA及CPU暂停"""
+        bus, mapper, ppu = make_ppu()
+        bus.ram[0x200:0x300] = bytes(range(256))
+
+        class FakeCPU:
+            cycles = 0
+
+        bus.cpu = FakeCPU()
+        bus.write(0x4014, 0x02)
+        self.assertEqual(bytes(ppu.oam), bytes(range(256)))
+        self.assertEqual(bus.cpu.cycles, 513)
+
+    def test_rendering_disabled_backdrop(self):
+        """测试关闭渲染时显示背景色"""
+        bus, mapper, ppu = make_ppu()
+        set_address(bus, 0x3F00)
+        bus.write(0x2007, 0x2C)
+        ppu.run_scanlines(240)
+        self.assertTrue(np.all(ppu.framebuffer == 0x2C))
+
+
+if __name__ == '__main__':
+    unittest.main()
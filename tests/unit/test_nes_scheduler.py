@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+追赶式调度器的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.nes_bus import MemoryBus
+from core.nes_cpu import CPU6502
+from core.nes_mapper import create_mapper
+from core.nes_ppu import PPU
+from core.nes_apu import APU
+from core.nes_scheduler import Scheduler
+
+
+def make_system(mapper_number: int, prg: bytes, trace: bool = True):
+    """组装CPU/PPU/APU/调度器，CHR使用8KB CHR RAM"""
+    bus = MemoryBus(prg)
+    mapper = create_mapper(mapper_number, bus, b'', 'horizontal')
+    cpu = CPU6502(bus)
+    ppu = PPU(mapper)
+    ppu.nmi_callback = cpu.trigger_nmi
+    bus.attach_ppu(ppu)
+    mapper.irq_callback = cpu.set_irq
+    apu = APU(bus)
+    bus.attach_apu(apu)
+    scheduler = Scheduler(cpu, ppu, apu, mapper, trace=trace)
+    cpu.power_on()
+    return bus, cpu, ppu, scheduler
+
+
+def nrom_program(code, nmi_code=(0x40,)) -> bytes:
+    """32KB NROM：代码在$8000，NMI处理在$9000，IRQ直接RTI"""
+    prg = bytearray(0x8000)
+    prg[:len(code)] = bytes(code)
+    prg[0x1000:0x1000 + len(nmi_code)] = bytes(nmi_code)
+    prg[0x1100] = 0x40
+    prg[0x7FFA:0x8000] = bytes([0x00, 0x90, 0x00, 0x80, 0x00, 0x91])
+    return bytes(prg)
+
+
+# APU帧IRQ禁止，打开NMI和渲染后死循环
+INIT = [0xA9, 0x40, 0x8D, 0x17, 0x40,
+        0xA9, 0x80, 0x8D, 0x00, 0x20,
+        0xA9, 0x18, 0x8D, 0x01, 0x20]
+
+
+class TestScheduler(unittest.TestCase):
+    """调度器测试"""
+
+    def test_frame_and_nmi(self):
+        """测试每帧在vblank结束并触发NMI，空闲帧只批量渲染一次"""
+        code = INIT + [0x4C, 0x0F, 0x80]
+        bus, cpu, ppu, scheduler = make_system(0, nrom_program(code, [0xE6, 0x00, 0x40]))
+        for _ in range(4):
+            scheduler.run_frame()
+        self.assertEqual(ppu.frame, 3)
+        self.assertEqual(ppu.scanline, 242)
+        # 最后一帧的NMI在下一帧开始时才被响应
+        self.assertEqual(bus.ram[0], 3)
+        self.assertTrue(cpu.nmi_pending)
+        stats = scheduler.get_trace_stats()
+        self.assertEqual(stats['max']['end_of_frame'], 1)
+        self.assertLessEqual(scheduler.trace_history[-1]['ppu_batches'], 2)
+
+    def test_vblank_at_first_dot(self):
+        """测试vblank在CPU到达241行第1点时出现，而不是等这一行结束"""
+        code = INIT + [0x4C, 0x0F, 0x80]
+        bus, cpu, ppu, scheduler = make_system(0, nrom_program(code))
+        for _ in range(2):
+            scheduler.run_frame()
+            line_start = scheduler.ppu_dots - 341
+            # CPU停在241行开头附近（最多超出一条指令），PPU已处理完这一行
+            self.assertGreater(cpu.cycles * 3, line_start)
+            self.assertLessEqual(cpu.cycles * 3 - line_start, 7 * 3)
+            self.assertEqual(ppu.scanline, 242)
+            self.assertTrue(ppu.status & 0x80)
+
+    def test_register_polling_catches_up(self):
+        """测试轮询$2002时每次读取都让PPU追赶"""
+        # loop: BIT $2002; BPL loop; INC $01; JMP loop
+        code = INIT + [0x2C, 0x02, 0x20, 0x10, 0xFB, 0xE6, 0x01, 0x4C, 0x0F, 0x80]
+        bus, cpu, ppu, scheduler = make_system(0, nrom_program(code))
+        for _ in range(3):
+            scheduler.run_frame()
+        self.assertGreater(scheduler.trace_history[-1]['ppu_register'], 100)
+        self.assertGreaterEqual(bus.ram[1], 2)
+
+    def test_mapper_irq_event(self):
+        """测试MMC3扫描线IRQ在预测的扫描线上打断CPU"""
+        prg = bytearray(0x8000)
+        code = [0xA9, 0x40, 0x8D, 0x17, 0x40,
+                0xA9, 0x14, 0x8D, 0x00, 0xC0,   # 锁存值20
+                0x8D, 0x01, 0xC0,               # 重新装载
+                0x8D, 0x01, 0xE0,               # 打开IRQ
+                0xA9, 0x18, 0x8D, 0x01, 0x20,
+                0x58,                           # CLI
+                0x4C, 0x16, 0xE0]
+        prg[0x6000:0x6000 + len(code)] = bytes(code)
+        # $E100: 应答并重新打开IRQ，计数
+        prg[0x6100:0x6109] = bytes([0x8D, 0x00, 0xE0, 0x8D, 0x01, 0xE0, 0xE6, 0x02, 0x40])
+        prg[0x6200] = 0x40
+        prg[0x7FFA:0x8000] = bytes([0x00, 0xE2, 0x00, 0xE0, 0x00, 0xE1])
+        bus, cpu, ppu, scheduler = make_system(4, bytes(prg))
+
+        scheduler.run_frame()
+        bus.ram[2] = 0
+        scheduler.run_frame()
+        # 每21条计数扫描线一次IRQ
+        self.assertGreaterEqual(bus.ram[2], 11)
+        self.assertGreaterEqual(scheduler.trace_history[-1]['mapper_irq'], 11)
+
+    def test_bank_switch_mid_block(self):
+        """测试块中间切换PRG bank后，后面的指令从新bank取"""
+        prg = bytearray(0xC000)
+        # bank 0 $8000: LDA #$01; STA $8000（切到bank 1）; LDX #$11; JMP $8007
+        prg[0x0000:0x000A] = bytes([0xA9, 0x01, 0x8D, 0x00, 0x80, 0xA2, 0x11, 0x4C, 0x07, 0x80])
+        # bank 1 $8005: LDX #$22; JMP $8007
+        prg[0x4005:0x400A] = bytes([0xA2, 0x22, 0x4C, 0x07, 0x80])
+        prg[0xBFFA:0xC000] = bytes([0x00, 0x80, 0x00, 0x80, 0x00, 0x80])
+        bus, cpu, ppu, scheduler = make_system(2, bytes(prg))
+        scheduler.run_frame()
+        self.assertEqual(bus.prg_tags[0] >> 1, 1)
+        self.assertEqual(cpu.x, 0x22)
+
+    def test_state_roundtrip(self):
+        """测试恢复各部件的快照后重新运行得到相同的结果"""
+        # loop: BIT $2002; BPL loop; INC $01; LDA $01; STA $4002; JMP loop
+        code = INIT + [0x2C, 0x02, 0x20, 0x10, 0xFB, 0xE6, 0x01,
+                       0xA5, 0x01, 0x8D, 0x02, 0x40, 0x4C, 0x0F, 0x80]
+        bus, cpu, ppu, scheduler = make_system(0, nrom_program(code), trace=False)
+        parts = (cpu, bus, ppu, bus.apu, scheduler)
+        ppu.write_vram(0x0010, 0xFF)
+        for _ in range(2):
+            scheduler.run_frame()
+        states = [part.save_state() for part in parts]
+        self.assertEqual([len(state) for state in states], [part.state_size for part in parts])
+
+        scheduler.run_frame()
+        expected = (bytes(bus.ram), ppu.framebuffer.copy(), cpu.cycles, bus.apu.pulse1.phase)
+        ppu.write_vram(0x0010, 0x00)
+        for part, state in zip(parts, states):
+            part.load_state(state)
+        self.assertEqual(ppu.read_vram(0x0010), 0xFF)
+        scheduler.run_frame()
+        self.assertEqual(bytes(bus.ram), expected[0])
+        self.assertTrue((ppu.framebuffer == expected[1]).all())
+        self.assertEqual(cpu.cycles, expected[2])
+        self.assertEqual(bus.apu.pulse1.phase, expected[3])
+
+    def test_trace_disabled(self):
+        """测试关闭跟踪时不记录事件"""
+        code = INIT + [0x4C, 0x0F, 0x80]
+        bus, cpu, ppu, scheduler = make_system(0, nrom_program(code), trace=False)
+        scheduler.run_frame()
+        self.assertEqual(len(scheduler.trace_history), 0)
+        self.assertEqual(scheduler.frame_events, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
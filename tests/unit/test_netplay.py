@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+回滚联机的单元测试
+"""
+
+import random
+import unittest
+import zlib
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.netplay import LossyTransport, RollbackSession, UDPTransport
+
+
+class ToyMachine:
+    """确定性的小状态机：状态依赖于每一帧双方的输入"""
+
+    def __init__(self, corrupt_frame: int = -1):
+        self.state = bytearray(32)
+        self.frames = 0
+        self.corrupt_frame = corrupt_frame
+
+    def capture(self) -> bytes:
+        return bytes(self.state) + self.frames.to_bytes(4, 'little')
+
+    def restore(self, data):
+        self.state[:] = data[:32]
+        self.frames = int.from_bytes(data[32:], 'little')
+
+    def emulate(self, inputs, audio):
+        crc = zlib.crc32(bytes(inputs), zlib.crc32(self.state))
+        self.state[crc % 32] ^= (crc >> 8) & 0xFF
+        if self.frames == self.corrupt_frame:
+            self.state[0] ^= 1
+        self.frames += 1
+
+
+class TestRollbackSession(unittest.TestCase):
+    """回滚联机测试"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.sockets = [UDPTransport(('127.0.0.1', 0)) for _ in range(2)]
+        self.sockets[0].peer = self.sockets[1].address
+        self.sockets[1].peer = self.sockets[0].address
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+
+    def clock(self) -> float:
+        return self.now
+
+    def connect(self, machines, latency_ms=0.0, loss=0.0):
+        """在两台ToyMachine之间建立联机"""
+        sessions = []
+        for port, machine in enumerate(machines):
+            transport = LossyTransport(self.sockets[port], latency_ms, 10.0, loss, port, self.clock)
+            sessions.append(RollbackSession(transport, port, machine.capture, machine.restore,
+                                            machine.emulate))
+        return sessions
+
+    def play(self, sessions, frames: int):
+        """两边以60fps轮流推进，结束后继续收发直到输入全部确认"""
+        rng = random.Random(1)
+        inputs = [[0] * frames, [0] * frames]
+        for port in range(2):
+            for frame in range(1, frames):
+                inputs[port][frame] = rng.randrange(4) if rng.random() < 0.2 else inputs[port][frame - 1]
+        for _ in range(frames * 4):
+            self.now += 1 / 60
+            for port, session in enumerate(sessions):
+                if session.frame < frames:
+                    session.advance(inputs[port][session.frame])
+                else:
+                    session.poll()
+                    session.send_inputs()
+            if all(session.frame >= frames and session.remote_frame >= frames - 1 for session in sessions):
+                break
+
+    def test_rollback_converges_with_latency_and_loss(self):
+        """测试有延迟和丢包时预测错误会回滚，最终两边状态一致"""
+        machines = [ToyMachine(), ToyMachine()]
+        sessions = self.connect(machines, latency_ms=50.0, loss=0.1)
+        self.play(sessions, 300)
+        self.assertEqual(machines[0].capture(), machines[1].capture())
+        for session in sessions:
+            stats = session.get_stats()
+            self.assertEqual(stats['frames'], 300)
+            self.assertGreater(stats['rollbacks'], 0)
+            self.assertLessEqual(stats['max_depth'], session.max_rollback)
+            self.assertIsNone(stats['desync_frame'])
+            self.assertGreater(stats['checked_frames'], 250)
+            # 只保留可能回滚到的快照
+            self.assertLess(len(session.states), 2 * session.max_rollback + 4)
+
+    def test_detects_desync(self):
+        """测试一边状态出错时由校验值发现不同步"""
+        machines = [ToyMachine(), ToyMachine(corrupt_frame=40)]
+        sessions = self.connect(machines)
+        self.play(sessions, 120)
+        self.assertEqual(sessions[0].desync_frame, 40)
+
+    def test_stalls_without_peer(self):
+        """测试对方没有响应时最多预测max_rollback帧"""
+        machine = ToyMachine()
+        session = RollbackSession(self.sockets[0], 0, machine.capture, machine.restore,
+                                  machine.emulate, max_rollback=4)
+        results = [session.advance(0) for _ in range(10)]
+        self.assertEqual(results, [True] * 4 + [False] * 6)
+        self.assertEqual(session.get_stats()['stalls'], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
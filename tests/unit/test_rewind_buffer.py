@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+倒带快照环的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+
+from core.rewind_buffer import RewindBuffer
+
+
+def make_snapshots(count: int, size: int = 4096):
+    """每个快照只比前一个多改几个字节"""
+    rng = np.random.default_rng(3)
+    state = rng.integers(0, 256, size, dtype=np.uint8)
+    snapshots = []
+    for _ in range(count):
+        state[rng.integers(0, size, 8)] = rng.integers(0, 256, 8, dtype=np.uint8)
+        snapshots.append(state.tobytes())
+    return snapshots
+
+
+class TestRewindBuffer(unittest.TestCase):
+    """倒带缓冲测试"""
+
+    def test_step_back_in_order(self):
+        """测试按记录的相反顺序还原每个快照"""
+        snapshots = make_snapshots(10)
+        rewind = RewindBuffer()
+        for snapshot in snapshots:
+            rewind.push(snapshot)
+        self.assertEqual(len(rewind), 10)
+        for expected in reversed(snapshots[:-1]):
+            self.assertEqual(rewind.step_back(), expected)
+        self.assertIsNone(rewind.step_back())
+
+        # 倒带后继续记录，差分链接在还原出的快照之后
+        rewind.push(snapshots[5])
+        self.assertEqual(rewind.step_back(), snapshots[0])
+
+    def test_memory_cap_evicts_oldest(self):
+        """测试超过内存上限时丢弃最旧的快照"""
+        snapshots = make_snapshots(200)
+        rewind = RewindBuffer(max_bytes=4096 * 2 + 2000)
+        for snapshot in snapshots:
+            rewind.push(snapshot)
+        self.assertLessEqual(rewind.memory_bytes(), rewind.max_bytes)
+        self.assertGreater(rewind.evicted, 0)
+        kept = len(rewind)
+        for _ in range(kept - 1):
+            restored = rewind.step_back()
+        self.assertEqual(restored, snapshots[-kept])
+
+    def test_layout_change_restarts(self):
+        """测试快照长度变化（更换ROM）时重新开始并统计记录耗时"""
+        rewind = RewindBuffer(interval=4)
+        rewind.push(bytes(100))
+        rewind.push(bytes(100))
+        rewind.record(lambda: bytes(50))
+        stats = rewind.get_stats()
+        self.assertEqual(stats['snapshots'], 1)
+        self.assertEqual(stats['snapshot_bytes'], 50)
+        self.assertEqual(stats['frames_covered'], 4)
+        self.assertTrue(rewind.due(8))
+        self.assertFalse(rewind.due(9))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+预运行的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from core.run_ahead import RunAhead
+
+
+class TestRunAhead(unittest.TestCase):
+    """预运行测试"""
+
+    def test_order_and_cost(self):
+        """测试调用顺序，以及显示耗时不计入预运行的额外开销"""
+        calls = []
+        ticks = iter(range(0, 10_000_000, 1_000_000))
+        run_ahead = RunAhead(frames=2, clock=lambda: next(ticks))
+        run_ahead.run(lambda: calls.append('capture') or b'state',
+                      lambda state: calls.append(('restore', state)),
+                      lambda: calls.append('emulate'),
+                      lambda: calls.append('present'))
+        self.assertEqual(calls, ['capture', 'emulate', 'emulate', 'present', ('restore', b'state')])
+        # 时钟每次前进1ms：保存、模拟、恢复各1ms，显示的1ms不计入
+        self.assertEqual(run_ahead.last_cost_ns, 3_000_000)
+        stats = run_ahead.get_stats()
+        self.assertEqual(stats['presented'], 1)
+        self.assertEqual(stats['ms_per_extra_frame'], 0.5)
+        self.assertEqual(stats['cost_ms_per_frame'], 3.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
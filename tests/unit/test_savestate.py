@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+二进制即时存档格式的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+
+from core.savestate import pack_savestate, unpack_savestate, SAVESTATE_HEADER, SECTION_ENTRY
+
+
+class TestSavestate(unittest.TestCase):
+    """即时存档格式测试"""
+
+    def setUp(self):
+        self.ram = bytearray(range(256)) * 8
+        self.vram = np.arange(2048, dtype=np.uint16).astype(np.uint8)
+        self.sections = ((b'CPU ', b'\x01\x02\x03'), (b'RAM ', self.ram), (b'VRAM', self.vram))
+
+    def test_roundtrip(self):
+        """测试各段按标签读回，数据直接来自缓冲区"""
+        data = pack_savestate(self.sections, b'\x05' * 20)
+        self.assertEqual(len(data), SAVESTATE_HEADER.size + 3 * SECTION_ENTRY.size + 3 + 2048 + 2048)
+        rom_sha1, sections = unpack_savestate(data)
+        self.assertEqual(rom_sha1, b'\x05' * 20)
+        self.assertEqual(list(sections), [b'CPU ', b'RAM ', b'VRAM'])
+        self.assertEqual(bytes(sections[b'RAM ']), bytes(self.ram))
+        self.assertEqual(bytes(sections[b'VRAM']), self.vram.tobytes())
+
+    def test_compressed(self):
+        """测试zlib压缩后变小且内容不变"""
+        plain = pack_savestate(self.sections)
+        compressed = pack_savestate(self.sections, compress=True)
+        self.assertLess(len(compressed), len(plain))
+        self.assertEqual(bytes(unpack_savestate(compressed)[1][b'RAM ']), bytes(self.ram))
+
+    def test_rejects_bad_data(self):
+        """测试标识、版本和长度不对时抛出ValueError"""
+        data = pack_savestate(self.sections)
+        for bad in (data[:10], b'XXXX' + data[4:], data[:4] + b'\x09\x00' + data[6:], data[:-1]):
+            with self.assertRaises(ValueError):
+                unpack_savestate(bad)
+        compressed = pack_savestate(self.sections, compress=True)
+        with self.assertRaises(ValueError):
+            unpack_savestate(compressed[:-4])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+文字渲染缓存的单元测试
+"""
+
+import unittest
+from pathlib import Path
+
+# 添加src目录到路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import numpy as np
+import pygame
+
+from core.text_cache import TextCache
+
+
+class TestTextCache(unittest.TestCase):
+    """文字缓存测试"""
+
+    def setUp(self):
+        pygame.font.init()
+        self.font = pygame.font.Font(None, 16)
+
+    def test_hit_returns_same_surface(self):
+        """测试相同的字体、字符串和颜色命中同一个Surface"""
+        cache = TextCache()
+        first = cache.render(self.font, "Cheats: 2", (255, 255, 0))
+        self.assertIs(cache.render(self.font, "Cheats: 2", (255, 255, 0)), first)
+        self.assertIsNot(cache.render(self.font, "Cheats: 2", (0, 255, 0)), first)
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertGreater(stats['memory_bytes'], 0)
+
+    def test_lru_eviction(self):
+        """测试超过容量时淘汰最久未使用的项"""
+        cache = TextCache(max_entries=2)
+        cache.render(self.font, "a", (255, 255, 255))
+        cache.render(self.font, "b", (255, 255, 255))
+        cache.render(self.font, "a", (255, 255, 255))
+        cache.render(self.font, "c", (255, 255, 255))
+        self.assertEqual([key[1] for key in cache.entries], ["a", "c"])
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+
+    def test_digit_strip_matches_render(self):
+        """测试字形条绘制的数字与逐字渲染一致，且不增加缓存项"""
+        cache = TextCache()
+        target = pygame.Surface((80, 20))
+        width = cache.draw_number(target, self.font, 907, (255, 255, 255), (0, 0))
+
+        expected = pygame.Surface((80, 20))
+        x = 0
+        for digit in "907":
+            glyph = self.font.render(digit, True, (255, 255, 255))
+            expected.blit(glyph, (x, 0))
+            x += glyph.get_width()
+
+        self.assertEqual(width, x)
+        self.assertTrue(np.array_equal(pygame.surfarray.array3d(target),
+                                       pygame.surfarray.array3d(expected)))
+        for score in range(100):
+            cache.draw_number(target, self.font, score, (255, 255, 255), (0, 0))
+        self.assertEqual(len(cache.entries), 0)
+        self.assertEqual(cache.get_stats()['digit_strips'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()